@@ -0,0 +1,41 @@
+import { NextRequest, NextResponse } from "next/server";
+import { verifyDashboardAuth } from "@/lib/auth";
+
+function railwayUrl(path: string): string {
+  const base = process.env.RAILWAY_API_URL?.replace(/\/$/, "");
+  if (!base) throw new Error("RAILWAY_API_URL is not set");
+  return `${base}${path}`;
+}
+
+function railwayHeaders(): Record<string, string> {
+  const key = process.env.RAILWAY_API_KEY;
+  if (!key) throw new Error("RAILWAY_API_KEY is not set");
+  return { "x-api-key": key, "Content-Type": "application/json" };
+}
+
+/**
+ * GET /api/jobs/:id
+ * Proxies to Railway backend for the status, current stage and result of a pipeline job.
+ */
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  if (!verifyDashboardAuth(request)) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  const { id } = await params;
+
+  try {
+    const res = await fetch(railwayUrl(`/jobs/${encodeURIComponent(id)}`), {
+      headers: railwayHeaders(),
+      cache: "no-store",
+    });
+    const data = await res.json();
+    return NextResponse.json(data, { status: res.status });
+  } catch (err) {
+    const message = err instanceof Error ? err.message : "Unknown error";
+    return NextResponse.json({ error: message }, { status: 500 });
+  }
+}
@@ -258,9 +258,9 @@ export default function OverviewPage() {
         method: "POST",
         headers: getAuthHeaders(),
       });
-      const d = (await res.json()) as { status?: string; error?: string };
+      const d = (await res.json()) as { job_id?: string; status?: string; error?: string };
       if (d.error) throw new Error(d.error);
-      showToast(`Pipeline complete — ${d.status ?? "done"}`, true);
+      showToast(d.job_id ? "Pipeline started — running in the background" : `Pipeline complete — ${d.status ?? "done"}`, true);
       await fetchAll();
     } catch (err) {
       showToast(err instanceof Error ? err.message : "Pipeline failed", false);
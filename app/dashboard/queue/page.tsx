@@ -98,9 +98,9 @@ export default function QueuePage() {
         method: "POST",
         headers: getAuthHeaders(),
       });
-      const data = (await res.json()) as { status?: string; error?: string };
+      const data = (await res.json()) as { job_id?: string; status?: string; error?: string };
       if (data.error) throw new Error(data.error);
-      showToast(`Pipeline complete — ${data.status ?? "done"}`, true);
+      showToast(data.job_id ? "Pipeline started — running in the background" : `Pipeline complete — ${data.status ?? "done"}`, true);
       await fetchItems();
     } catch (err) {
       showToast(err instanceof Error ? err.message : "Pipeline failed", false);
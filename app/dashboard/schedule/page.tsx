@@ -176,9 +176,9 @@ export default function SchedulePage() {
         method: "POST",
         headers: getAuthHeaders(),
       });
-      const d = (await res.json()) as { status?: string; error?: string };
+      const d = (await res.json()) as { job_id?: string; status?: string; error?: string };
       if (d.error) throw new Error(d.error);
-      showToast(`Pipeline complete — ${d.status ?? "done"}`, true);
+      showToast(d.job_id ? "Pipeline started — running in the background" : `Pipeline complete — ${d.status ?? "done"}`, true);
       void fetchAll();
     } catch (err) {
       showToast(err instanceof Error ? err.message : "Pipeline failed", false);
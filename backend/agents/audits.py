@@ -0,0 +1,271 @@
+"""Sub-audit revision — four specialised auditors instead of one monolithic audit.
+
+Links/citations, keyphrase/metadata, voice/banned phrases and structure each
+see only the blocks relevant to them and return targeted edits. The auditors run
+concurrently, their edits are merged and applied locally, and the 15 checks and
+confidence score are computed from the merged post rather than asked of the model.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agents.content import ContentDraft
+from agents.revision import RevisionResult, run_revision_agent
+from agents.scoring import confidence_from_checks, find_banned_phrases, seo_checks
+from prompts.revision_prompt import build_subaudit_system_prompt, build_subaudit_user_prompt
+from services.html_patch import Block, EditOp, apply_edits, edits_from_json, numbered_blocks, split_blocks
+from services.llm import chat_completion
+from services.structured_output import dataclass_schema, parse_json, response_format
+from services.tenants import current_tenant
+
+logger = logging.getLogger(__name__)
+
+# Merge priority: when two auditors rewrite the same block, the earlier one wins
+_AUDITORS = ("structure", "voice", "links", "metadata")
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_STAT_RE = re.compile(r"\d+(?:\.\d+)?\s*(?:%|percent\b)|\b\d{2,}(?:,\d{3})*\b")
+_SENTENCE_END_RE = re.compile(r"[.!?](?:\s|$)")
+_FAQ_RE = re.compile(r"\bfaqs?\b|frequently asked", re.IGNORECASE)
+
+
+@dataclass
+class SubAudit:
+    title: str
+    excerpt: str
+    edits: list[EditOp]
+    flagged_issues: list[str]
+    notes: str
+    answer_first: bool
+
+
+_EXCLUDED_FIELDS = {
+    "links": ("title", "excerpt", "answer_first"),
+    "metadata": ("answer_first",),
+    "voice": ("title", "excerpt", "answer_first"),
+    "structure": ("title", "excerpt"),
+}
+_FORMATS = {
+    name: response_format(f"{name}_audit", dataclass_schema(SubAudit, exclude=excluded))
+    for name, excluded in _EXCLUDED_FIELDS.items()
+}
+
+
+def run_audited_revision(draft: ContentDraft) -> RevisionResult:
+    """Revise via concurrent sub-audits; falls back to the full rewrite if they can't run."""
+    try:
+        return _run_audits(draft)
+    except RuntimeError as exc:
+        logger.warning("[audits] sub-audit revision failed (%s) — falling back to full rewrite", str(exc)[:200])
+        return run_revision_agent(draft)
+
+
+def _run_audits(draft: ContentDraft) -> RevisionResult:
+    blocks = split_blocks(draft.content)
+    if not blocks:
+        raise RuntimeError("Sub-audits: content has no HTML blocks")
+    checks = seo_checks(draft.title, draft.excerpt, draft.content, draft.focus_keyphrase)
+
+    with ThreadPoolExecutor(max_workers=len(_AUDITORS), thread_name_prefix="audit") as pool:
+        futures = {
+            name: pool.submit(contextvars.copy_context().run, _run_subaudit, name, draft, blocks, checks)
+            for name in _AUDITORS
+        }
+        results: dict[str, SubAudit] = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as exc:
+                logger.warning("[audits] %s auditor failed: %s", name, str(exc)[:200])
+
+    if not results:
+        raise RuntimeError("Sub-audits: every auditor failed")
+
+    content = apply_edits(draft.content, _merge_edits(results), skip_invalid=True)
+    metadata = results.get("metadata")
+    title = metadata.title.strip() if metadata and metadata.title.strip() else draft.title
+    excerpt = metadata.excerpt.strip() if metadata and metadata.excerpt.strip() else draft.excerpt
+
+    final_checks: dict[str, bool] = seo_checks(title, excerpt, content, draft.focus_keyphrase)
+    structure = results.get("structure")
+    final_checks["answer_first_opening"] = (
+        structure.answer_first if structure else _opening_looks_answer_first(content, draft.focus_keyphrase)
+    )
+
+    flagged = [issue for name in _AUDITORS if name in results for issue in results[name].flagged_issues]
+    flagged += [f'banned phrase: "{p}"' for p in find_banned_phrases(content) if not any(p in f.lower() for f in flagged)]
+    passed = sum(final_checks.values())
+    failing = [name for name, ok in final_checks.items() if not ok]
+    notes = " ".join(f"[{name}] {results[name].notes.strip()}" for name in _AUDITORS if name in results)
+    if failing:
+        notes += f" Failing checks: {', '.join(failing)}."
+    missing = [name for name in _AUDITORS if name not in results]
+    if missing:
+        notes += f" Auditors unavailable: {', '.join(missing)}."
+
+    logger.info("[audits] %d/15 checks, %d flagged, %d auditor(s)", passed, len(flagged), len(results))
+    return RevisionResult(
+        title=title,
+        excerpt=excerpt,
+        content=content.strip(),
+        tags=draft.tags,
+        confidence_score=confidence_from_checks(passed, len(flagged)),
+        seo_checks_passed=passed,
+        word_count=len(_TAG_RE.sub(" ", content).split()),
+        flagged_issues=flagged,
+        revision_notes=notes.strip(),
+    )
+
+
+def _run_subaudit(name: str, draft: ContentDraft, blocks: list[Block], checks: dict[str, bool]) -> SubAudit:
+    visible, findings = _context_for(name, draft, blocks, checks)
+    response = chat_completion(
+        agent="audit",
+        response_format=_FORMATS[name],
+        messages=[
+            {"role": "system", "content": build_subaudit_system_prompt(name)},
+            {
+                "role": "user",
+                "content": build_subaudit_user_prompt(
+                    draft.title,
+                    draft.excerpt,
+                    draft.focus_keyphrase,
+                    numbered_blocks(visible),
+                    findings,
+                ),
+            },
+        ],
+    )
+
+    raw = response.choices[0].message.content
+    if not raw:
+        raise RuntimeError(f"{name} auditor returned empty response")
+    data = parse_json(raw, f"{name} auditor")
+    if not isinstance(data, dict):
+        raise RuntimeError(f"{name} auditor: response is not an object")
+
+    visible_ids = {b.index for b in visible}
+    edits = [e for e in edits_from_json(data.get("edits")) if e.block in visible_ids or e.op == "insert_after"]
+    issues = data.get("flagged_issues", [])
+    return SubAudit(
+        title=str(data.get("title", "")),
+        excerpt=str(data.get("excerpt", "")),
+        edits=edits,
+        flagged_issues=[str(i) for i in issues] if isinstance(issues, list) else [],
+        notes=str(data.get("notes", "")),
+        answer_first=bool(data.get("answer_first", False)),
+    )
+
+
+def _context_for(
+    name: str,
+    draft: ContentDraft,
+    blocks: list[Block],
+    checks: dict[str, bool],
+) -> tuple[list[Block], list[str]]:
+    """The blocks an auditor needs to see, plus local findings for its remit."""
+    keyphrase = draft.focus_keyphrase.lower()
+    headings = [b for b in blocks if b.tag in _HEADING_TAGS]
+    first_p = next((b for b in blocks if b.tag == "p"), None)
+    failing = [k for k, ok in checks.items() if not ok]
+
+    if name == "links":
+        unsourced = [b.index for b in blocks if _STAT_RE.search(_TAG_RE.sub(" ", b.html)) and "<a " not in b.html]
+        findings = [f"failing: {k}" for k in failing if k in ("internal_link", "external_link", "high_da_link")]
+        if unsourced:
+            findings.append(f"blocks with numbers but no link (possible unsourced stats): {unsourced}")
+        return blocks, findings
+
+    if name == "metadata":
+        text = _TAG_RE.sub(" ", draft.content)
+        words = len(text.split()) or 1
+        density = text.lower().count(keyphrase) * len(keyphrase.split()) / words * 100
+        visible = {b.index: b for b in headings}
+        if first_p:
+            visible[first_p.index] = first_p
+        visible.update({b.index: b for b in blocks if keyphrase and keyphrase in b.html.lower()})
+        findings = [f"failing: {k}" for k in failing if k.startswith("keyphrase") or k.endswith("_length")]
+        findings.append(f"title is {len(draft.title)} chars; excerpt is {len(draft.excerpt)} chars")
+        findings.append(f"keyphrase density {density:.2f}% over {words} words")
+        return [visible[i] for i in sorted(visible)], findings
+
+    if name == "voice":
+        brand = current_tenant().brand_name.lower()
+        hits = {b.index: find_banned_phrases(b.html) for b in blocks}
+        hits = {i: found for i, found in hits.items() if found}
+        visible = {i: blocks[i] for i in hits}
+        visible.update({b.index: b for b in blocks[-2:]})
+        visible.update({b.index: b for b in blocks if brand and brand in b.html.lower()})
+        text = _TAG_RE.sub(" ", draft.content).lower()
+        mentions = text.count(brand) if brand else 0
+        words = len(text.split()) or 1
+        findings = [f'block {i}: banned {", ".join(found)}' for i, found in sorted(hits.items())]
+        findings.append(f"brand mentioned {mentions}× in {words} words ({mentions / words * 150:.2f} per 150 words)")
+        return [visible[i] for i in sorted(visible)], findings
+
+    # structure
+    visible = {b.index: b for b in headings}
+    if first_p:
+        visible[first_p.index] = first_p
+    visible.update({b.index: b for b in blocks if b.tag in ("img", "figure")})
+    long_paragraphs = [
+        b.index for b in blocks
+        if b.tag == "p" and len(_SENTENCE_END_RE.findall(_TAG_RE.sub(" ", b.html))) > 3
+    ]
+    visible.update({i: blocks[i] for i in long_paragraphs})
+    faq = _faq_blocks(blocks)
+    visible.update({i: blocks[i] for i in faq})
+    findings = [f"failing: {k}" for k in failing if k in ("has_h2", "image_alt_text")]
+    if long_paragraphs:
+        findings.append(f"paragraphs over 3 sentences: {long_paragraphs}")
+    if faq:
+        findings.append(f"FAQ section blocks: {faq}")
+    return [visible[i] for i in sorted(visible)], findings
+
+
+def _faq_blocks(blocks: list[Block]) -> list[int]:
+    """Indexes of a FAQ heading and everything under it up to the next heading of the same level."""
+    for b in blocks:
+        if b.tag in _HEADING_TAGS and _FAQ_RE.search(_TAG_RE.sub(" ", b.html)):
+            section = [b.index]
+            for nxt in blocks[b.index + 1:]:
+                if nxt.tag in _HEADING_TAGS and nxt.tag <= b.tag:
+                    break
+                section.append(nxt.index)
+            return section
+    return []
+
+
+def _merge_edits(results: dict[str, SubAudit]) -> list[EditOp]:
+    """Combine auditors' edits; a block rewritten or deleted by one auditor is owned by it."""
+    owners: dict[int, str] = {}
+    for name in _AUDITORS:
+        for edit in results[name].edits if name in results else []:
+            if edit.op in ("replace_block", "delete_block"):
+                owners.setdefault(edit.block, name)
+
+    merged: list[EditOp] = []
+    for name in _AUDITORS:
+        for edit in results[name].edits if name in results else []:
+            owner = owners.get(edit.block)
+            if edit.op != "insert_after" and owner is not None and owner != name:
+                logger.info("[audits] dropping %s %s on block %d (owned by %s)", name, edit.op, edit.block, owner)
+                continue
+            merged.append(edit)
+    return merged
+
+
+def _opening_looks_answer_first(content: str, focus_keyphrase: str) -> bool:
+    """Fallback for check 15 when the structure auditor is unavailable."""
+    first_p = next((b for b in split_blocks(content) if b.tag == "p"), None)
+    if first_p is None:
+        return False
+    text = _TAG_RE.sub(" ", first_p.html)
+    sentences = len(_SENTENCE_END_RE.findall(text))
+    brand = current_tenant().brand_name.lower()
+    return 2 <= sentences <= 4 and focus_keyphrase.lower() in text.lower() and brand in text.lower()
@@ -0,0 +1,71 @@
+"""Local auto-fix — delete throat-clearing banned phrases before the draft reaches revision.
+
+Only phrases that can simply be deleted ("in conclusion", "let's face it") are
+fixed here, and only where they stand apart from the sentence: at a sentence
+start followed by a comma, or set off by commas. Everything else — words whose
+fix depends on context ("boost", "unlock", "journey"), phrases that need the
+sentence rewritten, matches inside or across an HTML tag — is left for the
+revision agent to flag and fix.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import replace
+
+from agents.content import ContentDraft
+from agents.scoring import banned_phrase_matches
+from services.phrase_engine import PhraseMatch
+
+logger = logging.getLogger(__name__)
+
+# Deleted when parenthetical; every other banned phrase is left for revision
+_DELETABLE = frozenset({
+    "in today's fast-paced world",
+    "now more than ever",
+    "let's face it",
+    "in conclusion",
+    "to summarise",
+    "to summarize",
+    "in summary",
+})
+
+_SENTENCE_START_RE = re.compile(r"(?:^|[.!?]\s+|>\s*)$")
+
+
+def autofix_banned_phrases(draft: ContentDraft) -> tuple[ContentDraft, list[str]]:
+    """Return the draft with deletable banned phrases removed, and the phrases removed."""
+    fixed: list[str] = []
+    title = _fix(draft.title, fixed)
+    excerpt = _fix(draft.excerpt, fixed)
+    content = _fix(draft.content, fixed)
+    if fixed:
+        logger.info("[autofix] deleted %d banned phrase(s): %s", len(fixed), ", ".join(sorted(set(fixed))))
+    return replace(draft, title=title, excerpt=excerpt, content=content), fixed
+
+
+def _fix(html: str, fixed: list[str]) -> str:
+    matches = [m for m in banned_phrase_matches(html) if _fixable(html, m)]
+    for m in reversed(matches):  # back to front keeps earlier offsets valid
+        html = _delete(html, m)
+        fixed.append(m.phrase.lower())
+    return html
+
+
+def _fixable(html: str, match: PhraseMatch) -> bool:
+    if match.phrase.lower() not in _DELETABLE or "<" in match.text:
+        return False
+    before, after = html[:match.start], html[match.end:]
+    if _SENTENCE_START_RE.search(before):
+        return after.startswith(",")
+    return before.endswith(", ") and after[:1] in (",", ".")
+
+
+def _delete(html: str, match: PhraseMatch) -> str:
+    before, after = html[:match.start], html[match.end:]
+    if _SENTENCE_START_RE.search(before):
+        # "In conclusion, the barrier…" → "The barrier…"
+        rest = after[1:].lstrip()
+        return before + rest[:1].upper() + rest[1:]
+    # "…matters, now more than ever." → "…matters."
+    return before[:-2] + after
@@ -0,0 +1,163 @@
+"""Batch agent — topic replenishment and backfill drafting through the batch endpoint.
+
+Submissions are recorded as one pipeline_batches row each and polled by the
+scheduler leader. A finished batch is claimed with a conditional update before
+it is ingested, so overlapping polls never ingest it twice. Completed topic batches are added to
+automation_queue; completed backfill batches store a validated content draft
+on each queue row, which the pipeline then uses instead of a live content call.
+"""
+from __future__ import annotations
+
+import logging
+import random
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any
+
+from agents import content, topic
+from agents.supervisor import _ALL_STRUCTURES, _related_posts
+from prompts.content_prompt import build_content_system_prompt, build_content_user_prompt
+from services import supabase_client as db
+from services.batch import TERMINAL_STATES, BatchRequest, BatchResult, batch_backend, build_batch_file
+from services.structured_output import parse_json
+from services.tenants import current_tenant
+from services.token_budget import trim_items
+
+logger = logging.getLogger(__name__)
+
+
+def submit_topic_batch(count: int, requests: int = 1) -> dict[str, Any]:
+    """Queue topic generation as a batch; requests > 1 asks for count topics several times."""
+    existing = trim_items(list(db.iter_queue_topics()), "existing_topics", keep="first")  # newest first
+    system, user = topic.build_topic_prompts(count, existing)
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    batch = [
+        BatchRequest(f"topics:{i}", "topic", messages, {"response_format": topic._RESPONSE_FORMAT})
+        for i in range(requests)
+    ]
+    return _submit("topics", batch)
+
+
+def submit_backfill_batch(limit: int) -> dict[str, Any]:
+    """Draft up to limit pending queue items (oldest first) in one batch."""
+    in_flight = {i for b in db.get_pending_batches() if b.get("kind") == "drafts" for i in b.get("item_ids", [])}
+    items = [i for i in db.list_undrafted_pending(limit + len(in_flight)) if i.id not in in_flight][:limit]
+    if not items:
+        return {"message": "No pending queue items need a draft"}
+
+    # Rotate through fresh structures first, starting at a random one, as the live pipeline would
+    recent = set(db.get_recent_structures(3))
+    fresh = [s for s in _ALL_STRUCTURES if s not in recent]
+    structures = fresh + [s for s in _ALL_STRUCTURES if s in recent]
+    offset = random.randrange(len(fresh) or 1)
+    system = build_content_system_prompt()
+    batch = []
+    for n, item in enumerate(items):
+        structure = structures[(offset + n) % len(structures)]
+        keyphrase = item.focus_keyphrase or item.topic
+        existing_titles, internal_links = _related_posts(item.topic, keyphrase)
+        existing_titles = trim_items(existing_titles, "existing_titles", keep="first")
+        user = build_content_user_prompt(item.topic, keyphrase, structure, existing_titles, internal_links)
+        batch.append(BatchRequest(
+            f"draft:{item.id}",
+            "content",
+            [{"role": "system", "content": system}, {"role": "user", "content": user}],
+            {"response_format": content._RESPONSE_FORMAT},
+        ))
+    return _submit("drafts", batch, item_ids=[i.id for i in items])
+
+
+def poll_batches() -> dict[str, Any]:
+    """Check the current tenant's pending batches and ingest any that finished."""
+    pending = [r for r in db.get_pending_batches() if r.get("state") == "pending"]
+    still_pending = 0
+    summary: list[dict[str, Any]] = []
+    for record in pending:
+        try:
+            status = batch_backend(record.get("backend")).status(record["id"])
+        except Exception as exc:
+            logger.warning("[batch] status check for %s failed: %s", record["id"], exc)
+            still_pending += 1
+            continue
+        if status not in TERMINAL_STATES:
+            still_pending += 1
+            if status != record.get("status"):
+                db.update_batch(record["id"], {"status": status})
+            continue
+        if not db.claim_batch(record["id"]):
+            continue  # an overlapping poll is ingesting it
+        outcome: dict[str, Any] = {"id": record["id"], "kind": record["kind"], "status": status}
+        try:
+            if status == "completed":
+                results = batch_backend(record.get("backend")).results(record["id"])
+                outcome.update(_ingest_topics(results) if record["kind"] == "topics" else _ingest_drafts(results))
+        except Exception as exc:
+            # Ingest is idempotent (topics are de-duplicated, drafts overwritten), so the next poll retries it
+            logger.warning("[batch] ingesting %s failed: %s", record["id"], exc)
+            db.update_batch(record["id"], {"state": "pending", "status": status})
+            still_pending += 1
+            continue
+        db.update_batch(record["id"], {
+            "state": "done",
+            "status": status,
+            "outcome": outcome,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        })
+        logger.info("[batch] %s", outcome)
+        summary.append(outcome)
+    return {"pending": still_pending, "finished": summary}
+
+
+def _submit(kind: str, requests: list[BatchRequest], **extra: Any) -> dict[str, Any]:
+    backend = batch_backend()
+    batch_id = backend.submit(build_batch_file(requests), {"kind": kind, "tenant": current_tenant().id})
+    record = {
+        "id": batch_id,
+        "kind": kind,
+        "backend": backend.name,
+        "requests": len(requests),
+        "status": "submitted",
+        "submitted_at": datetime.now(timezone.utc).isoformat(),
+        **extra,
+    }
+    db.insert_batch(record)
+    logger.info("[batch] submitted %s batch %s (%d request(s), %s)", kind, batch_id, len(requests), backend.name)
+    return record
+
+
+def _ingest_topics(results: list[BatchResult]) -> dict[str, Any]:
+    seen = {t.strip().lower() for t in db.iter_queue_topics()}
+    added = failed = 0
+    for result in results:
+        try:
+            if result.error:
+                raise RuntimeError(result.error)
+            suggestions = topic._validate(parse_json(result.content or "", "Topic batch"))
+        except RuntimeError as exc:
+            failed += 1
+            logger.warning("[batch] %s: %s", result.custom_id, str(exc)[:200])
+            continue
+        for s in suggestions:
+            if s.topic.strip().lower() in seen:
+                continue
+            seen.add(s.topic.strip().lower())
+            db.add_queue_item(s.topic, s.focus_keyphrase, s.keywords)
+            added += 1
+    return {"added": added, "failed": failed}
+
+
+def _ingest_drafts(results: list[BatchResult]) -> dict[str, Any]:
+    drafted = failed = 0
+    for result in results:
+        item_id = result.custom_id.split(":", 1)[-1]
+        try:
+            if result.error:
+                raise RuntimeError(result.error)
+            draft = content._validate(parse_json(result.content or "", "Content batch"))
+        except RuntimeError as exc:
+            failed += 1
+            logger.warning("[batch] %s: %s", result.custom_id, str(exc)[:200])
+            continue
+        db.set_queue_draft(item_id, asdict(draft))
+        drafted += 1
+    return {"drafted": drafted, "failed": failed}
@@ -0,0 +1,372 @@
+"""Local confidence predictor — estimates the revision outcome before paying for the audit.
+
+A ridge regression (NumPy, optional) maps draft features from
+agents/scoring.draft_features() plus the structure type to the two numbers
+the revision audit produces: confidence_score and seo_checks_passed. It is
+trained offline from the pipeline's own history:
+  - samples recorded by the pipeline itself (the exact pre-revision draft
+    features with the revision's outcome), appended to a local JSONL file;
+  - automation_logs outcomes of runs whose pre-revision draft is stored on the
+    queue row (backfill batches and checkpoints).
+Only full-audit outcomes are trained on: published posts are already revised,
+and light-path samples would feed the routing decision back into the model.
+
+CONFIDENCE_ROUTING controls the runtime side:
+  off    — no prediction (default)
+  shadow — predict, record samples and track accuracy, but always run the full audit
+  on     — drafts whose predicted confidence clears the auto-publish threshold by
+           one cross-validated RMSE take the light path (patch revision); the rest
+           get the full audit
+Every prediction is logged next to the actual outcome, and rolling accuracy is
+reported on /health.
+
+    cd backend && python -m agents.confidence --train
+    cd backend && python -m agents.confidence --report
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from agents.content import ContentDraft
+from agents.scoring import draft_features
+from services.tenants import current_tenant, use_tenant
+from services.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # the predictor is optional
+    np = None  # type: ignore[assignment]
+
+_MODEL_DIR = Path(__file__).resolve().parent.parent / ".confidence_model"
+_VERSION = 1
+
+_TARGETS = ("confidence_score", "seo_checks_passed")
+_MIN_SAMPLES = 30
+_RIDGE_ALPHA = 1.0
+_FOLDS = 5
+_LIGHT_MARGIN = 1.0      # CV RMSEs the predicted confidence must clear the threshold by
+_ACCURACY_WINDOW = 200   # recent predictions behind the /health accuracy figures
+
+_models: dict[str, tuple[float, ConfidenceModel | None]] = {}   # tenant → (file mtime, model)
+_models_lock = threading.Lock()
+_samples_lock = threading.Lock()
+
+
+@dataclass
+class ConfidenceModel:
+    features: list[str]
+    mean: list[float]
+    scale: list[float]
+    weights: list[list[float]]       # one row per feature, then the intercept; one column per target
+    rmse: dict[str, float]           # cross-validated, per target
+    samples: int
+    trained_at: str = ""
+
+    def predict(self, features: dict[str, float]) -> dict[str, float]:
+        x = (np.array([features.get(f, 0.0) for f in self.features]) - self.mean) / self.scale
+        y = np.append(x, 1.0) @ np.array(self.weights)
+        return {target: float(value) for target, value in zip(_TARGETS, y)}
+
+
+@dataclass
+class Prediction:
+    features: dict[str, float]
+    threshold: int
+    confidence_score: float | None = None    # None until a model has been trained
+    seo_checks_passed: float | None = None
+    error: float | None = None               # the model's CV RMSE on confidence_score
+    path: str = "full"                       # "light" | "full"
+
+
+@dataclass
+class _Accuracy:
+    errors: deque = field(default_factory=lambda: deque(maxlen=_ACCURACY_WINDOW))
+    light: deque = field(default_factory=lambda: deque(maxlen=_ACCURACY_WINDOW))   # light path fell short?
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_accuracy = _Accuracy()
+
+
+def routing_mode() -> str:
+    mode = os.environ.get("CONFIDENCE_ROUTING", "off").strip().lower()
+    return mode if mode in ("shadow", "on") else "off"
+
+
+def available() -> bool:
+    return np is not None
+
+
+def features_for(draft: ContentDraft) -> dict[str, float]:
+    features = draft_features(draft.title, draft.excerpt, draft.content, draft.focus_keyphrase)
+    features[f"structure:{draft.structure_used or 'unknown'}"] = 1.0
+    return features
+
+
+def predict(draft: ContentDraft, threshold: int) -> Prediction | None:
+    """The predicted revision outcome and path for draft; None when routing is off."""
+    mode = routing_mode()
+    if mode == "off":
+        return None
+    prediction = Prediction(features=features_for(draft), threshold=threshold)
+    model = load_model()
+    if model is None:
+        return prediction
+    outcome = model.predict(prediction.features)
+    prediction.confidence_score = round(outcome["confidence_score"], 1)
+    prediction.seo_checks_passed = round(outcome["seo_checks_passed"], 1)
+    prediction.error = model.rmse["confidence_score"]
+    if mode == "on" and prediction.confidence_score - _LIGHT_MARGIN * prediction.error >= threshold:
+        prediction.path = "light"
+    current_span().set_attributes({
+        "confidence.predicted": prediction.confidence_score,
+        "confidence.error": prediction.error,
+        "confidence.path": prediction.path,
+    })
+    logger.info(
+        "[confidence] predicted %.0f ±%.1f (%.1f checks) → %s path",
+        prediction.confidence_score, prediction.error, prediction.seo_checks_passed, prediction.path,
+    )
+    return prediction
+
+
+def record_outcome(prediction: Prediction, confidence_score: int, seo_checks_passed: int, queue_id: str) -> None:
+    """Log the prediction against the actual revision outcome and keep the sample for training."""
+    if prediction.confidence_score is not None:
+        error = confidence_score - prediction.confidence_score
+        fell_short = prediction.path == "light" and confidence_score < prediction.threshold
+        with _accuracy.lock:
+            _accuracy.errors.append(error)
+            if prediction.path == "light":
+                _accuracy.light.append(fell_short)
+        current_span().set_attributes({"confidence.actual": confidence_score, "confidence.residual": error})
+        logger.info(
+            "[confidence] predicted %.0f, actual %d (error %+.1f, %s path%s)",
+            prediction.confidence_score, confidence_score, error, prediction.path,
+            ", below threshold" if fell_short else "",
+        )
+    sample = {
+        "queue_id": queue_id,
+        "features": prediction.features,
+        "confidence_score": confidence_score,
+        "seo_checks_passed": seo_checks_passed,
+        "path": prediction.path,
+        "predicted": prediction.confidence_score,
+    }
+    try:
+        with _samples_lock:
+            path = _samples_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(sample, separators=(",", ":")) + "\n")
+    except OSError as exc:
+        logger.warning("[confidence] could not record sample: %s", exc)
+
+
+def accuracy() -> dict[str, Any]:
+    """Rolling accuracy of recent predictions, for /health."""
+    with _accuracy.lock:
+        errors = list(_accuracy.errors)
+        light = list(_accuracy.light)
+    report: dict[str, Any] = {"mode": routing_mode(), "predictions": len(errors)}
+    if errors:
+        report["mae"] = round(sum(abs(e) for e in errors) / len(errors), 1)
+        report["bias"] = round(sum(errors) / len(errors), 1)
+    if light:
+        report["light_path"] = len(light)
+        report["light_below_threshold"] = sum(light)
+    return report
+
+
+# ── Model storage ──────────────────────────────────────────────────────────────
+
+def load_model() -> ConfidenceModel | None:
+    """The current tenant's trained model, reloaded when the file changes; None without one."""
+    if not available():
+        return None
+    tenant_id = current_tenant().id
+    path = _model_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    with _models_lock:
+        cached = _models.get(tenant_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        model: ConfidenceModel | None = None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != _VERSION:
+                raise ValueError(f"unsupported version {data.get('version')}")
+            model = ConfidenceModel(**data["model"])
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("[confidence] ignoring unreadable %s: %s", path, exc)
+        _models[tenant_id] = (mtime, model)
+        return model
+
+
+def save_model(model: ConfidenceModel) -> Path:
+    """Write to a temp file and rename, so the pipeline never reads a half-written model."""
+    path = _model_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": _VERSION, "model": asdict(model)}, f, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+def _model_dir() -> Path:
+    return Path(os.environ.get("CONFIDENCE_MODEL_DIR") or _MODEL_DIR)
+
+
+def _model_path() -> Path:
+    return _model_dir() / f"{current_tenant().id}.json"
+
+
+def _samples_path() -> Path:
+    return _model_dir() / f"{current_tenant().id}.samples.jsonl"
+
+
+# ── Training ───────────────────────────────────────────────────────────────────
+
+def training_rows() -> list[tuple[dict[str, float], tuple[float, float]]]:
+    """(features, (confidence_score, seo_checks_passed)) for full-audit runs with a known outcome.
+
+    Recorded samples come first; automation_logs rows fill in runs from before
+    recording started (or from other instances) when the queue row still holds
+    the pre-revision draft.
+    """
+    rows: list[tuple[dict[str, float], tuple[float, float]]] = []
+    seen: set[str] = set()
+    path = _samples_path()
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                sample = json.loads(line)
+                seen.add(sample.get("queue_id") or "")  # also keeps light-path runs out of the history rows
+                if sample.get("path") == "light":
+                    continue  # revised by the patch path the model chose — not a full-audit outcome
+                rows.append((sample["features"], (float(sample["confidence_score"]), float(sample["seo_checks_passed"]))))
+            except (ValueError, KeyError, TypeError):
+                continue
+    logger.info("[confidence] %d recorded samples", len(rows))
+    rows.extend(_history_rows(seen))
+    return rows
+
+
+def _history_rows(seen: set[str]) -> list[tuple[dict[str, float], tuple[float, float]]]:
+    from agents.content import _validate
+    from services import supabase_client as db
+
+    outcomes = [
+        r for r in db.iter_log_outcomes()
+        if r.get("seo_checks_passed") is not None and r.get("queue_id") not in seen
+    ]
+    if not outcomes:
+        return []
+    drafts = {r["id"]: r["draft"] for r in db.iter_queue_rows(("draft",)) if r.get("draft")}
+
+    rows: list[tuple[dict[str, float], tuple[float, float]]] = []
+    for outcome in outcomes:
+        stored = drafts.get(outcome.get("queue_id") or "")
+        if stored is None:
+            continue  # only the revised post survives — its features would overstate the draft
+        try:
+            draft = _validate(stored)
+        except RuntimeError:
+            continue
+        rows.append((features_for(draft), (float(outcome["confidence_score"]), float(outcome["seo_checks_passed"]))))
+    logger.info("[confidence] %d samples from automation_logs (%d outcomes)", len(rows), len(outcomes))
+    return rows
+
+
+def train(rows: list[tuple[dict[str, float], tuple[float, float]]], alpha: float = _RIDGE_ALPHA) -> ConfidenceModel:
+    """Fit a ridge regression on standardised features; RMSE is from k-fold cross-validation."""
+    if not available():
+        raise RuntimeError("the confidence predictor needs numpy")
+    if len(rows) < _MIN_SAMPLES:
+        raise RuntimeError(f"need at least {_MIN_SAMPLES} samples to train, have {len(rows)}")
+
+    names = sorted({name for features, _ in rows for name in features})
+    x = np.array([[features.get(n, 0.0) for n in names] for features, _ in rows], dtype=np.float64)
+    y = np.array([targets for _, targets in rows], dtype=np.float64)
+
+    folds = np.arange(len(rows)) % _FOLDS
+    np.random.default_rng(0).shuffle(folds)
+    squared = np.zeros(len(_TARGETS))
+    for fold in range(_FOLDS):
+        test = folds == fold
+        mean, scale, weights = _fit(x[~test], y[~test], alpha)
+        predicted = np.column_stack([(x[test] - mean) / scale, np.ones(test.sum())]) @ weights
+        squared += ((predicted - y[test]) ** 2).sum(axis=0)
+    rmse = np.sqrt(squared / len(rows))
+
+    mean, scale, weights = _fit(x, y, alpha)
+    return ConfidenceModel(
+        features=names,
+        mean=mean.tolist(),
+        scale=scale.tolist(),
+        weights=weights.tolist(),
+        rmse={target: round(float(e), 2) for target, e in zip(_TARGETS, rmse)},
+        samples=len(rows),
+        trained_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+
+
+def _fit(x: np.ndarray, y: np.ndarray, alpha: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Closed-form ridge on standardised x; the intercept (last row of weights) isn't penalised."""
+    mean = x.mean(axis=0)
+    scale = x.std(axis=0)
+    scale[scale == 0] = 1.0
+    z = (x - mean) / scale
+    y_mean = y.mean(axis=0)
+    coef = np.linalg.solve(z.T @ z + alpha * np.eye(z.shape[1]), z.T @ (y - y_mean))
+    return mean, scale, np.vstack([coef, y_mean])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Train or inspect the local confidence predictor.")
+    parser.add_argument("--tenant", help="use this tenant's model and history (fleet mode)")
+    parser.add_argument("--train", action="store_true", help="fit a model from recorded samples + automation_logs")
+    parser.add_argument("--report", action="store_true", help="print the current model's accuracy and weights")
+    parser.add_argument("--alpha", type=float, default=_RIDGE_ALPHA, help="ridge penalty")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    with use_tenant(args.tenant):
+        if args.train:
+            model = train(training_rows(), args.alpha)
+            print(f"Trained on {model.samples} samples → {save_model(model)}")
+        else:
+            model = load_model()
+        if model is None:
+            print(f"No model at {_model_path()} — run with --train")
+            return
+        print(f"{model.samples} samples, trained {model.trained_at}")
+        for target, error in model.rmse.items():
+            print(f"  {target}: CV RMSE {error}")
+        if args.report:
+            ranked = sorted(zip(model.features, model.weights), key=lambda fw: -abs(fw[1][0]))
+            print("  weights (confidence per std. dev.):")
+            for name, row in ranked:
+                if not math.isclose(row[0], 0.0, abs_tol=0.05):
+                    print(f"    {row[0]:+7.2f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,25 @@
 """Content agent — generates the first SEO-optimised blog post draft."""
 from __future__ import annotations
 
-import json
-import os
+import contextvars
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
-from openai import OpenAI
+from prompts.content_prompt import (
+    build_content_system_prompt,
+    build_content_user_prompt,
+    build_outline_system_prompt,
+    build_outline_user_prompt,
+    build_section_system_prompt,
+    build_section_user_prompt,
+)
+from services.llm import chat_completion
+from services.structured_output import dataclass_schema, object_schema, parse_json, response_format
+from services.token_budget import trim_items
 
-from prompts.content_prompt import build_content_system_prompt, build_content_user_prompt
-
-_client: OpenAI | None = None
-
-
-def _openai() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    return _client
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -30,20 +33,52 @@ class ContentDraft:
     word_count: int = 0
 
 
+@dataclass
+class OutlineSection:
+    heading: str
+    brief: str
+    word_budget: int
+    include_keyphrase: bool
+    link_plan: str
+
+
+@dataclass
+class Outline:
+    title: str
+    excerpt: str
+    opening: str
+    sections: list[OutlineSection]
+    closing: str
+    tags: list[str]
+
+
+_RESPONSE_FORMAT = response_format("content_draft", dataclass_schema(ContentDraft))
+_OUTLINE_FORMAT = response_format("post_outline", dataclass_schema(Outline))
+_SECTION_FORMAT = response_format("post_section", object_schema(html={"type": "string"}))
+
+_SECTION_ATTEMPTS = 2
+_MAX_SECTION_WORKERS = 6
+
+
 def run_content_agent(
     topic: str,
     focus_keyphrase: str,
     structure_type: str,
     existing_titles: list[str] | None = None,
+    temperature: float | None = None,
+    internal_links: list[tuple[str, str]] | None = None,
 ) -> ContentDraft:
-    response = _openai().chat.completions.create(
-        model="gpt-4o",
-        temperature=0.7,
-        max_tokens=16384,
-        response_format={"type": "json_object"},
+    existing_titles = trim_items(existing_titles or [], "existing_titles", keep="first")
+    overrides = {"temperature": temperature} if temperature is not None else {}
+    response = chat_completion(
+        agent="content",
+        response_format=_RESPONSE_FORMAT,
+        **overrides,
         messages=[
             {"role": "system", "content": build_content_system_prompt()},
-            {"role": "user", "content": build_content_user_prompt(topic, focus_keyphrase, structure_type, existing_titles)},
+            {"role": "user", "content": build_content_user_prompt(
+                topic, focus_keyphrase, structure_type, existing_titles, internal_links,
+            )},
         ],
     )
 
@@ -51,12 +86,7 @@ def run_content_agent(
     if not raw:
         raise RuntimeError("Content agent returned empty response")
 
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        raise RuntimeError(f"Content agent returned invalid JSON: {raw[:200]}")
-
-    return _validate(parsed)
+    return _validate(parse_json(raw, "Content agent"))
 
 
 def _validate(data: object) -> ContentDraft:
@@ -96,3 +126,163 @@ def _validate(data: object) -> ContentDraft:
         structure_used=structure_used,
         word_count=word_count,
     )
+
+
+def run_sectioned_content_agent(
+    topic: str,
+    focus_keyphrase: str,
+    structure_type: str,
+    existing_titles: list[str] | None = None,
+    temperature: float | None = None,
+    internal_links: list[tuple[str, str]] | None = None,
+) -> ContentDraft:
+    """Two-phase draft: one outline call, then every H2 section written concurrently.
+
+    The opening, title, excerpt and closing come from the outline, so keyphrase
+    placement and the answer-first paragraph are fixed before any section is
+    written; sections are assembled locally in outline order.
+    """
+    existing_titles = trim_items(existing_titles or [], "existing_titles", keep="first")
+    overrides = {"temperature": temperature} if temperature is not None else {}
+    response = chat_completion(
+        agent="outline",
+        response_format=_OUTLINE_FORMAT,
+        **overrides,
+        messages=[
+            {"role": "system", "content": build_outline_system_prompt()},
+            {"role": "user", "content": build_outline_user_prompt(
+                topic, focus_keyphrase, structure_type, existing_titles, internal_links,
+            )},
+        ],
+    )
+
+    raw = response.choices[0].message.content
+    if not raw:
+        raise RuntimeError("Outline agent returned empty response")
+    outline = _validate_outline(parse_json(raw, "Outline agent"))
+
+    headings = [s.heading for s in outline.sections]
+    with ThreadPoolExecutor(
+        max_workers=min(len(outline.sections), _MAX_SECTION_WORKERS),
+        thread_name_prefix="section",
+    ) as pool:
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,  # keep the tenant in each worker
+                _write_section, outline, headings, i, focus_keyphrase, overrides,
+            )
+            for i in range(len(outline.sections))
+        ]
+        sections = [f.result() for f in futures]
+
+    closing = outline.closing.strip()
+    if closing and not closing.startswith("<"):
+        closing = f"<p>{closing}</p>"
+    content = "\n\n".join([outline.opening.strip(), *sections, closing]).strip()
+    word_count = len(re.sub(r"<[^>]+>", " ", content).split())
+    logger.info("[content] sectioned draft: %d sections, %d words", len(sections), word_count)
+
+    return ContentDraft(
+        title=outline.title,
+        excerpt=outline.excerpt,
+        content=content,
+        tags=outline.tags,
+        focus_keyphrase=focus_keyphrase,
+        structure_used=structure_type,
+        word_count=word_count,
+    )
+
+
+def _write_section(
+    outline: Outline,
+    headings: list[str],
+    index: int,
+    focus_keyphrase: str,
+    overrides: dict[str, float],
+) -> str:
+    section = outline.sections[index]
+    messages = [
+        {"role": "system", "content": build_section_system_prompt()},
+        {
+            "role": "user",
+            "content": build_section_user_prompt(
+                outline.title,
+                outline.opening,
+                headings,
+                index,
+                section.brief,
+                section.word_budget,
+                focus_keyphrase,
+                section.include_keyphrase,
+                section.link_plan,
+            ),
+        },
+    ]
+
+    last_exc: Exception | None = None
+    for _attempt in range(_SECTION_ATTEMPTS):
+        try:
+            response = chat_completion(agent="section", response_format=_SECTION_FORMAT, messages=messages, **overrides)
+            raw = response.choices[0].message.content
+            if not raw:
+                raise RuntimeError(f"Section agent returned empty response for section {index + 1}")
+            parsed = parse_json(raw, "Section agent")
+            html = parsed.get("html", "") if isinstance(parsed, dict) else ""
+            if not isinstance(html, str) or not html.strip():
+                raise RuntimeError(f"Section agent: missing html for section {index + 1}")
+            html = html.strip()
+            if not html.lower().startswith("<h2"):
+                html = f"<h2>{section.heading}</h2>\n{html}"
+            return html
+        except RuntimeError as exc:
+            last_exc = exc
+            logger.warning("[content] section %d attempt failed: %s", index + 1, str(exc)[:200])
+    raise last_exc  # type: ignore[misc]
+
+
+def _validate_outline(data: object) -> Outline:
+    if not isinstance(data, dict):
+        raise RuntimeError("Outline agent: response is not an object")
+
+    for key in ("title", "excerpt", "opening"):
+        value = data.get(key, "")
+        if not isinstance(value, str) or not value.strip():
+            raise RuntimeError(f"Outline agent: missing or empty {key}")
+
+    raw_sections = data.get("sections")
+    if not isinstance(raw_sections, list) or not raw_sections:
+        raise RuntimeError("Outline agent: missing sections")
+
+    sections: list[OutlineSection] = []
+    for i, item in enumerate(raw_sections):
+        if not isinstance(item, dict):
+            raise RuntimeError(f"Outline agent: section {i} is not an object")
+        heading = item.get("heading", "")
+        if not isinstance(heading, str) or not heading.strip():
+            raise RuntimeError(f"Outline agent: section {i} missing heading")
+        budget = item.get("word_budget", 0)
+        budget = round(float(budget)) if isinstance(budget, (int, float)) else 0
+        sections.append(OutlineSection(
+            heading=heading.strip(),
+            brief=str(item.get("brief", "")).strip(),
+            word_budget=max(150, budget or 330),
+            include_keyphrase=bool(item.get("include_keyphrase", False)),
+            link_plan=str(item.get("link_plan", "none")),
+        ))
+
+    tags = data.get("tags", [])
+    if not isinstance(tags, list) or len(tags) == 0:
+        raise RuntimeError("Outline agent: missing or empty tags")
+
+    opening = data["opening"].strip()
+    if not opening.lower().startswith("<p"):
+        opening = f"<p>{opening}</p>"
+
+    return Outline(
+        title=data["title"].strip(),
+        excerpt=data["excerpt"].strip(),
+        opening=opening,
+        sections=sections,
+        closing=str(data.get("closing", "")).strip(),
+        tags=[str(t) for t in tags],
+    )
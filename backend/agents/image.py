@@ -1,4 +1,4 @@
-"""Image agent — Gemini / DALL-E image generation + upload."""
+"""Image agent — Gemini / DALL-E cover image generation (uploaded by the pipeline's upload stage)."""
 from __future__ import annotations
 
 import base64
@@ -7,7 +7,11 @@ import os
 import random
 import re
 
-from services.upload_api import upload_image
+from services import deadline, image_score
+from services.image_score import ImageScore
+from services.rate_limit import rate_limiter
+from services.tenants import current_tenant
+from services.tracing import mark_error, span
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +21,12 @@ _GEMINI_MODELS = [
     "gemini-2.0-flash-exp-image-generation",
 ]
 
+# Per-call timeouts (seconds), capped further by the run deadline
+_GEMINI_TIMEOUT = 120.0
+_DALLE_TIMEOUT = 120.0
+
+# Generations tried (each with a fresh scene) before settling for, or rejecting, the best candidate
+_QUALITY_ATTEMPTS = 2
 
 # ── Product specification ──────────────────────────────────────────────────────
 
@@ -83,6 +93,13 @@ _SCENES: dict[str, list[str]] = {
     ],
 }
 
+_VISUAL_STYLE = """- Minimal luxury editorial — high-end skincare brand meets thoughtful design magazine
+- Muted warm palette: cream (#FAF8F3), warm beige, soft black, honey gold accents
+- No text overlays, no people, no faces
+- Cinematic stillness — the mood of a slow, intentional Sunday morning
+- Photographic realism, not illustration or graphic design
+- 16:9 aspect ratio, full bleed, no borders or vignette"""
+
 # ── Mood detection ─────────────────────────────────────────────────────────────
 
 _MOOD_MAP = {
@@ -113,91 +130,150 @@ def _detect_mood(title: str, excerpt: str) -> str:
 
 # ── Gemini image generation ───────────────────────────────────────────────────
 
-def _try_gemini(prompt: str, mood: str, scene_key: str) -> bytes | None:
-    """Try Gemini models for image generation. Returns image bytes or None."""
+def _try_gemini(prompt: str, mood: str, scene_key: str, candidates: int = 1) -> list[bytes]:
+    """Try Gemini models for image generation. Returns every image in the first successful response."""
     try:
         from google import genai
         from google.genai import types
     except ImportError:
         logger.warning("[image] google-genai not installed, skipping Gemini")
-        return None
+        return []
 
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         logger.warning("[image] GEMINI_API_KEY not set, skipping Gemini")
-        return None
+        return []
 
-    client = genai.Client(api_key=api_key)
+    from services.providers import gemini_client
+    client = gemini_client()
 
     for model in _GEMINI_MODELS:
-        try:
-            logger.info("[image] trying Gemini model=%s mood=%s scene=%s", model, mood, scene_key)
-            response = client.models.generate_content(
-                model=model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_modalities=["IMAGE", "TEXT"],
-                ),
-            )
-
-            for candidate in response.candidates or []:
-                for part in (candidate.content.parts if candidate.content else []) or []:
-                    inline = getattr(part, "inline_data", None)
-                    if inline and inline.data:
-                        raw = inline.data
-                        image_bytes = raw if isinstance(raw, bytes) else bytes(raw)
-                        logger.info("[image] Gemini success model=%s bytes=%d", model, len(image_bytes))
-                        return image_bytes
-        except Exception as exc:
-            logger.warning("[image] Gemini model=%s failed: %s", model, exc)
-            continue
-
-    return None
+        with span(
+            "image.gemini",
+            **{"gen_ai.system": "gemini", "gen_ai.request.model": model, "image.mood": mood, "image.scene": scene_key},
+        ) as current:
+            try:
+                logger.info("[image] trying Gemini model=%s mood=%s scene=%s", model, mood, scene_key)
+                rate_limiter().acquire("gemini", model)
+                extra = {"candidate_count": candidates} if candidates > 1 else {}
+                timeout = deadline.timeout(_GEMINI_TIMEOUT, f"Gemini {model}")
+                response = client.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        response_modalities=["IMAGE", "TEXT"],
+                        http_options=types.HttpOptions(timeout=int(timeout * 1000)),
+                        **extra,
+                    ),
+                )
+
+                images: list[bytes] = []
+                for candidate in response.candidates or []:
+                    for part in (candidate.content.parts if candidate.content else []) or []:
+                        inline = getattr(part, "inline_data", None)
+                        if inline and inline.data:
+                            raw = inline.data
+                            images.append(raw if isinstance(raw, bytes) else bytes(raw))
+                if images:
+                    logger.info("[image] Gemini success model=%s images=%d bytes=%d",
+                                model, len(images), sum(len(i) for i in images))
+                    current.set_attributes({"image.bytes": sum(len(i) for i in images), "image.count": len(images)})
+                    return images
+                mark_error(current, "no image in response")
+            except deadline.DeadlineExceeded:
+                raise
+            except Exception as exc:
+                current.record_exception(exc)
+                mark_error(current, type(exc).__name__)
+                logger.warning("[image] Gemini model=%s failed: %s", model, exc)
+                continue
+
+    return []
 
 
 # ── DALL-E 3 fallback ─────────────────────────────────────────────────────────
 
-def _try_dalle(prompt: str) -> bytes | None:
-    """Try DALL-E 3 for image generation. Returns image bytes or None."""
+def _try_dalle(prompt: str) -> list[bytes]:
+    """Try DALL-E 3 for image generation (one image per call). Returns [image bytes] or []."""
     try:
-        from openai import OpenAI
+        import openai  # noqa: F401
     except ImportError:
         logger.warning("[image] openai not installed, skipping DALL-E")
-        return None
+        return []
 
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         logger.warning("[image] OPENAI_API_KEY not set, skipping DALL-E")
-        return None
+        return []
 
-    try:
-        logger.info("[image] trying DALL-E 3 fallback")
-        client = OpenAI(api_key=api_key)
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1792x1024",
-            quality="standard",
-            response_format="b64_json",
-            n=1,
-        )
-
-        b64_data = response.data[0].b64_json
-        if b64_data:
-            image_bytes = base64.b64decode(b64_data)
-            logger.info("[image] DALL-E 3 success bytes=%d", len(image_bytes))
-            return image_bytes
-    except Exception as exc:
-        logger.warning("[image] DALL-E 3 failed: %s", exc)
-
-    return None
+    with span("image.dalle", **{"gen_ai.system": "openai", "gen_ai.request.model": "dall-e-3"}) as current:
+        try:
+            logger.info("[image] trying DALL-E 3 fallback")
+            from services.providers import openai_client
+            client = openai_client()
+            rate_limiter().acquire("openai", "dall-e-3")
+            response = client.images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size="1792x1024",
+                quality="standard",
+                response_format="b64_json",
+                n=1,
+                timeout=deadline.timeout(_DALLE_TIMEOUT, "DALL-E 3"),
+            )
+
+            b64_data = response.data[0].b64_json
+            if b64_data:
+                image_bytes = base64.b64decode(b64_data)
+                logger.info("[image] DALL-E 3 success bytes=%d", len(image_bytes))
+                current.set_attribute("image.bytes", len(image_bytes))
+                return [image_bytes]
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as exc:
+            current.record_exception(exc)
+            mark_error(current, type(exc).__name__)
+            logger.warning("[image] DALL-E 3 failed: %s", exc)
+
+    return []
 
 
 # ── Agent ──────────────────────────────────────────────────────────────────────
 
-def run_image_agent(title: str, excerpt: str) -> str:
-    """Generate a cover image and return its public URL."""
+def generate_cover_image(title: str, excerpt: str) -> bytes:
+    """Generate cover image candidates and return the chosen image's bytes (not uploaded).
+
+    With the quality gate on, candidates are scored locally against the brand
+    palette and the best one is chosen; if none passes the thresholds, a new
+    scene is generated once more. IMAGE_QUALITY_GATE=rank then returns the best
+    candidate seen, reject fails the stage instead.
+    """
     mood = _detect_mood(title, excerpt)
+    palette = _palette()
+    gate = _quality_gate() if palette is not None else "off"
+
+    best: tuple[ImageScore, bytes] | None = None
+    for attempt in range(1, _QUALITY_ATTEMPTS + 1):
+        candidates = _generate_candidates(title, mood)
+        if gate == "off":
+            return candidates[0]
+        ranked = _rank_candidates(candidates, palette)
+        if ranked is None:
+            return candidates[0]
+        if best is None or ranked[0][0].total > best[0].total:
+            best = ranked[0]
+        if best[0].passed:
+            break
+        logger.warning("[image] attempt %d: no candidate passed (%s)", attempt, "; ".join(best[0].reasons))
+
+    assert best is not None
+    score, image_bytes = best
+    if not score.passed and gate == "reject":
+        raise RuntimeError(f"Image agent: no on-brand image in {_QUALITY_ATTEMPTS} attempts ({'; '.join(score.reasons)})")
+    return image_bytes
+
+
+def _generate_candidates(title: str, mood: str) -> list[bytes]:
     scene_key = random.choice(_SCENE_MAP[mood])
     scene = random.choice(_SCENES[scene_key])
     lighting = random.choice(_LIGHTING)
@@ -207,16 +283,59 @@ def run_image_agent(title: str, excerpt: str) -> str:
     prompt = _build_prompt(title, scene, lighting, surface, include_product)
 
     # 1. Try Gemini models first
-    image_bytes = _try_gemini(prompt, mood, scene_key)
+    images = _try_gemini(prompt, mood, scene_key, _candidate_count())
 
     # 2. Fall back to DALL-E 3
-    if image_bytes is None:
-        image_bytes = _try_dalle(prompt)
+    if not images:
+        images = _try_dalle(prompt)
 
-    if image_bytes is None:
+    if not images:
         raise RuntimeError("Image agent: all providers failed (Gemini + DALL-E 3)")
+    return images
+
 
-    return upload_image(image_bytes, "image/png")
+def _rank_candidates(images: list[bytes], palette: dict[str, str]) -> list[tuple[ImageScore, bytes]] | None:
+    """Candidates scored in the process pool, best first; None if scoring itself failed."""
+    with span("image.score", **{"image.count": len(images)}) as current:
+        try:
+            scores = image_score.score_images(images, palette)
+        except Exception as exc:
+            current.record_exception(exc)
+            logger.warning("[image] scoring failed, using the first candidate: %s", exc)
+            return None
+        ranked = sorted(zip(scores, images), key=lambda pair: pair[0].total, reverse=True)
+        for score, _image in ranked:
+            logger.info(
+                "[image] candidate score %.1f palette %.2f brightness %.0f contrast %.1f text %.2f%s",
+                score.total, score.palette, score.brightness, score.contrast, score.text,
+                "" if score.passed else f" — {'; '.join(score.reasons)}",
+            )
+        current.set_attributes({"image.best_score": ranked[0][0].total, "image.passed": ranked[0][0].passed})
+    return ranked
+
+
+def _quality_gate() -> str:
+    """IMAGE_QUALITY_GATE=rank (default) | reject | off; off when numpy / Pillow aren't installed."""
+    gate = os.environ.get("IMAGE_QUALITY_GATE", "rank").strip().lower()
+    return gate if gate in ("rank", "reject") and image_score.available() else "off"
+
+
+def _candidate_count() -> int:
+    try:
+        return max(1, int(os.environ.get("IMAGE_CANDIDATES", "1")))
+    except ValueError:
+        return 1
+
+
+def _palette() -> dict[str, str] | None:
+    """The tenant's palette (extra["palette"]); other tenants' images aren't scored against this brand's."""
+    tenant = current_tenant()
+    custom = tenant.extra.get("palette")
+    if isinstance(custom, dict):
+        return {str(k): str(v) for k, v in custom.items()}
+    if isinstance(custom, list):
+        return {f"colour_{i}": str(v) for i, v in enumerate(custom)}
+    return None if not tenant.is_default else dict(image_score.DEFAULT_PALETTE)
 
 
 def _build_prompt(
@@ -226,7 +345,9 @@ def _build_prompt(
     surface: str,
     include_product: bool,
 ) -> str:
-    product_block = f"\n\nPRODUCT (must appear in frame):\n{_PRODUCT_SPEC}" if include_product else ""
+    tenant = current_tenant()
+    product_spec = tenant.product_spec or _PRODUCT_SPEC
+    product_block = f"\n\nPRODUCT (must appear in frame):\n{product_spec}" if include_product else ""
 
     return f"""Cover image for a blog post: "{title}"
 
@@ -235,9 +356,4 @@ SURFACE: {surface}
 LIGHTING: {lighting}{product_block}
 
 VISUAL STYLE:
-- Minimal luxury editorial — high-end skincare brand meets thoughtful design magazine
-- Muted warm palette: cream (#FAF8F3), warm beige, soft black, honey gold accents
-- No text overlays, no people, no faces
-- Cinematic stillness — the mood of a slow, intentional Sunday morning
-- Photographic realism, not illustration or graphic design
-- 16:9 aspect ratio, full bleed, no borders or vignette"""
+{tenant.image_style or _VISUAL_STYLE}"""
@@ -1,23 +1,25 @@
 """Revision agent — audits 15 Yoast SEO checks and returns an improved draft."""
 from __future__ import annotations
 
-import json
-import os
+import logging
+import re
 from dataclasses import dataclass
 
-from openai import OpenAI
-
 from agents.content import ContentDraft
-from prompts.revision_prompt import build_revision_system_prompt, build_revision_user_prompt
-
-_client: OpenAI | None = None
+from prompts.revision_prompt import (
+    build_revision_patch_system_prompt,
+    build_revision_patch_user_prompt,
+    build_revision_system_prompt,
+    build_revision_user_prompt,
+)
+from services.html_patch import EditOp, apply_edits, edits_from_json, numbered_blocks, split_blocks
+from services.llm import chat_completion
+from services.structured_output import dataclass_schema, object_schema, parse_json, response_format
+from services.token_budget import over_budget
 
+logger = logging.getLogger(__name__)
 
-def _openai() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    return _client
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s")
 
 
 @dataclass
@@ -33,12 +35,27 @@ class RevisionResult:
     revision_notes: str
 
 
+@dataclass
+class RevisionPatch:
+    title: str
+    excerpt: str
+    tags: list[str]
+    edits: list[EditOp]
+    confidence_score: int
+    seo_checks_passed: int
+    flagged_issues: list[str]
+    revision_notes: str
+
+
+_RESPONSE_FORMAT = response_format("revision_result", dataclass_schema(RevisionResult))
+_PATCH_FORMAT = response_format("revision_patch", dataclass_schema(RevisionPatch))
+_EXPANSION_FORMAT = response_format("expanded_content", object_schema(content={"type": "string"}))
+
+
 def run_revision_agent(draft: ContentDraft) -> RevisionResult:
-    response = _openai().chat.completions.create(
-        model="gpt-4o",
-        temperature=0.3,
-        max_tokens=16384,
-        response_format={"type": "json_object"},
+    response = chat_completion(
+        agent="revision",
+        response_format=_RESPONSE_FORMAT,
         messages=[
             {"role": "system", "content": build_revision_system_prompt()},
             {
@@ -58,12 +75,62 @@ def run_revision_agent(draft: ContentDraft) -> RevisionResult:
     if not raw:
         raise RuntimeError("Revision agent returned empty response")
 
+    return _validate(parse_json(raw, "Revision agent"))
+
+
+def run_patch_revision_agent(draft: ContentDraft) -> RevisionResult:
+    """Audit the draft but apply the fixes as targeted edits instead of a full rewrite.
+
+    Falls back to run_revision_agent when the patch can't be parsed or doesn't
+    apply cleanly to the document.
+    """
     try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        raise RuntimeError(f"Revision agent returned invalid JSON: {raw[:200]}")
+        return _run_patch_revision(draft)
+    except RuntimeError as exc:
+        logger.warning("[revision] patch revision failed (%s) — falling back to full rewrite", str(exc)[:200])
+        return run_revision_agent(draft)
+
+
+def _run_patch_revision(draft: ContentDraft) -> RevisionResult:
+    blocks = split_blocks(draft.content)
+    if not blocks:
+        raise RuntimeError("Patch revision: content has no HTML blocks")
+
+    response = chat_completion(
+        agent="revision",
+        response_format=_PATCH_FORMAT,
+        messages=[
+            {"role": "system", "content": build_revision_patch_system_prompt()},
+            {
+                "role": "user",
+                "content": build_revision_patch_user_prompt(
+                    draft.title,
+                    draft.excerpt,
+                    numbered_blocks(blocks),
+                    draft.tags,
+                    draft.focus_keyphrase,
+                    _count_words(draft.content),
+                ),
+            },
+        ],
+    )
+
+    raw = response.choices[0].message.content
+    if not raw:
+        raise RuntimeError("Revision agent returned empty response")
 
-    return _validate(parsed)
+    parsed = parse_json(raw, "Revision agent")
+    edits = edits_from_json(parsed.get("edits") if isinstance(parsed, dict) else None)
+    content = apply_edits(draft.content, edits)
+    logger.info("[revision] applied %d edit(s) to %d block(s)", len(edits), len(blocks))
+
+    # Reuse the full-result validation for title/excerpt/scores
+    return _validate({
+        **parsed,
+        "content": content,
+        "word_count": _count_words(content),
+        "revision_notes": f"[patch: {len(edits)} edit(s)] {parsed.get('revision_notes', '')}".strip(),
+    })
 
 
 def expand_content(
@@ -77,28 +144,59 @@ def expand_content(
 
     Returns the full HTML body with new sections inserted before the closing.
     Does NOT rewrite existing content — only appends new material.
+
+    A document over the expand_document token budget is sent as a digest
+    (headings and each paragraph's first sentence); the model then returns only
+    the new sections, which are inserted before the closing block locally.
     """
-    words_needed = target_word_count - current_word_count
+    digest_mode = over_budget(content, "expand_document")
+    if digest_mode:
+        messages = _expansion_digest_messages(content, title, focus_keyphrase, current_word_count, target_word_count)
+    else:
+        messages = _expansion_messages(content, title, focus_keyphrase, current_word_count, target_word_count)
+
+    response = chat_completion(
+        agent="expansion",
+        response_format=_EXPANSION_FORMAT,
+        messages=messages,
+    )
 
-    response = _openai().chat.completions.create(
-        model="gpt-4o",
-        temperature=0.7,
-        max_tokens=16384,
-        response_format={"type": "json_object"},
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a content expansion specialist. Your job is to ADD new, "
-                    "substantive sections to an existing blog post to increase its word count. "
-                    "You must NOT rewrite, shorten, or remove any existing content. "
-                    "Keep the same brand voice: calm, minimal, philosophical. "
-                    "No FAQ sections. No generic CTA paragraphs."
-                ),
-            },
-            {
-                "role": "user",
-                "content": f"""The blog post below is {current_word_count} words. It needs to be at least {target_word_count} words.
+    raw = response.choices[0].message.content
+    if not raw:
+        raise RuntimeError("Expand content: empty response")
+
+    parsed = parse_json(raw, "Expand content")
+    expanded = parsed.get("content", "") if isinstance(parsed, dict) else ""
+    if not isinstance(expanded, str) or not expanded.strip():
+        raise RuntimeError("Expand content: missing content in response")
+
+    if digest_mode:
+        return _insert_before_closing(content, expanded.strip())
+    return expanded.strip()
+
+
+def _expansion_messages(
+    content: str,
+    title: str,
+    focus_keyphrase: str,
+    current_word_count: int,
+    target_word_count: int,
+) -> list[dict[str, str]]:
+    words_needed = target_word_count - current_word_count
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a content expansion specialist. Your job is to ADD new, "
+                "substantive sections to an existing blog post to increase its word count. "
+                "You must NOT rewrite, shorten, or remove any existing content. "
+                "Keep the same brand voice: calm, minimal, philosophical. "
+                "No FAQ sections. No generic CTA paragraphs."
+            ),
+        },
+        {
+            "role": "user",
+            "content": f"""The blog post below is {current_word_count} words. It needs to be at least {target_word_count} words.
 You must add approximately {words_needed}+ words of NEW content.
 
 Title: {title}
@@ -117,24 +215,72 @@ INSTRUCTIONS:
 
 Return ONLY valid JSON:
 {{"content": "the full HTML body with existing + new content combined"}}""",
-            },
-        ],
-    )
+        },
+    ]
 
-    raw = response.choices[0].message.content
-    if not raw:
-        raise RuntimeError("Expand content: empty response")
 
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        raise RuntimeError(f"Expand content: invalid JSON: {raw[:200]}")
+def _expansion_digest_messages(
+    content: str,
+    title: str,
+    focus_keyphrase: str,
+    current_word_count: int,
+    target_word_count: int,
+) -> list[dict[str, str]]:
+    words_needed = target_word_count - current_word_count
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a content expansion specialist. Your job is to write new, "
+                "substantive sections for an existing blog post to increase its word count. "
+                "You are shown a digest of the post; your sections will be inserted before its closing paragraph. "
+                "Keep the same brand voice: calm, minimal, philosophical. "
+                "No FAQ sections. No generic CTA paragraphs."
+            ),
+        },
+        {
+            "role": "user",
+            "content": f"""The blog post below is {current_word_count} words. It needs to be at least {target_word_count} words.
+You must write approximately {words_needed}+ words of NEW content.
 
-    expanded = parsed.get("content", "")
-    if not isinstance(expanded, str) or not expanded.strip():
-        raise RuntimeError("Expand content: missing content in response")
+Title: {title}
+Focus keyphrase: {focus_keyphrase}
+
+POST DIGEST (headings and the opening sentence of each paragraph — do not repeat these points):
+{_digest(content)}
+
+INSTRUCTIONS:
+1. Write 2–3 NEW <h2> sections with 2–3 paragraphs each, covering angles the post does not already cover
+2. New content should add: research citations (with hyperlinks), real-world examples, ingredient science, practical guidance, or deeper analysis
+3. Weave the focus keyphrase naturally into the new sections (1–2 times)
+4. Use the same HTML formatting: <h2>, <h3>, <p>, inline <a href> citations
+5. Return ONLY the new sections — not the existing post
+
+Return ONLY valid JSON:
+{{"content": "the new sections' HTML only"}}""",
+        },
+    ]
 
-    return expanded.strip()
+
+def _digest(content: str) -> str:
+    lines: list[str] = []
+    for block in split_blocks(content):
+        text = " ".join(re.sub(r"<[^>]+>", " ", block.html).split())
+        if not text:
+            continue
+        if block.tag in ("h1", "h2", "h3", "h4"):
+            lines.append(f"{block.tag.upper()}: {text}")
+        else:
+            lines.append(f"  - {_SENTENCE_SPLIT_RE.split(text, maxsplit=1)[0]}")
+    return "\n".join(lines)
+
+
+def _insert_before_closing(content: str, new_sections: str) -> str:
+    blocks = split_blocks(content)
+    if len(blocks) < 2:
+        return f"{content}\n{new_sections}"
+    closing = blocks[-1]
+    return f"{content[:closing.start]}{new_sections}\n{content[closing.start:]}"
 
 
 def _validate(data: object) -> RevisionResult:
@@ -179,7 +325,7 @@ def _validate(data: object) -> RevisionResult:
     return RevisionResult(
         title=title.strip(),
         excerpt=excerpt.strip(),
-        content=content.strip(),
+        content=content,  # unstripped: a patch revision leaves untouched blocks byte-identical
         tags=[str(t) for t in tags],
         confidence_score=min(100, max(0, round(float(confidence_score)))),
         seo_checks_passed=min(15, max(0, round(float(seo_checks_passed)))),
@@ -187,3 +333,7 @@ def _validate(data: object) -> RevisionResult:
         flagged_issues=[str(i) for i in flagged_issues],
         revision_notes=revision_notes.strip(),
     )
+
+
+def _count_words(html: str) -> int:
+    return len(re.sub(r"<[^>]+>", " ", html).split())
@@ -0,0 +1,181 @@
+"""Local draft scoring — cheap heuristics to rank candidate drafts before revision.
+
+Mirrors the rules the content prompt asks for (length, keyphrase placement,
+links, banned phrases) without a model call, so best-of-K selection costs
+nothing beyond the drafts themselves. seo_checks() evaluates the mechanical
+checks of the 15-point revision audit for the sub-audit revision mode, and
+draft_features() turns a draft into the numeric inputs of the confidence
+predictor (agents/confidence.py).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from agents.content import ContentDraft
+from agents.topic import _KEYWORD_CLUSTERS
+from prompts.content_prompt import _BANNED_PHRASES
+from services.phrase_engine import PhraseMatch, PhraseMatcher
+from services.tenants import current_tenant
+
+_WORD_COUNT_TARGET = 1500
+_AUDIT_WORD_COUNT_MIN = 1500  # check 7 of the revision audit
+
+_HIGH_DA_DOMAINS = (
+    "healthline.com", "webmd.com", "byrdie.com", "wellandgood.com", "vogue.com",
+    "allure.com", "psychologytoday.com", "health.harvard.edu", "hbr.org",
+    "ncbi.nlm.nih.gov", "aad.org", "ewg.org", "forbes.com",
+)
+
+_BANNED_MATCHER = PhraseMatcher(_BANNED_PHRASES)
+_cluster_matchers: dict[tuple[str, ...], PhraseMatcher] = {}
+_HREF_RE = re.compile(r"<a\s[^>]*href=[\"']([^\"']+)[\"']", re.IGNORECASE)
+_FIRST_P_RE = re.compile(r"<p[^>]*>(.*?)</p>", re.IGNORECASE | re.DOTALL)
+_H2_RE = re.compile(r"<h2[^>]*>(.*?)</h2>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_ALT_RE = re.compile(r"\balt=[\"']\s*[^\"'\s][^\"']*[\"']", re.IGNORECASE)
+
+
+@dataclass
+class DraftScore:
+    total: float
+    word_count: int
+    breakdown: dict[str, float] = field(default_factory=dict)
+    banned_phrases: list[str] = field(default_factory=list)
+    keyword_clusters: list[str] = field(default_factory=list)
+
+
+def score_draft(draft: ContentDraft) -> DraftScore:
+    """Score a draft 0–100: length 30, keyphrase placement 30, links 20, banned phrases 20."""
+    text = _TAG_RE.sub(" ", draft.content)
+    words = len(text.split())
+    keyphrase = draft.focus_keyphrase.lower().strip()
+
+    length = 30.0 * min(1.0, words / _WORD_COUNT_TARGET)
+
+    first_p = _FIRST_P_RE.search(draft.content)
+    occurrences = text.lower().count(keyphrase) if keyphrase else 0
+    density = occurrences * len(keyphrase.split()) / words * 100 if words else 0.0
+    placement = 0.0
+    if keyphrase:
+        placement += 8.0 if keyphrase in draft.title.lower() else 0.0
+        placement += 8.0 if first_p and keyphrase in first_p.group(1).lower() else 0.0
+        placement += 7.0 if any(keyphrase in h.lower() for h in _H2_RE.findall(draft.content)) else 0.0
+        placement += 7.0 if 0.5 <= density <= 3.0 else 0.0
+
+    internal, external = _links(draft.content)
+    links = (10.0 if internal else 0.0) + 5.0 * min(2, len(external))
+
+    banned = find_banned_phrases(draft.title + " " + draft.excerpt + " " + text)
+    voice = max(0.0, 20.0 - 5.0 * len(banned))
+
+    breakdown = {"length": length, "keyphrase": placement, "links": links, "voice": voice}
+    return DraftScore(
+        total=round(sum(breakdown.values()), 1),
+        word_count=words,
+        breakdown={k: round(v, 1) for k, v in breakdown.items()},
+        banned_phrases=banned,
+        keyword_clusters=keyword_cluster_hits(draft.content),
+    )
+
+
+def seo_checks(title: str, excerpt: str, content: str, focus_keyphrase: str) -> dict[str, bool]:
+    """The 14 mechanical checks of the revision audit (check 15, answer-first, needs judgment)."""
+    text = _plain(content)
+    words = len(text.split())
+    keyphrase = focus_keyphrase.lower().strip()
+    first_p = _FIRST_P_RE.search(content)
+    h2s = _H2_RE.findall(content)
+    occurrences = text.count(keyphrase) if keyphrase else 0
+    density = occurrences * len(keyphrase.split()) / words * 100 if words else 0.0
+    slug = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+    internal, external = _links(content)
+    images = _IMG_RE.findall(content)
+
+    return {
+        "keyphrase_in_title": bool(keyphrase) and keyphrase in title.lower(),
+        "keyphrase_in_slug": bool(keyphrase) and re.sub(r"[^a-z0-9]+", "-", keyphrase).strip("-") in slug,
+        "keyphrase_in_excerpt": bool(keyphrase) and keyphrase in excerpt.lower(),
+        "keyphrase_in_first_paragraph": bool(first_p) and keyphrase in _plain(first_p.group(1)),
+        "keyphrase_in_h2": any(keyphrase in _plain(h) for h in h2s),
+        "keyphrase_density": 0.5 <= density <= 3.0,
+        "word_count": words >= _AUDIT_WORD_COUNT_MIN,
+        "has_h2": bool(h2s),
+        "title_length": 50 <= len(title) <= 60,
+        "excerpt_length": 150 <= len(excerpt) <= 160,
+        "internal_link": bool(internal),
+        "external_link": bool(external),
+        "high_da_link": any(d in h for h in external for d in _HIGH_DA_DOMAINS),
+        "image_alt_text": all(_ALT_RE.search(img) for img in images),
+    }
+
+
+def draft_features(title: str, excerpt: str, content: str, focus_keyphrase: str) -> dict[str, float]:
+    """Numeric signals of a draft before revision: length, links, keyphrase use, audit checks, voice."""
+    checks = seo_checks(title, excerpt, content, focus_keyphrase)
+    text = _plain(content)
+    words = len(text.split())
+    keyphrase = focus_keyphrase.lower().strip()
+    occurrences = text.count(keyphrase) if keyphrase else 0
+    internal, external = _links(content)
+    placement = ("keyphrase_in_title", "keyphrase_in_excerpt", "keyphrase_in_first_paragraph", "keyphrase_in_h2")
+    return {
+        "words_k": words / 1000,
+        "internal_links": float(len(internal)),
+        "external_links": float(len(external)),
+        "high_da_link": float(checks["high_da_link"]),
+        "keyphrase_density": occurrences * len(keyphrase.split()) / words * 100 if words else 0.0,
+        "keyphrase_placement": float(sum(checks[c] for c in placement)),
+        "h2_count": float(len(_H2_RE.findall(content))),
+        "seo_checks": float(sum(checks.values())),
+        "banned_phrases": float(len(find_banned_phrases(f"{title} {excerpt} {text}"))),
+    }
+
+
+def _links(html: str) -> tuple[list[str], list[str]]:
+    """Lowercased hrefs in html split into (internal, external)."""
+    domain = current_tenant().site_domain.lower()
+    hrefs = [h.lower() for h in _HREF_RE.findall(html)]
+    internal = [h for h in hrefs if h.startswith("/") or (domain and domain in h)]
+    external = [h for h in hrefs if h.startswith("http") and h not in internal]
+    return internal, external
+
+
+def _plain(html: str) -> str:
+    """Lowercased text of html with tags removed and whitespace collapsed."""
+    return " ".join(_TAG_RE.sub(" ", html).split()).lower()
+
+
+def banned_phrase_matches(html: str) -> list[PhraseMatch]:
+    """Every banned phrase in the visible text of html, with offsets into html."""
+    return _BANNED_MATCHER.scan_html(html)
+
+
+def find_banned_phrases(text: str) -> list[str]:
+    return sorted({m.phrase.lower() for m in _BANNED_MATCHER.scan_html(text)})
+
+
+def keyword_cluster_hits(html: str) -> list[str]:
+    """Keyword clusters (the tenant's, or the topic agent's defaults) that appear in html."""
+    clusters = tuple(current_tenant().keyword_clusters or _KEYWORD_CLUSTERS)
+    matcher = _cluster_matchers.get(clusters)
+    if matcher is None:
+        matcher = _cluster_matchers[clusters] = PhraseMatcher(clusters)
+    return sorted({m.phrase for m in matcher.scan_html(html)})
+
+
+def confidence_from_checks(checks_passed: int, flagged_count: int) -> int:
+    """Deterministic version of the revision prompt's scoring rubric."""
+    if checks_passed >= 15:
+        base = 97
+    elif checks_passed >= 13:
+        base = 85 + (checks_passed - 13) * 6
+    elif checks_passed >= 11:
+        base = 72 + (checks_passed - 11) * 7
+    elif checks_passed >= 9:
+        base = 58 + (checks_passed - 9) * 7
+    else:
+        base = 40 + checks_passed * 2
+    return min(100, max(0, base - 2 * flagged_count))
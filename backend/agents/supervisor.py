@@ -2,18 +2,32 @@
 from __future__ import annotations
 
 import logging
+import os
 import time
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 from typing import Callable, TypeVar
 
-from agents.content import run_content_agent, ContentDraft
-from agents.revision import run_revision_agent, expand_content
-from agents.image import run_image_agent
+from agents import confidence
+from agents.audits import run_audited_revision
+from agents.autofix import autofix_banned_phrases
+from agents.content import run_content_agent, run_sectioned_content_agent, ContentDraft
+from agents.revision import RevisionResult, run_revision_agent, run_patch_revision_agent, expand_content
+from agents.image import generate_cover_image
+from agents.scoring import score_draft
 from agents.topic import run_topic_agent
+from services import deadline
 from services import supabase_client as db
-from services.blog_api import create_post
+from services import supabase_async as adb
+from services.blog_api import PostResponse, create_post, find_post
+from services.idempotency import idempotency_key
+from services.post_index import IndexedPost, post_index
+from services.tenants import current_tenant, use_tenant
+from services.stage_graph import Halt, Stage, StageFailed, StageGraph, StageRecord
+from services.tracing import current_span, current_trace_id, mark_error, span
+from services.upload_api import upload_image
 
 T = TypeVar("T")
 
@@ -24,7 +38,13 @@ _WORD_COUNT_TARGET = 1500
 _MAX_RETRIES = 2
 _QUEUE_REPLENISH_THRESHOLD = 6
 _QUEUE_REPLENISH_COUNT = 15
-_MAX_POSTS_PER_DAY = 1
+
+# Related published posts passed to the content agent: titles to avoid, links to suggest
+_RELATED_TITLES = 10
+_INTERNAL_LINK_SUGGESTIONS = 3
+
+# Sampling temperatures for speculative drafts beyond the first (None = route default)
+_DRAFT_TEMPERATURES = (None, 0.9, 0.55, 1.0)
 
 _ALL_STRUCTURES = [
     "deep-dive",
@@ -46,183 +66,450 @@ class PipelineResult:
     seo_checks_passed: int | None = None
     revision_notes: str | None = None
     error: str | None = None
+    tenant_id: str | None = None
+    trace_id: str | None = None
+    timeline: list[dict] | None = None   # per-stage {name, status, start, end[, error]}
 
     def to_dict(self) -> dict:
         return {k: v for k, v in self.__dict__.items() if v is not None}
 
 
-def run_pipeline() -> PipelineResult:
-    """Run one full pipeline iteration synchronously."""
-    # 1. Daily frequency gate — skip if already published/drafted today
-    posts_today = db.count_posts_today()
-    if posts_today >= _MAX_POSTS_PER_DAY:
+class PostMayExist(RuntimeError):
+    """create_post failed after a request was sent, and the lookup that would tell whether
+    the post exists failed too — requeueing could publish the topic twice."""
+
+
+def run_pipeline(
+    on_stage: Callable[[str], None] | None = None,
+    tenant_id: str | None = None,
+    on_dequeue: Callable[[str], None] | None = None,
+) -> PipelineResult:
+    """Run one full pipeline iteration synchronously.
+
+    on_stage, if given, is called with the name of each stage as it starts.
+    on_dequeue, if given, is called with the queue item id once one is claimed.
+    tenant_id runs the iteration for that tenant instead of the current one.
+    """
+    if tenant_id is not None:
+        with use_tenant(tenant_id):
+            result = run_pipeline(on_stage, on_dequeue=on_dequeue)
+        result.tenant_id = tenant_id
+        return result
+
+    with span("pipeline.run", **{"tenant.id": current_tenant().id}) as root, deadline.within(deadline.run_seconds()):
+        result = _run_graph(on_stage, on_dequeue)
+        root.set_attributes({
+            key: value for key, value in (
+                ("pipeline.status", result.status),
+                ("pipeline.confidence_score", result.confidence_score),
+                ("pipeline.post_id", result.post_id),
+            ) if value is not None
+        })
+        if result.status == "error":
+            mark_error(root, result.error or "pipeline error")
+        result.trace_id = current_trace_id()
+    return result
+
+
+def _run_graph(
+    on_stage: Callable[[str], None] | None,
+    on_dequeue: Callable[[str], None] | None = None,
+) -> PipelineResult:
+    try:
+        run = _PIPELINE.run(
+            {"on_dequeue": on_dequeue}, on_start=on_stage, retry=_with_retry, budget=deadline.stage_seconds,
+        )
+    except StageFailed as failed:
+        item: db.QueueItem | None = failed.values.get("item")
+        if item is None:
+            raise failed.error
+        error_message = str(failed.error)
+        if failed.values.get("post") is not None:
+            return _post_publish_failure(failed, item)
+        if isinstance(failed.error, PostMayExist):
+            return _unreconciled_publish(failed, item)
+        if isinstance(failed.error, deadline.DeadlineExceeded):
+            logger.warning("[supervisor] deadline exceeded in %s for %s: %s", failed.stage, item.id, error_message)
+            _checkpoint_draft(item, failed.values.get("draft"))
+        db.update_queue_status(item.id, "pending")  # return to queue
+        try:
+            db.insert_log(
+                queue_id=item.id,
+                post_id=None,
+                status="error",
+                confidence_score=None,
+                seo_checks_passed=None,
+                revision_notes=None,
+                error_message=error_message,
+            )
+        except Exception:
+            pass
         return PipelineResult(
+            status="error", topic=item.topic, error=error_message, timeline=_timeline(failed.timeline),
+        )
+
+    if run.halted is not None:
+        result: PipelineResult = run.halted.result
+        result.timeline = _timeline(run.timeline)
+        return result
+
+    revision: RevisionResult = run.values["revision"]
+    post: PostResponse = run.values["post"]
+    return PipelineResult(
+        status="success" if run.values["published"] else "draft",
+        topic=run.values["item"].topic,
+        post_id=post.id,
+        slug=post.slug,
+        confidence_score=revision.confidence_score,
+        seo_checks_passed=revision.seo_checks_passed,
+        revision_notes=revision.revision_notes,
+        timeline=_timeline(run.timeline),
+    )
+
+
+def _post_publish_failure(failed: StageFailed, item: db.QueueItem) -> PipelineResult:
+    """A bookkeeping stage failed after the post was created: log it, but never requeue the item.
+
+    Returning it to pending would publish the topic a second time on the next run.
+    """
+    post: PostResponse = failed.values["post"]
+    revision: RevisionResult = failed.values["revision"]
+    logger.error(
+        "[supervisor] %s failed after post %s was created for %s: %s",
+        failed.stage, post.id, item.id, str(failed.error)[:200],
+    )
+    return PipelineResult(
+        status="success" if failed.values["published"] else "draft",
+        topic=item.topic,
+        post_id=post.id,
+        slug=post.slug,
+        confidence_score=revision.confidence_score,
+        seo_checks_passed=revision.seo_checks_passed,
+        revision_notes=revision.revision_notes,
+        error=f"{failed.stage}: {failed.error}",
+        timeline=_timeline(failed.timeline),
+    )
+
+
+def _unreconciled_publish(failed: StageFailed, item: db.QueueItem) -> PipelineResult:
+    """The post may or may not exist: hold the item for manual reconciliation instead of requeueing it."""
+    error_message = f"post may exist, reconcile manually: {failed.error}"
+    logger.error("[supervisor] %s for %s", error_message[:300], item.id)
+    db.update_queue_status(item.id, "held", set_processed_at=True)
+    try:
+        db.insert_log(
+            queue_id=item.id,
+            post_id=None,
+            status="error",
+            confidence_score=None,
+            seo_checks_passed=None,
+            revision_notes=None,
+            error_message=error_message,
+        )
+    except Exception:
+        pass
+    return PipelineResult(
+        status="error", topic=item.topic, error=error_message, timeline=_timeline(failed.timeline),
+    )
+
+
+def _timeline(records: list[StageRecord]) -> list[dict]:
+    logger.info("[supervisor] stages: %s", ", ".join(f"{r.name} {r.end - r.start:.1f}s {r.status}" for r in records))
+    return [r.to_dict() for r in sorted(records, key=lambda r: r.start)]
+
+
+# ── Stages ─────────────────────────────────────────────────────────────────────
+# Each stage reads the values named in its inputs and returns its outputs; the
+# graph at the end of this section wires them up, and stages whose inputs are
+# ready run concurrently (services.stage_graph).
+
+def _stage_preflight() -> tuple[int, list[str]] | Halt:
+    # Independent preflight reads run concurrently on the shared async client
+    posts_today, pending, recent_structures = adb.gather(
+        adb.count_posts_today(),
+        adb.count_pending_queue_items(),
+        adb.get_recent_structures(3),
+    )
+
+    # Daily frequency gate — skip if already published/drafted today
+    if posts_today >= current_tenant().max_posts_per_day:
+        return Halt(PipelineResult(
             status="error",
             topic=None,
             error=f"Daily limit reached: {posts_today} post(s) already published today",
-        )
+        ))
+    return pending, recent_structures
 
-    # 2. Auto-replenish queue if running low (fire-and-forget in thread)
-    pending = db.count_pending_queue_items()
-    if pending < _QUEUE_REPLENISH_THRESHOLD:
+
+def _stage_replenish_check(pending_count: int) -> None:
+    """Auto-replenish the queue if running low (fire-and-forget in thread)."""
+    if pending_count < _QUEUE_REPLENISH_THRESHOLD:
         import threading
-        t = threading.Thread(target=_replenish_queue, daemon=True)
+        import contextvars
+        ctx = contextvars.copy_context()  # replenish for this run's tenant
+        t = threading.Thread(target=ctx.run, args=(_replenish_queue,), daemon=True)
         t.start()
 
-    # 3. Dequeue next topic
-    db.reset_in_progress_items()
+
+def _stage_dequeue(on_dequeue: Callable[[str], None] | None) -> db.QueueItem | Halt:
     item = db.dequeue_next_topic()
     if item is None:
-        return PipelineResult(status="error", topic=None, error="No pending topics in queue")
-
-    topic = item.topic
-    focus_keyphrase = item.focus_keyphrase or topic
-
-    # 4. Pick structure (rotate — avoid last 3 used)
-    structure_type = _pick_structure()
-
-    try:
-        # 5. Generate content draft
-        draft: ContentDraft = _with_retry(
-            lambda: run_content_agent(topic, focus_keyphrase, structure_type)
-        )
-
-        # 6. First revision pass — SEO audit + improvements
-        revision = _with_retry(lambda: run_revision_agent(draft))
-        actual_word_count = _count_words(revision.content)
-        logger.info("[supervisor] revision pass 1: %d words, confidence %d", actual_word_count, revision.confidence_score)
-
-        # 7. Expand content until it hits the target (up to 2 expansion passes)
-        expansion_pass = 0
-        current_html = revision.content
-        while actual_word_count < _WORD_COUNT_TARGET and expansion_pass < 2:
-            expansion_pass += 1
-            logger.info(
-                "[supervisor] expansion pass %d: %d → %d words needed",
-                expansion_pass, actual_word_count, _WORD_COUNT_TARGET,
+        return Halt(PipelineResult(status="error", topic=None, error="No pending topics in queue"))
+    if on_dequeue is not None:
+        on_dequeue(item.id)
+    return item
+
+
+def _stage_related(item: db.QueueItem) -> tuple[list[str], list[tuple[str, str]]]:
+    return _related_posts(item.topic, item.focus_keyphrase or item.topic)
+
+
+def _stage_content(
+    item: db.QueueItem,
+    recent_structures: list[str],
+    existing_titles: list[str] | None,
+    internal_links: list[tuple[str, str]] | None,
+) -> ContentDraft:
+    """Draft (best of K when SPECULATIVE_DRAFTS > 1), then delete throat-clearing banned phrases locally."""
+    draft = _prepared_draft(item)
+    if draft is None:
+        topic = item.topic
+        focus_keyphrase = item.focus_keyphrase or topic
+        # Pick structure (rotate — avoid last 3 used)
+        structure_type = _pick_structure(recent_structures)
+        draft_count = _speculative_draft_count()
+        if draft_count > 1:
+            draft = _best_of_drafts(
+                topic, focus_keyphrase, structure_type, recent_structures, draft_count,
+                existing_titles, internal_links,
             )
-            current_html = _with_retry(lambda: expand_content(
-                content=current_html,
-                title=revision.title,
-                focus_keyphrase=draft.focus_keyphrase,
-                current_word_count=actual_word_count,
-                target_word_count=_WORD_COUNT_TARGET,
+        else:
+            write_draft = _content_agent()
+            draft = _with_retry(lambda: write_draft(
+                topic, focus_keyphrase, structure_type, existing_titles, internal_links=internal_links,
             ))
-            actual_word_count = _count_words(current_html)
-            logger.info("[supervisor] expansion pass %d result: %d words", expansion_pass, actual_word_count)
-
-        # 8. Final revision pass if content was expanded — re-audit SEO
-        if expansion_pass > 0:
-            expanded_draft = ContentDraft(
-                title=revision.title,
-                excerpt=revision.excerpt,
-                content=current_html,
-                tags=revision.tags,
-                focus_keyphrase=draft.focus_keyphrase,
-                structure_used=draft.structure_used,
-                word_count=actual_word_count,
-            )
-            revision = _with_retry(lambda: run_revision_agent(expanded_draft))
-            actual_word_count = _count_words(revision.content)
-            logger.info("[supervisor] final revision: %d words, confidence %d", actual_word_count, revision.confidence_score)
-
-        # 9. Hold only if still below hard minimum after expansion
-        if actual_word_count < _WORD_COUNT_MIN or revision.confidence_score < _DRAFT_THRESHOLD:
-            reason_parts: list[str] = []
-            if actual_word_count < _WORD_COUNT_MIN:
-                reason_parts.append(f"word count {actual_word_count} < {_WORD_COUNT_MIN}")
-            if revision.confidence_score < _DRAFT_THRESHOLD:
-                reason_parts.append(f"confidence {revision.confidence_score} < {_DRAFT_THRESHOLD}")
-            reason = "; ".join(reason_parts)
-
-            db.update_queue_status(item.id, "held", set_processed_at=True)
-            db.insert_log(
-                queue_id=item.id,
-                post_id=None,
-                status="held",
-                confidence_score=revision.confidence_score,
-                seo_checks_passed=revision.seo_checks_passed,
-                revision_notes=f"[{reason}] {revision.revision_notes}",
-                error_message=None,
-            )
-            return PipelineResult(
-                status="held",
-                topic=topic,
-                confidence_score=revision.confidence_score,
-                seo_checks_passed=revision.seo_checks_passed,
-                revision_notes=revision.revision_notes,
-            )
-
-        # 10. Generate + upload cover image
-        cover_image_url: str = _with_retry(
-            lambda: run_image_agent(revision.title, revision.excerpt)
+    draft, _fixed = autofix_banned_phrases(draft)
+    return draft
+
+
+def _stage_predict(draft: ContentDraft) -> confidence.Prediction | None:
+    """Predicted revision outcome, choosing the light or full revision path (CONFIDENCE_ROUTING)."""
+    return confidence.predict(draft, _AUTO_PUBLISH_THRESHOLD)
+
+
+def _stage_revision(
+    item: db.QueueItem,
+    draft: ContentDraft,
+    prediction: confidence.Prediction | None,
+) -> RevisionResult:
+    """First revision pass — SEO audit + improvements."""
+    revision = _revision_agent(prediction)(draft)
+    logger.info(
+        "[supervisor] revision pass 1: %d words, confidence %d",
+        _count_words(revision.content), revision.confidence_score,
+    )
+    if prediction is not None:
+        confidence.record_outcome(prediction, revision.confidence_score, revision.seo_checks_passed, item.id)
+    return revision
+
+
+def _stage_expansion(draft: ContentDraft, first_revision: RevisionResult) -> tuple[str, int]:
+    """Expand content until it hits the target (up to 2 passes); returns (html, passes)."""
+    actual_word_count = _count_words(first_revision.content)
+    expansion_pass = 0
+    current_html = first_revision.content
+    while actual_word_count < _WORD_COUNT_TARGET and expansion_pass < 2:
+        expansion_pass += 1
+        logger.info(
+            "[supervisor] expansion pass %d: %d → %d words needed",
+            expansion_pass, actual_word_count, _WORD_COUNT_TARGET,
         )
-
-        # 11. Validate payload
-        _validate_payload(revision, cover_image_url)
-
-        # 12. Determine publish mode
-        published = revision.confidence_score >= _AUTO_PUBLISH_THRESHOLD
-
-        # 13. POST to blog API
-        post = _with_retry(lambda: create_post(
-            title=revision.title,
-            excerpt=revision.excerpt,
-            content=revision.content,
-            author="Elise Caldwell",
-            cover_image=cover_image_url,
-            tags=revision.tags,
-            published=published,
+        current_html = _with_retry(lambda: expand_content(
+            content=current_html,
+            title=first_revision.title,
+            focus_keyphrase=draft.focus_keyphrase,
+            current_word_count=actual_word_count,
+            target_word_count=_WORD_COUNT_TARGET,
         ))
-
-        # 13. Record structure used for rotation
-        db.record_structure_used(draft.structure_used)
-
-        # 14. Update queue + log
-        db.update_queue_status(item.id, "published", set_processed_at=True)
-        log_status = "success" if published else "draft"
+        actual_word_count = _count_words(current_html)
+        logger.info("[supervisor] expansion pass %d result: %d words", expansion_pass, actual_word_count)
+    return current_html, expansion_pass
+
+
+def _stage_final_revision(
+    draft: ContentDraft,
+    first_revision: RevisionResult,
+    expanded_html: str,
+    expansion_passes: int,
+    prediction: confidence.Prediction | None,
+) -> RevisionResult:
+    """Final revision pass when content was expanded — re-audit SEO."""
+    expanded_draft = ContentDraft(
+        title=first_revision.title,
+        excerpt=first_revision.excerpt,
+        content=expanded_html,
+        tags=first_revision.tags,
+        focus_keyphrase=draft.focus_keyphrase,
+        structure_used=draft.structure_used,
+        word_count=_count_words(expanded_html),
+    )
+    expanded_draft, _fixed = autofix_banned_phrases(expanded_draft)
+    revision = _revision_agent(prediction)(expanded_draft)
+    logger.info(
+        "[supervisor] final revision: %d words, confidence %d",
+        _count_words(revision.content), revision.confidence_score,
+    )
+    return revision
+
+
+def _stage_cover_image(draft: ContentDraft) -> bytes:
+    """Generated from the draft's title and excerpt, concurrently with revision; uploaded after the gate."""
+    return generate_cover_image(draft.title, draft.excerpt)
+
+
+def _stage_gate(
+    item: db.QueueItem,
+    first_revision: RevisionResult,
+    final_revision: RevisionResult | None,
+) -> tuple[RevisionResult, bool] | Halt:
+    """Hold if still below the hard minimum after expansion; otherwise decide the publish mode."""
+    revision = final_revision or first_revision
+    actual_word_count = _count_words(revision.content)
+    if actual_word_count < _WORD_COUNT_MIN or revision.confidence_score < _DRAFT_THRESHOLD:
+        reason_parts: list[str] = []
+        if actual_word_count < _WORD_COUNT_MIN:
+            reason_parts.append(f"word count {actual_word_count} < {_WORD_COUNT_MIN}")
+        if revision.confidence_score < _DRAFT_THRESHOLD:
+            reason_parts.append(f"confidence {revision.confidence_score} < {_DRAFT_THRESHOLD}")
+        reason = "; ".join(reason_parts)
+
+        db.update_queue_status(item.id, "held", set_processed_at=True)
         db.insert_log(
             queue_id=item.id,
-            post_id=post.id,
-            status=log_status,
+            post_id=None,
+            status="held",
             confidence_score=revision.confidence_score,
             seo_checks_passed=revision.seo_checks_passed,
-            revision_notes=revision.revision_notes,
+            revision_notes=f"[{reason}] {revision.revision_notes}",
             error_message=None,
         )
-
-        return PipelineResult(
-            status=log_status,
-            topic=topic,
-            post_id=post.id,
-            slug=post.slug,
+        return Halt(PipelineResult(
+            status="held",
+            topic=item.topic,
             confidence_score=revision.confidence_score,
             seo_checks_passed=revision.seo_checks_passed,
             revision_notes=revision.revision_notes,
-        )
-
-    except Exception as exc:
-        error_message = str(exc)
-        db.update_queue_status(item.id, "pending")  # return to queue
-        try:
-            db.insert_log(
-                queue_id=item.id,
-                post_id=None,
-                status="error",
-                confidence_score=None,
-                seo_checks_passed=None,
-                revision_notes=None,
-                error_message=error_message,
-            )
-        except Exception:
-            pass
-        return PipelineResult(status="error", topic=topic, error=error_message)
-
-
-def run_replenish() -> dict:
+        ))
+    return revision, revision.confidence_score >= _AUTO_PUBLISH_THRESHOLD
+
+
+def _stage_upload(cover_image: bytes) -> str:
+    return upload_image(cover_image, "image/png")
+
+
+def _stage_publish(
+    item: db.QueueItem,
+    revision: RevisionResult,
+    cover_image_url: str,
+    published: bool,
+) -> PostResponse:
+    _validate_payload(revision, cover_image_url)
+    return _publish(item.id, revision, cover_image_url, published)
+
+
+def _stage_record_structure(draft: ContentDraft, post: PostResponse) -> None:
+    """Record structure used for rotation."""
+    db.record_structure_used(draft.structure_used)
+
+
+def _stage_mark_published(item: db.QueueItem, post: PostResponse) -> None:
+    db.update_queue_status(item.id, "published", set_processed_at=True)
+
+
+def _stage_log(item: db.QueueItem, post: PostResponse, revision: RevisionResult, published: bool) -> None:
+    db.insert_log(
+        queue_id=item.id,
+        post_id=post.id,
+        status="success" if published else "draft",
+        confidence_score=revision.confidence_score,
+        seo_checks_passed=revision.seo_checks_passed,
+        revision_notes=revision.revision_notes,
+        error_message=None,
+    )
+
+
+def _stage_index_post(post: PostResponse, revision: RevisionResult, draft: ContentDraft, published: bool) -> None:
+    _index_post(post, revision, draft.focus_keyphrase, published)
+
+
+_PIPELINE = StageGraph([
+    Stage("preflight", _stage_preflight, outputs=("pending_count", "recent_structures")),
+    Stage("replenish_check", _stage_replenish_check, inputs=("pending_count",)),
+    Stage("dequeue", _stage_dequeue, inputs=("on_dequeue",), outputs=("item",), after=("preflight",)),
+    Stage(
+        "related", _stage_related, inputs=("item",), outputs=("existing_titles", "internal_links"),
+        when=lambda item: not item.draft,  # backfill drafts were written already
+    ),
+    Stage(
+        "content", _stage_content,
+        inputs=("item", "recent_structures", "existing_titles", "internal_links"), outputs=("draft",),
+    ),
+    Stage("predict", _stage_predict, inputs=("draft",), outputs=("prediction",)),
+    Stage(
+        "revision", _stage_revision,
+        inputs=("item", "draft", "prediction"), outputs=("first_revision",), retries=_MAX_RETRIES,
+    ),
+    Stage(
+        "expansion", _stage_expansion,
+        inputs=("draft", "first_revision"), outputs=("expanded_html", "expansion_passes"),
+    ),
+    Stage(
+        "final_revision", _stage_final_revision,
+        inputs=("draft", "first_revision", "expanded_html", "expansion_passes", "prediction"),
+        outputs=("final_revision",),
+        when=lambda expansion_passes, **_: expansion_passes > 0,
+        retries=_MAX_RETRIES,
+    ),
+    Stage(
+        "image", _stage_cover_image, inputs=("draft",), outputs=("cover_image",),
+        retries=_MAX_RETRIES, cacheable=True,  # a re-run of the same stored draft reuses its image
+    ),
+    Stage(
+        "gate", _stage_gate,
+        inputs=("item", "first_revision", "final_revision"), outputs=("revision", "published"),
+    ),
+    Stage(
+        "upload", _stage_upload, inputs=("cover_image",), outputs=("cover_image_url",),
+        after=("gate",), retries=_MAX_RETRIES, hard_timeout=False,
+    ),
+    # Never abandoned at the budget: a create_post left running in the background could
+    # still publish the post after the item went back to pending
+    Stage(
+        "publish", _stage_publish,
+        inputs=("item", "revision", "cover_image_url", "published"), outputs=("post",),
+        hard_timeout=False,
+    ),
+    # Bookkeeping after the post exists — independent writes, run together. A failure here is
+    # reported but never returns the item to pending (_post_publish_failure)
+    Stage("record_structure", _stage_record_structure, inputs=("draft", "post")),
+    Stage("mark_published", _stage_mark_published, inputs=("item", "post"), retries=_MAX_RETRIES),
+    Stage("log", _stage_log, inputs=("item", "post", "revision", "published")),
+    Stage("index_post", _stage_index_post, inputs=("post", "revision", "draft", "published")),
+])
+
+
+def run_replenish(tenant_id: str | None = None) -> dict:
     """Generate new topics and insert them into the queue."""
-    all_items = db.get_all_queue_items()
-    existing = [i.topic for i in all_items]
+    if tenant_id is not None:
+        with use_tenant(tenant_id):
+            return run_replenish()
+    if _replenish_mode() == "batch":
+        from agents.batch import submit_topic_batch
+        if any(b.get("kind") == "topics" for b in db.get_pending_batches()):
+            return {"added": 0, "message": "A topic batch is already pending"}
+        record = submit_topic_batch(_QUEUE_REPLENISH_COUNT)
+        return {"added": 0, "batch_id": record["id"], "message": "Topic batch submitted"}
+    existing = list(db.iter_queue_topics())
     suggestions = run_topic_agent(_QUEUE_REPLENISH_COUNT, existing)
     for s in suggestions:
         db.add_queue_item(s.topic, s.focus_keyphrase, s.keywords)
@@ -238,25 +525,231 @@ def _count_words(html: str) -> int:
     return len(text.split())
 
 
-def _pick_structure() -> str:
+def _pick_structure(recent_structures: list[str]) -> str:
     """Return a structure type not in the last 3 used, rotating evenly."""
     import random
-    recent = set(db.get_recent_structures(3))
+    recent = set(recent_structures)
     available = [s for s in _ALL_STRUCTURES if s not in recent]
     if not available:
         available = _ALL_STRUCTURES  # fallback if all were recently used
     return random.choice(available)
 
 
-def _with_retry(fn: Callable[[], T]) -> T:
+def _content_agent() -> Callable[..., ContentDraft]:
+    """CONTENT_MODE=sectioned drafts from an outline with sections in parallel; default is one call."""
+    if os.environ.get("CONTENT_MODE", "single").strip().lower() == "sectioned":
+        return run_sectioned_content_agent
+    return run_content_agent
+
+
+def _revision_agent(prediction: confidence.Prediction | None = None) -> Callable[[ContentDraft], RevisionResult]:
+    """REVISION_MODE=patch applies the audit as targeted edits, audits splits it into
+    concurrent sub-audits; default is a full rewrite. A draft the confidence
+    predictor routes to the light path always gets the patch revision."""
+    if prediction is not None and prediction.path == "light":
+        return run_patch_revision_agent
+    mode = os.environ.get("REVISION_MODE", "full").strip().lower()
+    if mode == "patch":
+        return run_patch_revision_agent
+    if mode == "audits":
+        return run_audited_revision
+    return run_revision_agent
+
+
+def _replenish_mode() -> str:
+    """REPLENISH_MODE=batch submits topic generation to the batch endpoint instead of a live call."""
+    return os.environ.get("REPLENISH_MODE", "sync").strip().lower()
+
+
+def _prepared_draft(item: db.QueueItem) -> ContentDraft | None:
+    """The draft stored on the queue row (backfill batch or checkpoint), if it still validates."""
+    if not item.draft:
+        return None
+    from agents.content import _validate
+    try:
+        draft = _validate(item.draft)
+    except RuntimeError as exc:
+        logger.warning("[supervisor] ignoring stored draft for %s: %s", item.id, exc)
+        return None
+    logger.info("[supervisor] using stored draft for %s (%s)", item.id, draft.structure_used)
+    return draft
+
+
+def _checkpoint_draft(item: db.QueueItem, draft: ContentDraft | None) -> None:
+    """Store a run's draft on its queue row so the retry resumes from it instead of rewriting."""
+    if draft is None or item.draft:
+        return
+    try:
+        db.set_queue_draft(item.id, asdict(draft))
+        logger.info("[supervisor] checkpointed draft for %s", item.id)
+    except Exception as exc:
+        logger.warning("[supervisor] could not checkpoint draft for %s: %s", item.id, exc)
+
+
+def _publish(queue_id: str, revision: RevisionResult, cover_image_url: str, published: bool) -> PostResponse:
+    """create_post with an idempotency key; before each retry, and before giving up,
+    look for the post in case an earlier attempt created it despite the error.
+
+    The final lookup runs even once the deadline has passed. If it fails too, the
+    post may exist and PostMayExist is raised, so the item is held, not requeued.
+    """
+    key = idempotency_key("post", current_tenant().id, queue_id, revision.title, revision.content)
+    first_attempt = datetime.now(timezone.utc)
+    attempts = 0
+
+    def attempt() -> PostResponse:
+        nonlocal attempts
+        attempts += 1
+        if attempts > 1:
+            existing = _find_created_post(revision, first_attempt)
+            if existing is not None:
+                return existing
+        return create_post(
+            title=revision.title,
+            excerpt=revision.excerpt,
+            content=revision.content,
+            author=current_tenant().author,
+            cover_image=cover_image_url,
+            tags=revision.tags,
+            published=published,
+            idempotency_key=key,
+        )
+
+    try:
+        return _with_retry(attempt)
+    except Exception as exc:
+        if attempts == 0:
+            raise
+        with deadline.suspended():
+            try:
+                existing = find_post(revision.title, revision.content, first_attempt)
+            except Exception as lookup_exc:
+                raise PostMayExist(f"{str(exc)[:200]}; post lookup failed: {str(lookup_exc)[:200]}") from exc
+        if existing is None:
+            raise
+        logger.info("[supervisor] recovered post %s (%s) created by an earlier attempt", existing.id, existing.slug)
+        return existing
+
+
+def _find_created_post(revision: RevisionResult, since: datetime) -> PostResponse | None:
+    try:
+        existing = find_post(revision.title, revision.content, since)
+    except Exception as exc:
+        logger.warning("[supervisor] post lookup failed: %s", str(exc)[:200])
+        return None
+    if existing is not None:
+        logger.info("[supervisor] recovered post %s (%s) created by an earlier attempt", existing.id, existing.slug)
+    return existing
+
+
+def _related_posts(topic: str, focus_keyphrase: str) -> tuple[list[str], list[tuple[str, str]]]:
+    """Titles of the most similar existing posts, and (title, url) internal-link suggestions."""
+    try:
+        related = post_index().similar(f"{topic} {focus_keyphrase}", _RELATED_TITLES)
+    except Exception as exc:
+        logger.warning("[supervisor] post index lookup failed: %s", exc)
+        return [], []
+    links = [(p.title, p.url()) for p, _score in related if p.published and p.slug]
+    return [p.title for p, _score in related], links[:_INTERNAL_LINK_SUGGESTIONS]
+
+
+def _index_post(post: PostResponse, revision: RevisionResult, focus_keyphrase: str, published: bool) -> None:
+    try:
+        post_index().add(IndexedPost(
+            id=post.id,
+            slug=post.slug,
+            title=post.title or revision.title,
+            focus_keyphrase=focus_keyphrase,
+            tags=revision.tags,
+            published=published,
+            created_at=post.created_at,
+        ))
+    except Exception as exc:
+        logger.warning("[supervisor] indexing post %s failed: %s", post.id, exc)
+
+
+def _speculative_draft_count() -> int:
+    try:
+        return max(1, int(os.environ.get("SPECULATIVE_DRAFTS", "1")))
+    except ValueError:
+        return 1
+
+
+def _best_of_drafts(
+    topic: str,
+    focus_keyphrase: str,
+    structure_type: str,
+    recent_structures: list[str],
+    count: int,
+    existing_titles: list[str] | None = None,
+    internal_links: list[tuple[str, str]] | None = None,
+) -> ContentDraft:
+    """Generate count drafts concurrently and return the best by local score.
+
+    The first draft uses the rotated structure at the route temperature; the
+    rest use the other fresh structures (then recent ones) and vary temperature.
+    Failed drafts are dropped; if every draft fails, the primary is retried.
+    """
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    recent = set(recent_structures)
+    others = [s for s in _ALL_STRUCTURES if s != structure_type]
+    others.sort(key=lambda s: s in recent)  # fresh structures first
+    structures = [structure_type, *others]
+    variants = [
+        (structures[i % len(structures)], _DRAFT_TEMPERATURES[i % len(_DRAFT_TEMPERATURES)])
+        for i in range(count)
+    ]
+
+    write_draft = _content_agent()
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="draft") as pool:
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,  # keep the tenant in each worker
+                write_draft, topic, focus_keyphrase, structure, existing_titles, temperature, internal_links,
+            )
+            for structure, temperature in variants
+        ]
+        drafts: list[ContentDraft] = []
+        for (structure, temperature), future in zip(variants, futures):
+            try:
+                drafts.append(future.result())
+            except Exception as exc:
+                logger.warning("[supervisor] draft %s@%s failed: %s", structure, temperature, str(exc)[:200])
+
+    if not drafts:
+        return _with_retry(lambda: write_draft(
+            topic, focus_keyphrase, structure_type, existing_titles, internal_links=internal_links,
+        ))
+
+    scored = [(score_draft(d), d) for d in drafts]
+    for score, d in scored:
+        logger.info("[supervisor] draft %s: score %.1f %s", d.structure_used, score.total, score.breakdown)
+    best_score, best = max(scored, key=lambda pair: pair[0].total)
+    logger.info("[supervisor] picked %s draft (score %.1f of %d)", best.structure_used, best_score.total, len(drafts))
+    return best
+
+
+def _with_retry(fn: Callable[[], T], retries: int = _MAX_RETRIES) -> T:
     last_exc: Exception | None = None
-    for attempt in range(1, _MAX_RETRIES + 2):
+    for attempt in range(1, retries + 2):
+        deadline.check(f"attempt {attempt}")
         try:
+            current_span().set_attribute("retry.attempt", attempt)
             return fn()
+        except deadline.DeadlineExceeded:
+            raise
         except Exception as exc:
             last_exc = exc
-            if attempt <= _MAX_RETRIES:
+            logger.warning("[supervisor] attempt %d failed: %s", attempt, str(exc)[:200])
+            current_span().add_event("retry", {"retry.attempt": attempt, "exception.message": str(exc)[:200]})
+            if attempt <= retries:
                 delay = _parse_retry_delay(exc) or (1.0 * attempt)
+                left = deadline.remaining()
+                if left is not None and left < delay + deadline.MIN_CALL_SECONDS:
+                    logger.warning("[supervisor] %.0fs left before the deadline, not retrying", max(left, 0.0))
+                    break
                 time.sleep(delay)
     raise last_exc  # type: ignore[misc]
 
@@ -1,22 +1,12 @@
 """Topic agent — generates SEO blog topic/keyphrase pairs for the queue."""
 from __future__ import annotations
 
-import json
-import os
 from dataclasses import dataclass, field
 
-from openai import OpenAI
-
-from prompts.brand_context import BRAND_CONTEXT
-
-_client: OpenAI | None = None
-
-
-def _openai() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    return _client
+from services.llm import chat_completion
+from services.structured_output import dataclass_schema, object_schema, parse_json, response_format
+from services.tenants import current_tenant
+from services.token_budget import trim_items
 
 
 @dataclass
@@ -27,6 +17,12 @@ class TopicSuggestion:
     content_pillar: str = "lifestyle_intentionality"
 
 
+_RESPONSE_FORMAT = response_format(
+    "topic_suggestions",
+    object_schema(topics={"type": "array", "items": dataclass_schema(TopicSuggestion)}),
+)
+
+
 # ── Content pillars ────────────────────────────────────────────────────────────
 
 _CONTENT_PILLARS = [
@@ -37,6 +33,28 @@ _CONTENT_PILLARS = [
     "lifestyle_intentionality — thoughtful consumption, human connection, philanthropic brand values, limited edition craft, quality over quantity",
 ]
 
+# Brand-specific steering for the default tenant — other tenants supply topic_guidance
+_TOPIC_GUIDANCE = """GEO TOPIC PRINCIPLES:
+- Target "fan-out queries" — topics that answer the sub-questions AI engines use when synthesising answers
+- Prioritise topics that occupy clear semantic territory the brand owns (digital fatigue, petrolatum-free beeswax, executive wellness ritual)
+- Each topic should have a clear implicit question an AI would answer ("Is beeswax better than petroleum jelly for lip health?" → full post answering this)
+- Include both informational (educational) and commercial (product-intent) topics
+- The brand's philanthropic angle (100% charity proceeds) is a citable trust signal — include topics that can feature it naturally
+
+Your job: Generate SEO + GEO-optimised blog topic + focus keyphrase pairs. Each topic must:
+- Target a real conversational search query (lip balm, beeswax, digital fatigue, executive wellness, lip skinification, etc.)
+- Have clear search intent (informational or commercial)
+- Align with the brand's calm, philosophical, minimal tone
+- Offer genuine value to the reader — not a sales pitch
+- Be unique — no overlap with existing topics"""
+
+_TOPIC_REQUIREMENTS = (
+    "- At least 20% of topics should target the digital_wellness_professional pillar (executives, knowledge workers, digital fatigue)\n"
+    "- At least 15% should target lip_skinification (ceramides, active ingredients, barrier science)\n"
+    "- Mix broad awareness topics with niche long-tail topics\n"
+    "- Prioritise keyphrases an AI would use when someone asks about lip care, digital wellness, or mindful rituals"
+)
+
 # ── Keyword clusters ───────────────────────────────────────────────────────────
 
 _KEYWORD_CLUSTERS = [
@@ -73,37 +91,51 @@ def run_topic_agent(
     count: int,
     existing_topics: list[str] | None = None,
 ) -> list[TopicSuggestion]:
+    # Queue history comes newest first, and the newest topics are the likeliest duplicates — keep those
+    system, user = build_topic_prompts(count, trim_items(existing_topics or [], "existing_topics", keep="first"))
+
+    response = chat_completion(
+        agent="topic",
+        response_format=_RESPONSE_FORMAT,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+    )
+
+    raw = response.choices[0].message.content
+    if not raw:
+        raise RuntimeError("Topic agent returned empty response")
+
+    return _validate(parse_json(raw, "Topic agent"))
+
+
+def build_topic_prompts(count: int, existing_topics: list[str] | None = None) -> tuple[str, str]:
+    """System and user prompts for a topic-generation call."""
     avoid = ""
     if existing_topics:
         lines = "\n".join(f"- {t}" for t in existing_topics)
         avoid = f"\n\nTopics already in use — DO NOT duplicate or closely overlap:\n{lines}"
 
-    pillars_str = "\n".join(f"{i+1}. {p}" for i, p in enumerate(_CONTENT_PILLARS))
-    clusters_str = "\n".join(f"- {k}" for k in _KEYWORD_CLUSTERS)
+    tenant = current_tenant()
+    pillars = tenant.content_pillars or _CONTENT_PILLARS
+    pillars_str = "\n".join(f"{i+1}. {p}" for i, p in enumerate(pillars))
+    clusters_str = "\n".join(f"- {k}" for k in (tenant.keyword_clusters or _KEYWORD_CLUSTERS))
+    pillar_keys = " | ".join(p.split(" — ", 1)[0].strip() for p in pillars)
+    guidance = tenant.extra.get("topic_guidance") or _TOPIC_GUIDANCE
+    requirements = tenant.extra.get("topic_requirements") or _TOPIC_REQUIREMENTS
 
-    system = f"""You are a GEO (Generative Engine Optimization) strategist for Jesse A. Eisenbalm, a premium beeswax lip balm brand. Your goal is to generate blog topics that rank on Google AND get cited by AI search engines like ChatGPT, Perplexity, and Gemini.
+    system = f"""You are a GEO (Generative Engine Optimization) strategist for {tenant.brand_name}, {tenant.brand_descriptor}. Your goal is to generate blog topics that rank on Google AND get cited by AI search engines like ChatGPT, Perplexity, and Gemini.
 
-{BRAND_CONTEXT}
+{tenant.brand_context}
 
-CONTENT PILLARS (balance suggestions across all 5):
+CONTENT PILLARS (balance suggestions across all {len(pillars)}):
 {pillars_str}
 
 HIGH-VALUE KEYWORD & SEMANTIC CLUSTERS TO TARGET:
 {clusters_str}
 
-GEO TOPIC PRINCIPLES:
-- Target "fan-out queries" — topics that answer the sub-questions AI engines use when synthesising answers
-- Prioritise topics that occupy clear semantic territory the brand owns (digital fatigue, petrolatum-free beeswax, executive wellness ritual)
-- Each topic should have a clear implicit question an AI would answer ("Is beeswax better than petroleum jelly for lip health?" → full post answering this)
-- Include both informational (educational) and commercial (product-intent) topics
-- The brand's philanthropic angle (100% charity proceeds) is a citable trust signal — include topics that can feature it naturally
-
-Your job: Generate SEO + GEO-optimised blog topic + focus keyphrase pairs. Each topic must:
-- Target a real conversational search query (lip balm, beeswax, digital fatigue, executive wellness, lip skinification, etc.)
-- Have clear search intent (informational or commercial)
-- Align with the brand's calm, philosophical, minimal tone
-- Offer genuine value to the reader — not a sales pitch
-- Be unique — no overlap with existing topics
+{guidance}
 
 Return ONLY valid JSON — no markdown fences, no extra text:
 {{
@@ -112,41 +144,18 @@ Return ONLY valid JSON — no markdown fences, no extra text:
       "topic": "string (descriptive blog topic title idea)",
       "focus_keyphrase": "string (2–4 word SEO keyphrase)",
       "keywords": ["string", "string", "string"],
-      "content_pillar": "string (one of: ingredient_science | ritual_mindfulness | digital_wellness_professional | lip_skinification | lifestyle_intentionality)"
+      "content_pillar": "string (one of: {pillar_keys})"
     }}
   ]
 }}"""
 
     user = (
-        f"Generate {count} unique, SEO + GEO-optimised blog topic ideas for the Jesse A. Eisenbalm brand.\n\n"
+        f"Generate {count} unique, SEO + GEO-optimised blog topic ideas for the {tenant.brand_name} brand.\n\n"
         "Requirements:\n"
-        "- Spread topics across all 5 content pillars (roughly equal distribution)\n"
-        "- At least 20% of topics should target the digital_wellness_professional pillar (executives, knowledge workers, digital fatigue)\n"
-        "- At least 15% should target lip_skinification (ceramides, active ingredients, barrier science)\n"
-        "- Mix broad awareness topics with niche long-tail topics\n"
-        f"- Prioritise keyphrases an AI would use when someone asks about lip care, digital wellness, or mindful rituals{avoid}"
-    )
-
-    response = _openai().chat.completions.create(
-        model="gpt-4o",
-        temperature=0.85,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
+        f"- Spread topics across all {len(pillars)} content pillars (roughly equal distribution)\n"
+        f"{requirements}{avoid}"
     )
-
-    raw = response.choices[0].message.content
-    if not raw:
-        raise RuntimeError("Topic agent returned empty response")
-
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        raise RuntimeError(f"Topic agent returned invalid JSON: {raw[:200]}")
-
-    return _validate(parsed)
+    return system, user
 
 
 def _validate(data: object) -> list[TopicSuggestion]:
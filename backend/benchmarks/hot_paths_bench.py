@@ -0,0 +1,254 @@
+"""Microbenchmarks for the pipeline's CPU-side hot paths, with a stored baseline.
+
+    cd backend && python -m benchmarks.hot_paths_bench                     # compare to baseline
+    cd backend && python -m benchmarks.hot_paths_bench --update-baseline   # record a new one
+
+Times word counting, prompt construction, the content / revision / topic
+response validators (JSON parse included, as in the agents), image mood
+detection and PipelineResult.to_dict on synthetic 2k / 10k / 50k-word posts.
+Times are normalised by a fixed calibration workload so a baseline recorded on
+one machine stays meaningful on another; anything slower than the baseline by
+more than --threshold is flagged and the run exits non-zero.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from agents import content, revision, topic
+from agents.image import _detect_mood
+from agents.supervisor import PipelineResult
+from agents.supervisor import _count_words as supervisor_count_words
+from prompts.content_prompt import (
+    build_content_system_prompt,
+    build_content_user_prompt,
+    build_outline_system_prompt,
+    build_section_system_prompt,
+)
+from prompts.revision_prompt import (
+    build_revision_patch_system_prompt,
+    build_revision_patch_user_prompt,
+    build_revision_system_prompt,
+    build_revision_user_prompt,
+    build_subaudit_system_prompt,
+)
+from services.html_patch import numbered_blocks, split_blocks
+from services.structured_output import parse_json
+
+_BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+_WORDS = (
+    "beeswax barrier lips skin ritual screen focus calm moisture research study evidence routine "
+    "office winter habit attention minimal texture balm daily pause breath hands ceramides occlusive"
+).split()
+
+# Sub-microsecond differences are timer noise, not regressions
+_NOISE_FLOOR_US = 1.0
+
+Case = tuple[str, Callable[[], object]]
+
+
+def synthetic_html(words: int, seed: int = 11) -> str:
+    """A post-shaped HTML body: H2 sections, short cited paragraphs, the odd list."""
+    rng = random.Random(seed)
+    blocks: list[str] = []
+    written = 0
+    while written < words:
+        if len(blocks) % 8 == 0:
+            blocks.append(f"<h2>{' '.join(rng.choices(_WORDS, k=5)).capitalize()}</h2>")
+            written += 5
+        elif len(blocks) % 11 == 5:
+            items = "".join(f"<li>{' '.join(rng.choices(_WORDS, k=8))}</li>" for _ in range(4))
+            blocks.append(f"<ul>{items}</ul>")
+            written += 32
+        else:
+            sentences = [" ".join(rng.choices(_WORDS, k=rng.randint(12, 22))).capitalize() + "." for _ in range(3)]
+            link = f'<a href="https://www.ncbi.nlm.nih.gov/pmc/{rng.randint(1000, 9999)}/">{rng.choice(_WORDS)}</a>'
+            blocks.append(f"<p>{sentences[0]} {link} {sentences[1]} <strong>{sentences[2]}</strong></p>")
+            written += sum(len(s.split()) for s in sentences) + 1
+    return "\n".join(blocks)
+
+
+def _content_payload(html: str) -> str:
+    return json.dumps({
+        "title": "Why beeswax lip balm outperforms petroleum jelly",
+        "excerpt": "Beeswax forms a breathable barrier; petrolatum seals. Here is what that means for your lips.",
+        "content": html,
+        "tags": ["lip care", "beeswax", "rituals", "skin barrier"],
+        "focus_keyphrase": "beeswax lip balm",
+        "structure_used": "deep-dive",
+        "word_count": len(html.split()),
+    })
+
+
+def _revision_payload(html: str) -> str:
+    data = json.loads(_content_payload(html))
+    data.update({
+        "confidence_score": 87,
+        "seo_checks_passed": 14,
+        "flagged_issues": [f"issue {i}: unsourced statistic in block {i}" for i in range(25)],
+        "revision_notes": "Tightened the opening, added two citations, removed banned phrases.",
+    })
+    return json.dumps(data)
+
+
+def _topic_payload(count: int) -> str:
+    rng = random.Random(count)
+    return json.dumps({"topics": [
+        {
+            "topic": " ".join(rng.choices(_WORDS, k=9)).capitalize(),
+            "focus_keyphrase": " ".join(rng.choices(_WORDS, k=3)),
+            "keywords": rng.choices(_WORDS, k=4),
+            "content_pillar": "lip_science",
+        }
+        for _ in range(count)
+    ]})
+
+
+def static_cases() -> list[Case]:
+    """Prompt builders whose cost doesn't depend on the document size."""
+    cases: list[Case] = [
+        ("prompt.content_system", build_content_system_prompt),
+        ("prompt.outline_system", build_outline_system_prompt),
+        ("prompt.section_system", build_section_system_prompt),
+        ("prompt.revision_system", build_revision_system_prompt),
+        ("prompt.revision_patch_system", build_revision_patch_system_prompt),
+        ("prompt.topic", lambda: topic.build_topic_prompts(15, [f"Queued topic {i}" for i in range(100)])),
+        ("prompt.content_user", lambda: build_content_user_prompt(
+            "Why beeswax beats petrolatum", "beeswax lip balm", "deep-dive", [f"Title {i}" for i in range(40)]
+        )),
+    ]
+    for name in ("links", "metadata", "voice", "structure"):
+        cases.append((f"prompt.subaudit_{name}_system", lambda name=name: build_subaudit_system_prompt(name)))
+    return cases
+
+
+def sized_cases(words: int) -> list[Case]:
+    """Hot paths whose cost grows with the post: counting, validation, document prompts."""
+    html = synthetic_html(words)
+    text = re.sub(r"<[^>]+>", " ", html)
+    content_raw = _content_payload(html)
+    revision_raw = _revision_payload(html)
+    topic_raw = _topic_payload(max(15, words // 100))
+    numbered = numbered_blocks(split_blocks(html))
+    tags = ["lip care", "beeswax"]
+    result = PipelineResult(
+        status="success",
+        topic="Why beeswax lip balm outperforms petroleum jelly",
+        post_id="8f0c", slug="why-beeswax-lip-balm", confidence_score=88, seo_checks_passed=14,
+        revision_notes=text[: words * 2], tenant_id="default",
+    )
+    return [
+        ("count_words.supervisor", lambda: supervisor_count_words(html)),
+        ("count_words.revision", lambda: revision._count_words(html)),
+        ("prompt.revision_user", lambda: build_revision_user_prompt("T", "E", html, tags, "beeswax lip balm")),
+        ("prompt.revision_patch_user", lambda: build_revision_patch_user_prompt(
+            "T", "E", numbered, tags, "beeswax lip balm", words
+        )),
+        ("prompt.expansion", lambda: revision._expansion_messages(html, "T", "beeswax lip balm", words, words + 500)),
+        ("validate.content", lambda: content._validate(parse_json(content_raw, "bench"))),
+        ("validate.revision", lambda: revision._validate(parse_json(revision_raw, "bench"))),
+        ("validate.topic", lambda: topic._validate(parse_json(topic_raw, "bench"))),
+        ("detect_mood", lambda: _detect_mood("A quiet ritual", text)),
+        ("pipeline_result.to_dict", result.to_dict),
+    ]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Best-of-repeat time per call in microseconds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def calibrate(repeat: int) -> float:
+    """A fixed regex + split + json workload used to normalise across machines."""
+    html = synthetic_html(2_000, seed=1)
+    return measure(lambda: json.dumps(re.sub(r"<[^>]+>", " ", html).split()), repeat)
+
+
+def all_cases(words: list[int]) -> dict[str, Callable[[], object]]:
+    cases = {f"{name}@-": fn for name, fn in static_cases()}
+    for n in words:
+        cases.update({f"{name}@{n}": fn for name, fn in sized_cases(n)})
+    return cases
+
+
+def compare(
+    cases: dict[str, Callable[[], object]],
+    results: dict[str, float],
+    calibration: float,
+    baseline: dict,
+    threshold: float,
+    repeat: int,
+) -> list[str]:
+    """Print each case against the baseline; return the keys that regressed.
+
+    A case over the threshold is measured again before it is flagged, so one
+    noisy sample doesn't fail the run.
+    """
+    base_results = baseline.get("results", {})
+    scale = calibration / (baseline.get("calibration_us") or calibration)
+    regressions: list[str] = []
+
+    print(f"{'case':<36} {'size':>6} {'µs/call':>12} {'baseline':>12} {'ratio':>7}")
+    for key, us in results.items():
+        name, size = key.rsplit("@", 1)
+        base = base_results.get(key)
+        if base is None:
+            print(f"{name:<36} {size:>6} {us:>12.1f} {'—':>12} {'new':>7}")
+            continue
+        expected = base * scale
+        if us / expected > 1 + threshold:
+            us = results[key] = min(us, measure(cases[key], repeat * 2))
+        flag = ""
+        if us / expected > 1 + threshold and us - expected > _NOISE_FLOOR_US:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{name:<36} {size:>6} {us:>12.1f} {expected:>12.1f} {us / expected:>6.2f}×{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[2_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=_BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.3, help="allowed slowdown before flagging (0.3 = 30%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    args = parser.parse_args()
+
+    calibration = calibrate(args.repeat)
+    cases = all_cases(args.words)
+    results = {key: measure(fn, args.repeat) for key, fn in cases.items()}
+    calibration = min(calibration, calibrate(args.repeat))  # either end of the run, whichever was quieter
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+
+    print(f"calibration {calibration:.1f} µs (baseline {baseline.get('calibration_us', '—')}), best of {args.repeat}\n")
+    regressions = compare(cases, results, calibration, baseline, args.threshold, args.repeat)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps({
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "calibration_us": round(calibration, 2),
+            "results": {k: round(v, 2) for k, v in results.items()},
+        }, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    elif baseline:
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
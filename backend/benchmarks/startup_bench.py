@@ -0,0 +1,110 @@
+"""Cold-start benchmark: import time of the API and worker entry points.
+
+    cd backend && python -m benchmarks.startup_bench                 # median of 5 fresh imports
+    cd backend && python -m benchmarks.startup_bench --top 25        # plus the slowest imports
+    cd backend && python -m benchmarks.startup_bench --prewarm       # plus services.prewarm steps
+
+Each sample imports the module in a fresh interpreter, so nothing is cached
+in sys.modules; bytecode is compiled once by a warm-up run first. --top
+re-runs the import under -X importtime and lists the modules with the largest
+cumulative import time, which is where to look before making another import
+lazy.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+_BACKEND = Path(__file__).resolve().parent.parent
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess[str]:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(_BACKEND), os.environ.get("PYTHONPATH")]))}
+    return subprocess.run([sys.executable, *args], cwd=_BACKEND, env=env, capture_output=True, text=True)
+
+
+def import_seconds(module: str, samples: int) -> list[float]:
+    """Wall time of `python -c "import module"` in fresh processes, minus bare interpreter start."""
+    def timed(code: str) -> float:
+        start = time.perf_counter()
+        proc = _run(["-c", code])
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip()[-1500:]}")
+        return elapsed
+
+    timed(f"import {module}")  # compile bytecode
+    baseline = min(timed("pass") for _ in range(3))
+    return [max(0.0, timed(f"import {module}") - baseline) for _ in range(samples)]
+
+
+def slowest_imports(module: str, top: int) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) from -X importtime, sorted by cumulative time."""
+    proc = _run(["-X", "importtime", "-c", f"import {module}"])
+    rows: list[tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    # Report top-level packages only, so one heavy SDK isn't listed once per submodule
+    packages: dict[str, tuple[str, int, int]] = {}
+    for name, self_us, cumulative_us in rows:
+        root = name.split(".")[0]
+        if root not in packages or cumulative_us > packages[root][2]:
+            packages[root] = (name, self_us, cumulative_us)
+    return sorted(packages.values(), key=lambda r: r[2], reverse=True)[:top]
+
+
+def prewarm_steps() -> dict[str, dict[str, object]]:
+    proc = _run(["-c", "import json; from services.prewarm import prewarm; print(json.dumps(prewarm()))"])
+    if proc.returncode != 0:
+        raise RuntimeError(f"prewarm failed:\n{proc.stderr.strip()[-1500:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help="module to import (repeatable; default main and worker)")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest top-level imports")
+    parser.add_argument("--prewarm", action="store_true", help="also time each services.prewarm step")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    report: dict[str, object] = {"python": sys.version.split()[0], "modules": {}}
+    for module in args.module or ["main", "worker"]:
+        times = import_seconds(module, args.samples)
+        entry: dict[str, object] = {
+            "median_ms": round(statistics.median(times) * 1000, 1),
+            "min_ms": round(min(times) * 1000, 1),
+        }
+        if args.top:
+            entry["slowest"] = [
+                {"module": name, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+                for name, s, c in slowest_imports(module, args.top)
+            ]
+        report["modules"][module] = entry  # type: ignore[index]
+    if args.prewarm:
+        report["prewarm"] = prewarm_steps()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for module, entry in report["modules"].items():  # type: ignore[union-attr]
+        print(f"import {module:<12} median {entry['median_ms']:>8.1f} ms   min {entry['min_ms']:>8.1f} ms")
+        for row in entry.get("slowest", []):
+            print(f"    {row['cumulative_ms']:>8.1f} ms cumulative  {row['self_ms']:>7.1f} ms self  {row['module']}")
+    for step, result in (report.get("prewarm") or {}).items():  # type: ignore[union-attr]
+        status = "ok" if result.get("ok") else result.get("error", "failed")
+        print(f"prewarm {step:<16} {result['ms']:>8.1f} ms  {status}")
+
+
+if __name__ == "__main__":
+    main()
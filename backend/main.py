@@ -3,68 +3,152 @@ from __future__ import annotations
 
 import logging
 import os
+import socket
+import uuid
 from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
+from agents import confidence
 from agents.supervisor import run_pipeline, run_replenish
+from services import deadline, prewarm
 from services import supabase_client as db
+from services.jobs import JobRunner, create_job_backend
+from services.model_routing import model_router
+from services.tenants import DEFAULT_TENANT_ID, load_tenants, use_tenant
+from services.tracing import configure as configure_tracing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+configure_tracing()
 
 _executor = ThreadPoolExecutor(max_workers=2)
+_jobs = create_job_backend()
 _scheduler = BackgroundScheduler()
 
+# Leader election — every replica runs the scheduler, but only the lease holder fires ticks
+_LEASE_NAME = "pipeline_scheduler"
+_LEASE_TTL_SECONDS = int(os.environ.get("SCHEDULER_LEASE_TTL_SECONDS", "60"))
+_BATCH_POLL_MINUTES = int(os.environ.get("BATCH_POLL_MINUTES", "10"))
+# A claim older than the run deadline plus this is from a crashed run, not one still going
+_ABANDONED_GRACE_SECONDS = 300
+_instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_is_leader = False
+_loaded_schedule: dict[str, tuple[tuple[str, ...], str]] = {}
+
 
 # ── Scheduler helpers ───────────────────────────────────────────────────────────
 
-def _pipeline_job() -> None:
-    """Called by APScheduler — checks active flag before running."""
+def _leader_heartbeat() -> None:
+    """Acquire or renew the scheduler lease; runs on every replica every TTL/3 seconds."""
+    global _is_leader
     try:
-        settings = db.get_schedule_settings()
+        leader = db.try_acquire_lease(_LEASE_NAME, _instance_id, _LEASE_TTL_SECONDS)
+    except Exception as exc:
+        logger.error("[scheduler] lease check failed: %s", exc)
+        leader = False
+    if leader != _is_leader:
+        logger.info("[scheduler] %s %s leadership", _instance_id, "acquired" if leader else "lost")
+    _is_leader = leader
+    if leader:
+        # /reload-schedule may have hit another replica — pick up schedule changes here too
+        current: dict[str, tuple[tuple[str, ...], str]] = {}
+        for tenant_id in load_tenants():
+            with use_tenant(tenant_id):
+                settings = db.get_schedule_settings()
+            current[tenant_id] = (tuple(settings.run_times), settings.timezone or "UTC")
+        if current != _loaded_schedule:
+            _load_schedule_from_db()
+
+
+def _pipeline_job(tenant_id: str, run_time: str, tz: str) -> None:
+    """Called by APScheduler — fires only on the leader, once per tick cluster-wide."""
+    from datetime import datetime
+    from functools import partial
+    from zoneinfo import ZoneInfo
+    try:
+        if not _is_leader:
+            logger.info("[scheduler] not leader — skipping %s %s tick", tenant_id, run_time)
+            return
+        tick_key = f"pipeline:{tenant_id}:{datetime.now(ZoneInfo(tz)).date().isoformat()}:{run_time}:{tz}"
+        if not db.claim_scheduler_tick(tick_key, _instance_id):
+            logger.info("[scheduler] tick %s already claimed — skipping", tick_key)
+            return
+        with use_tenant(tenant_id):
+            settings = db.get_schedule_settings()
         if not settings.active:
-            logger.info("[scheduler] paused — skipping run")
+            logger.info("[scheduler] %s paused — skipping run", tenant_id)
             return
-        logger.info("[scheduler] firing pipeline job")
-        result = run_pipeline()
-        logger.info("[scheduler] done: %s", result.status)
-        if result.error:
-            logger.error("[scheduler] error detail: %s", result.error)
+        job = _jobs.submit("pipeline", partial(run_pipeline, tenant_id=tenant_id), tenant_id=tenant_id)
+        logger.info("[scheduler] queued pipeline job %s for %s", job.id, tenant_id)
     except Exception as exc:
         logger.error("[scheduler] pipeline error: %s", exc)
 
 
+def _poll_batches_job() -> None:
+    """Ingest finished topic / backfill batches for every tenant (leader only)."""
+    if not _is_leader:
+        return
+    from agents.batch import poll_batches
+    for tenant_id in load_tenants():
+        try:
+            with use_tenant(tenant_id):
+                poll_batches()
+        except Exception as exc:
+            logger.error("[scheduler] batch poll failed for %s: %s", tenant_id, exc)
+
+
+def _schedule_job_id(tenant_id: str, run_time: str) -> str:
+    hhmm = run_time.replace(":", "")
+    return f"pipeline_{hhmm}" if tenant_id == DEFAULT_TENANT_ID else f"pipeline_{tenant_id}_{hhmm}"
+
+
 def _load_schedule_from_db() -> None:
-    """Remove all pipeline jobs and re-add from Supabase app_settings."""
-    _scheduler.remove_all_jobs()
-    try:
-        settings = db.get_schedule_settings()
-        tz = settings.timezone or "UTC"
-        for t in settings.run_times:
+    """Remove all pipeline jobs and re-add every tenant's schedule from Supabase app_settings."""
+    global _loaded_schedule
+    for job in _scheduler.get_jobs():
+        if job.id.startswith("pipeline_"):
+            job.remove()
+    loaded: dict[str, tuple[tuple[str, ...], str]] = {}
+    for tenant_id in load_tenants():
+        try:
+            with use_tenant(tenant_id):
+                settings = db.get_schedule_settings()
+            tz = settings.timezone or "UTC"
+            run_times = settings.run_times
+            loaded[tenant_id] = (tuple(run_times), tz)
+        except Exception as exc:
+            logger.error("[scheduler] failed to load schedule for %s: %s", tenant_id, exc)
+            # Fallback: 3 daily runs at UTC
+            tz, run_times = "UTC", ["06:00", "12:00", "18:00"]
+        for t in run_times:
             hour, minute = t.split(":")
             _scheduler.add_job(
                 _pipeline_job,
                 CronTrigger(hour=int(hour), minute=int(minute), timezone=tz),
-                id=f"pipeline_{t.replace(':', '')}",
-                replace_existing=True,
-            )
-            logger.info("[scheduler] scheduled pipeline at %s %s", t, tz)
-    except Exception as exc:
-        logger.error("[scheduler] failed to load schedule: %s", exc)
-        # Fallback: 3 daily runs at UTC
-        for t in ["06:00", "12:00", "18:00"]:
-            hour, minute = t.split(":")
-            _scheduler.add_job(
-                _pipeline_job,
-                CronTrigger(hour=int(hour), minute=int(minute), timezone="UTC"),
-                id=f"pipeline_{t.replace(':', '')}",
+                args=[tenant_id, t, tz],
+                id=_schedule_job_id(tenant_id, t),
                 replace_existing=True,
             )
+            logger.info("[scheduler] scheduled %s pipeline at %s %s", tenant_id, t, tz)
+    _loaded_schedule = loaded
+
+
+async def _run_for_tenant(tenant_id: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run blocking work for a tenant on the executor, off the event loop."""
+    import asyncio
+
+    def _call():
+        with use_tenant(tenant_id):
+            return fn(*args)
+
+    return await asyncio.get_event_loop().run_in_executor(_executor, _call)
 
 
 # ── Auth ────────────────────────────────────────────────────────────────────────
@@ -86,16 +170,54 @@ def _check_api_key(request: Request) -> None:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
+def _reset_abandoned_items() -> None:
+    """Return queue items left in_progress by a crashed run to pending, for every tenant.
+
+    Other replicas may be mid-run, so only claims older than the run deadline
+    (plus a grace period for a publish finishing past it) count as abandoned.
+    """
+    stale_after = deadline.run_seconds() + _ABANDONED_GRACE_SECONDS
+    for tenant_id in load_tenants():
+        try:
+            with use_tenant(tenant_id):
+                reset = db.reset_in_progress_items(stale_after)
+            if reset:
+                logger.info("[startup] returned %d abandoned item(s) to the %s queue", reset, tenant_id)
+        except Exception as exc:
+            logger.error("[startup] failed to reset abandoned items for %s: %s", tenant_id, exc)
+
+
 # ── App lifespan ────────────────────────────────────────────────────────────────
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if prewarm.enabled():
+        # Overlaps SDK imports and connection setup with the schedule load below
+        prewarm.start_background()
+    if isinstance(_jobs, JobRunner):
+        _reset_abandoned_items()
     logger.info("[startup] loading schedule from Supabase …")
     _load_schedule_from_db()
+    _leader_heartbeat()
+    _scheduler.add_job(
+        _leader_heartbeat,
+        IntervalTrigger(seconds=max(5, _LEASE_TTL_SECONDS // 3)),
+        id="leader_heartbeat",
+        replace_existing=True,
+    )
+    _scheduler.add_job(
+        _poll_batches_job,
+        IntervalTrigger(minutes=_BATCH_POLL_MINUTES),
+        id="batch_poll",
+        replace_existing=True,
+    )
     _scheduler.start()
     logger.info("[startup] APScheduler started with %d jobs", len(_scheduler.get_jobs()))
     yield
     _scheduler.shutdown(wait=False)
+    if _is_leader:
+        db.release_lease(_LEASE_NAME, _instance_id)
+    _jobs.shutdown()
     logger.info("[shutdown] APScheduler stopped")
 
 
@@ -110,37 +232,110 @@ async def health():
         {"id": j.id, "next_run": str(j.next_run_time)}
         for j in _scheduler.get_jobs()
     ]
-    return {"status": "ok", "scheduled_jobs": jobs}
+    return {
+        "status": "ok",
+        "scheduled_jobs": jobs,
+        "job_runner": _jobs.stats(),
+        "scheduler_leader": _is_leader,
+        "model_latency": model_router().latency_percentiles(),
+        "prewarm": prewarm.results(),
+        "confidence_predictor": confidence.accuracy(),
+        "instance_id": _instance_id,
+    }
 
 
 @app.post("/pipeline")
-async def pipeline_route(request: Request):
+async def pipeline_route(request: Request, tenant: str = DEFAULT_TENANT_ID):
     _check_api_key(request)
-    import asyncio
-    loop = asyncio.get_event_loop()
+    if tenant not in load_tenants():
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
     try:
-        result = await loop.run_in_executor(_executor, run_pipeline)
-        if result.error:
-            logger.error("[/pipeline] pipeline error: %s", result.error)
-        return JSONResponse(result.to_dict())
+        from functools import partial
+        job = _jobs.submit("pipeline", partial(run_pipeline, tenant_id=tenant), tenant_id=tenant)
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, **_jobs.stats()},
+            status_code=202,
+        )
     except Exception as exc:
         logger.error("[/pipeline] error: %s", exc)
         return JSONResponse({"error": str(exc)}, status_code=500)
 
 
+@app.get("/jobs")
+async def list_jobs(request: Request):
+    _check_api_key(request)
+    return {"jobs": [j.to_dict() for j in _jobs.list()], **_jobs.stats()}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    _check_api_key(request)
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 @app.post("/replenish")
-async def replenish_route(request: Request):
+async def replenish_route(request: Request, tenant: str = DEFAULT_TENANT_ID, mode: str | None = None):
     _check_api_key(request)
+    if tenant not in load_tenants():
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+    if mode == "batch":
+        from agents.batch import submit_topic_batch
+        from agents.supervisor import _QUEUE_REPLENISH_COUNT
+        record = await _run_for_tenant(tenant, submit_topic_batch, _QUEUE_REPLENISH_COUNT)
+        return JSONResponse(record, status_code=202)
+    if not isinstance(_jobs, JobRunner):
+        # Durable mode: the API only enqueues; a worker process generates the topics
+        job = _jobs.submit("replenish", tenant_id=tenant)
+        return JSONResponse({"job_id": job.id, "status": job.status, "message": "Replenish queued"}, status_code=202)
     import asyncio
     loop = asyncio.get_event_loop()
     try:
-        result = await loop.run_in_executor(_executor, run_replenish)
+        result = await loop.run_in_executor(_executor, run_replenish, tenant)
         return JSONResponse(result)
     except Exception as exc:
         logger.error("[/replenish] error: %s", exc)
         return JSONResponse({"error": str(exc)}, status_code=500)
 
 
+@app.post("/backfill")
+async def backfill_route(request: Request, tenant: str = DEFAULT_TENANT_ID, count: int = 10):
+    """Draft up to count pending queue items in one batch; the pipeline picks the drafts up."""
+    _check_api_key(request)
+    if tenant not in load_tenants():
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+    from agents.batch import submit_backfill_batch
+    try:
+        record = await _run_for_tenant(tenant, submit_backfill_batch, max(1, min(count, 100)))
+        return JSONResponse(record, status_code=202)
+    except Exception as exc:
+        logger.error("[/backfill] error: %s", exc)
+        return JSONResponse({"error": str(exc)}, status_code=500)
+
+
+@app.get("/batches")
+async def list_batches(request: Request, tenant: str = DEFAULT_TENANT_ID):
+    _check_api_key(request)
+    if tenant not in load_tenants():
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+    return {"batches": await _run_for_tenant(tenant, db.get_pending_batches)}
+
+
+@app.post("/batches/poll")
+async def poll_batches_route(request: Request, tenant: str = DEFAULT_TENANT_ID):
+    _check_api_key(request)
+    if tenant not in load_tenants():
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+    from agents.batch import poll_batches
+    try:
+        return await _run_for_tenant(tenant, poll_batches)
+    except Exception as exc:
+        logger.error("[/batches/poll] error: %s", exc)
+        return JSONResponse({"error": str(exc)}, status_code=500)
+
+
 @app.post("/reload-schedule")
 async def reload_schedule(request: Request):
     _check_api_key(request)
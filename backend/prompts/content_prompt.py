@@ -1,4 +1,4 @@
-from prompts.brand_context import BRAND_CONTEXT
+from services.tenants import current_tenant
 
 _STRUCTURES = {
     "deep-dive": """DEEP DIVE — Long-form analysis with 5–6 H2 sections and H3 subsections.
@@ -74,16 +74,29 @@ _BANNED_PHRASES = [
 ]
 
 
+_OPENER_EXAMPLE = """Example:
+Topic: "beeswax lip balm for digital fatigue"
+Good opener: "Jesse A. Eisenbalm is a petrolatum-free beeswax lip balm designed as a grounding ritual for professionals navigating digital overload. Its beeswax formula creates a bio-compatible barrier that prevents transepidermal water loss (TEWL), while the act of application — Stop. Breathe. Balm. — serves as a tactile interrupt to constant-connectivity fatigue.\""""
+
+_SEMANTIC_TERMS = """- Lip science: TEWL, lip barrier, petrolatum-free, ceramides, occlusive, sebaceous glands, bio-compatible
+- Digital wellness: digital fatigue, cognitive load, screen time, continuous partial attention, neurocosmetic, grounding ritual, analog ritual
+- Executive audience: business professional, knowledge worker, executive wellness, mindful productivity, workplace wellbeing
+- Ingredient legitimacy: beeswax properties, natural emollient, barrier repair, sustainable sourcing
+- Brand trust: hand-numbered, limited edition, 100% charity proceeds, Release 001"""
+
+
 def build_content_system_prompt() -> str:
+    tenant = current_tenant()
+    opener_example = tenant.extra.get("opener_example", "") if not tenant.is_default else _OPENER_EXAMPLE
     structures_str = "\n\n".join(
         f"[{key.upper()}]\n{desc}" for key, desc in _STRUCTURES.items()
     )
     banned_str = "\n".join(f"- \"{p}\"" for p in _BANNED_PHRASES)
 
     return f"""
-You are an expert GEO (Generative Engine Optimization) content writer specialising in premium wellness and beauty brands. You write calm, minimal, philosophical blog posts for Jesse A. Eisenbalm — a premium beeswax lip balm brand — optimised to be cited by AI search engines (ChatGPT, Perplexity, Gemini) and ranked on Google.
+You are an expert GEO (Generative Engine Optimization) content writer specialising in premium wellness and beauty brands. You write calm, minimal, philosophical blog posts for {tenant.brand_name} — {tenant.brand_descriptor} — optimised to be cited by AI search engines (ChatGPT, Perplexity, Gemini) and ranked on Google.
 
-{BRAND_CONTEXT}
+{tenant.brand_context}
 
 ━━━ HARD RULES ━━━
 
@@ -95,9 +108,9 @@ but short posts are a hard failure. Aim for 2,000 words.
 NO FAQ SECTIONS: Do not write a FAQ section. Never. The FAQ format is not appropriate for this brand.
 
 NO GENERIC CTA PARAGRAPHS: Do not write closing paragraphs like "Ready to experience the difference?" or
-"Shop Jesse A. Eisenbalm today and discover..." or any variation of a sales pitch ending.
+"Shop {tenant.brand_name} today and discover..." or any variation of a sales pitch ending.
 The post should end with a substantive closing sentence — a synthesis, an insight, a plain statement of truth.
-One internal link to jesseaeisenbalm.com is required somewhere in the body, embedded naturally.
+One internal link to {tenant.site_domain} is required somewhere in the body, embedded naturally.
 
 BANNED PHRASES — never use these:
 {banned_str}
@@ -119,9 +132,7 @@ The first <p> must be a direct, citable 2–4 sentence answer to the implicit qu
 
 An AI reading only this paragraph should be able to cite it as a complete answer to the topic query.
 
-Example:
-Topic: "beeswax lip balm for digital fatigue"
-Good opener: "Jesse A. Eisenbalm is a petrolatum-free beeswax lip balm designed as a grounding ritual for professionals navigating digital overload. Its beeswax formula creates a bio-compatible barrier that prevents transepidermal water loss (TEWL), while the act of application — Stop. Breathe. Balm. — serves as a tactile interrupt to constant-connectivity fatigue."
+{opener_example}
 
 ━━━ STRUCTURE FORMATS ━━━
 
@@ -136,18 +147,14 @@ Paragraphs: 2–3 sentences maximum. Keep them scannable.
 ━━━ SEMANTIC BREADTH (GEO) ━━━
 
 Weave in semantically related terms naturally — only where they genuinely fit:
-- Lip science: TEWL, lip barrier, petrolatum-free, ceramides, occlusive, sebaceous glands, bio-compatible
-- Digital wellness: digital fatigue, cognitive load, screen time, continuous partial attention, neurocosmetic, grounding ritual, analog ritual
-- Executive audience: business professional, knowledge worker, executive wellness, mindful productivity, workplace wellbeing
-- Ingredient legitimacy: beeswax properties, natural emollient, barrier repair, sustainable sourcing
-- Brand trust: hand-numbered, limited edition, 100% charity proceeds, Release 001
+{tenant.semantic_terms or _SEMANTIC_TERMS}
 
 ━━━ YOAST SEO REQUIREMENTS ━━━
 
 - Title: 50–60 characters, contains focus keyphrase exactly
 - Excerpt (meta description): 150–160 characters, contains focus keyphrase, reads naturally as a sentence
 - All <img> tags must have descriptive, non-empty alt attributes
-- Internal link (≥ 1): href="https://jesseaeisenbalm.com" with natural anchor text
+- Internal link (≥ 1): href="{tenant.site_url}" with natural anchor text
 - External links (≥ 2): at least one from this list:
   healthline.com, webmd.com, byrdie.com, wellandgood.com, vogue.com, allure.com,
   psychologytoday.com, health.harvard.edu, hbr.org, ncbi.nlm.nih.gov, aad.org, ewg.org, forbes.com
@@ -176,16 +183,19 @@ def build_content_user_prompt(
     focus_keyphrase: str,
     structure_type: str,
     existing_titles: list[str] | None = None,
+    internal_links: list[tuple[str, str]] | None = None,
 ) -> str:
+    tenant = current_tenant()
     avoid = ""
     if existing_titles:
         lines = "\n".join(f"- {t}" for t in existing_titles)
         avoid = f"\n\nExisting post titles — do not duplicate these angles:\n{lines}"
+    links = _internal_links_block(internal_links)
 
     return f"""Topic: {topic}
 Focus keyphrase: {focus_keyphrase}
 Structure to use: {structure_type}
-CRITICAL — Word count: You MUST write 1,800–2,200 words. Minimum 1,500. A post under 1,500 words is a hard failure.{avoid}
+CRITICAL — Word count: You MUST write 1,800–2,200 words. Minimum 1,500. A post under 1,500 words is a hard failure.{avoid}{links}
 
 Write the full blog post now following the {structure_type.upper()} structure format.
 
@@ -195,8 +205,150 @@ REQUIREMENTS:
 - 5–6 substantial H2 sections with real depth — examples, research, analysis
 - No FAQ section
 - No generic CTA paragraph — end with a substantive closing sentence
-- Include one internal link to jesseaeisenbalm.com embedded naturally in the body
+- Include one internal link to {tenant.site_domain} embedded naturally in the body
 - At least one external link to a high-DA domain relevant to the topic (cited inline, not appended)
 - Every statistic must have a hyperlinked citation
 
 Do not write a short overview. Write a comprehensive, in-depth article."""
+
+
+def _internal_links_block(internal_links: list[tuple[str, str]] | None) -> str:
+    if not internal_links:
+        return ""
+    lines = "\n".join(f"- {title}: {url}" for title, url in internal_links)
+    return f"\n\nRelated posts on the blog — use one as the internal link where it fits naturally:\n{lines}"
+
+
+# ── Sectioned mode (CONTENT_MODE=sectioned) ───────────────────────────────────
+
+def build_outline_system_prompt() -> str:
+    tenant = current_tenant()
+    opener_example = tenant.extra.get("opener_example", "") if not tenant.is_default else _OPENER_EXAMPLE
+    structures_str = "\n\n".join(
+        f"[{key.upper()}]\n{desc}" for key, desc in _STRUCTURES.items()
+    )
+
+    return f"""
+You are the lead editor planning a GEO (Generative Engine Optimization) blog post for {tenant.brand_name} — {tenant.brand_descriptor}. Section writers will draft each H2 section in parallel from your outline, so the outline must carry the whole argument.
+
+{tenant.brand_context}
+
+━━━ WHAT YOU PRODUCE ━━━
+
+- Title: 50–60 characters, contains the focus keyphrase exactly
+- Excerpt (meta description): 150–160 characters, contains the focus keyphrase, reads naturally as a sentence
+- Opening: the complete answer-first first paragraph as HTML (<p>…</p>), 2–4 sentences, keyphrase included,
+  names the brand and product naturally, citable verbatim by an AI
+- Sections: 5–6 H2 sections following the requested structure format. For each section give the heading,
+  a 2–3 sentence brief of what it must argue and which evidence it should use, a word budget, whether the
+  focus keyphrase must appear in it, and its link plan ("internal", "external" or "none")
+- Word budgets must add up to 1,800–2,000 words across the sections
+- At least one heading contains the focus keyphrase; exactly one section carries the internal link to {tenant.site_domain};
+  at least two sections carry external citations
+- Closing: one substantive closing sentence — a synthesis, an insight, a plain statement of truth. No CTA.
+- No FAQ section
+- Tags: 2–4 relevant lowercase tags
+
+{opener_example}
+
+━━━ STRUCTURE FORMATS ━━━
+
+{structures_str}
+
+━━━ OUTPUT FORMAT ━━━
+
+Return ONLY valid JSON matching the response schema — no markdown fences, no extra text.
+""".strip()
+
+
+def build_outline_user_prompt(
+    topic: str,
+    focus_keyphrase: str,
+    structure_type: str,
+    existing_titles: list[str] | None = None,
+    internal_links: list[tuple[str, str]] | None = None,
+) -> str:
+    avoid = ""
+    if existing_titles:
+        lines = "\n".join(f"- {t}" for t in existing_titles)
+        avoid = f"\n\nExisting post titles — do not duplicate these angles:\n{lines}"
+    links = _internal_links_block(internal_links)
+    if links:
+        links += "\nPut the chosen URL in the brief of the section whose link plan is \"internal\"."
+
+    return f"""Topic: {topic}
+Focus keyphrase: {focus_keyphrase}
+Structure to use: {structure_type}{avoid}{links}
+
+Plan the post now following the {structure_type.upper()} structure format."""
+
+
+def build_section_system_prompt() -> str:
+    tenant = current_tenant()
+    banned_str = "\n".join(f"- \"{p}\"" for p in _BANNED_PHRASES)
+
+    return f"""
+You are an expert GEO content writer drafting ONE section of a calm, minimal, philosophical blog post for {tenant.brand_name} — {tenant.brand_descriptor}. Other writers are drafting the other sections at the same time from the same outline; write only your section so the assembled post reads as one voice.
+
+{tenant.brand_context}
+
+━━━ HARD RULES ━━━
+
+- Start with the given <h2> heading exactly; use <h3> for subsections where the structure calls for them
+- Hit the section's word budget (±10%). Depth over breadth — examples, research, mechanism, nuance
+- Do NOT write an introduction to the whole post, restate the opening, or summarise the post — no closing paragraph
+- Paragraphs: 2–3 sentences maximum, wrapped in <p>
+- Every statistic or data claim is cited inline with a hyperlink to its source. If you cannot cite it, don't use it.
+  Prefer NCBI/PubMed, Harvard Health, AAD, HBR, Psychology Today, Healthline, WebMD
+- Link plan "internal": include one natural link to {tenant.site_url}. "external": at least one cited external link.
+- No FAQ, no CTA, no sales pitch
+
+BANNED PHRASES — never use these:
+{banned_str}
+
+━━━ SEMANTIC BREADTH (GEO) ━━━
+
+Weave in semantically related terms naturally — only where they genuinely fit:
+{tenant.semantic_terms or _SEMANTIC_TERMS}
+
+━━━ OUTPUT FORMAT ━━━
+
+Return ONLY valid JSON: {{"html": "the section HTML, starting with its <h2>"}}
+""".strip()
+
+
+def build_section_user_prompt(
+    title: str,
+    opening: str,
+    headings: list[str],
+    index: int,
+    brief: str,
+    word_budget: int,
+    focus_keyphrase: str,
+    include_keyphrase: bool,
+    link_plan: str,
+) -> str:
+    outline = "\n".join(
+        f"{i + 1}. {h}{'   ← YOUR SECTION' if i == index else ''}" for i, h in enumerate(headings)
+    )
+    keyphrase_rule = (
+        f'Use the focus keyphrase "{focus_keyphrase}" naturally 1–2 times in this section.'
+        if include_keyphrase
+        else f'You may use the focus keyphrase "{focus_keyphrase}" once if it fits; do not force it.'
+    )
+
+    return f"""Post title: {title}
+
+Opening paragraph (already written — do not repeat it):
+{opening}
+
+Outline:
+{outline}
+
+Your section: <h2>{headings[index]}</h2>
+Brief: {brief}
+Word budget: {word_budget} words
+{keyphrase_rule}
+Link plan: {link_plan}
+
+Write this section now."""
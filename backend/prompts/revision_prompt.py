@@ -1,4 +1,4 @@
-from prompts.brand_context import BRAND_CONTEXT
+from services.tenants import current_tenant
 
 _BANNED_PHRASES = [
     "in today's fast-paced world", "now more than ever", "in a world where",
@@ -15,13 +15,41 @@ _BANNED_PHRASES = [
 ]
 
 
+_SEMANTIC_TERMS = """- Lip science: TEWL, lip barrier, petrolatum-free, bio-compatible, occlusive
+- Digital wellness: digital fatigue, cognitive load, neurocosmetic, grounding ritual, analog ritual
+- Executive/professional: knowledge worker, executive wellness, workplace wellbeing
+- Brand trust: hand-numbered, limited edition, 100% charity proceeds, Release 001"""
+
+
 def build_revision_system_prompt() -> str:
+    return f"""
+{_audit_instructions()}
+
+━━━ OUTPUT FORMAT ━━━
+
+Return ONLY valid JSON — no markdown fences, no extra text:
+{{
+  "title": "string",
+  "excerpt": "string",
+  "content": "string (full HTML body — all improvements applied)",
+  "tags": ["string"],
+  "confidence_score": number,
+  "seo_checks_passed": number,
+  "word_count": number,
+  "flagged_issues": ["string"],
+  "revision_notes": "string (brief summary of what was changed and why)"
+}}
+""".strip()
+
+
+def _audit_instructions() -> str:
+    tenant = current_tenant()
     banned_str = "\n".join(f"- \"{p}\"" for p in _BANNED_PHRASES)
 
     return f"""
 You are a senior GEO (Generative Engine Optimization) editor specialising in premium wellness and beauty brands. You audit blog post drafts, fix every failing check, and return an improved version optimised to be cited by AI search engines (ChatGPT, Perplexity, Gemini) as well as ranked on Google.
 
-{BRAND_CONTEXT}
+{tenant.brand_context}
 
 ━━━ AUDIT CHECKLIST — 15 checks, 1 point each ━━━
 
@@ -38,7 +66,7 @@ YOAST ESSENTIALS (checks 1–10):
 10. Excerpt is 150–160 characters
 
 LINK QUALITY (checks 11–13):
-11. At least 1 internal link to jesseaeisenbalm.com
+11. At least 1 internal link to {tenant.site_domain}
 12. At least 1 external link to any credible source
 13. At least 1 external link to a high-DA authority domain from this list:
     healthline.com, webmd.com, byrdie.com, wellandgood.com, vogue.com,
@@ -62,7 +90,7 @@ BANNED PHRASES — if any of these appear, flag each one:
 {banned_str}
 
 GENERIC CTA PARAGRAPH — if the post ends with a paragraph like "Ready to experience...?",
-"Shop Jesse A. Eisenbalm today...", or any explicit sales-pitch closing, flag it.
+"Shop {tenant.brand_name} today...", or any explicit sales-pitch closing, flag it.
 The post must end with a substantive sentence — a synthesis, insight, or plain statement of fact.
 
 UNSOURCED STATISTICS — if any statistic appears without a hyperlinked citation, flag it.
@@ -78,12 +106,12 @@ not as a refrain.
 ━━━ IMPROVEMENT INSTRUCTIONS ━━━
 
 For every failing check, FIX it directly in the returned content:
-- Check 11 missing → add an internal link to jesseaeisenbalm.com in the body (natural anchor)
+- Check 11 missing → add an internal link to {tenant.site_domain} in the body (natural anchor)
 - Check 13 missing → add a contextually relevant citation to one of the high-DA domains above
   (prefer ncbi.nlm.nih.gov or aad.org for ingredient science; hbr.org or psychologytoday.com
    for digital wellness/executive topics; forbes.com for professional lifestyle)
 - Check 15 missing → rewrite the opening paragraph to lead with a direct answer:
-    State what Jesse A. Eisenbalm is, what it does, and why it matters — in the first 2–4 sentences.
+    State what {tenant.brand_name} is, what it does, and why it matters — in the first 2–4 sentences.
     An AI reading this paragraph should be able to cite it as a complete answer to the topic query.
 - Checks 9–10 → rewrite title/excerpt to hit character targets exactly
 - Check 6 → add or remove keyphrase occurrences to land in 0.5–3% range
@@ -101,10 +129,7 @@ For every failing check, FIX it directly in the returned content:
 ━━━ SEMANTIC ENRICHMENT ━━━
 
 If the content is thin on semantic breadth, naturally add relevant terms where they fit:
-- Lip science: TEWL, lip barrier, petrolatum-free, bio-compatible, occlusive
-- Digital wellness: digital fatigue, cognitive load, neurocosmetic, grounding ritual, analog ritual
-- Executive/professional: knowledge worker, executive wellness, workplace wellbeing
-- Brand trust: hand-numbered, limited edition, 100% charity proceeds, Release 001
+{tenant.semantic_terms or _SEMANTIC_TERMS}
 
 Only add terms where they genuinely improve the content — never force them.
 
@@ -124,21 +149,6 @@ Base score on checks passed out of 15:
 
 Apply a ±3 point adjustment for overall content quality (depth, clarity, brand fit, GEO-readiness).
 Deduct 2 points for each item in flagged_issues (unsourced stats, banned phrases, etc.).
-
-━━━ OUTPUT FORMAT ━━━
-
-Return ONLY valid JSON — no markdown fences, no extra text:
-{{
-  "title": "string",
-  "excerpt": "string",
-  "content": "string (full HTML body — all improvements applied)",
-  "tags": ["string"],
-  "confidence_score": number,
-  "seo_checks_passed": number,
-  "word_count": number,
-  "flagged_issues": ["string"],
-  "revision_notes": "string (brief summary of what was changed and why)"
-}}
 """.strip()
 
 
@@ -160,3 +170,161 @@ Content:
 {content}
 
 Audit against all 15 checks and the hard rejection flags. Apply all necessary fixes and return the improved post with your confidence score, word count, flagged issues, and revision notes."""
+
+
+# ── Patch mode (REVISION_MODE=patch) ──────────────────────────────────────────
+
+def build_revision_patch_system_prompt() -> str:
+    return f"""
+{_audit_instructions()}
+
+━━━ PATCH MODE ━━━
+
+{_edit_ops_guide()}
+
+Title, excerpt and tags are always returned in full (unchanged if they already pass).
+Score confidence_score and seo_checks_passed for the post AFTER your edits are applied.
+
+━━━ OUTPUT FORMAT ━━━
+
+Return ONLY valid JSON matching the response schema — no markdown fences, no extra text.
+""".strip()
+
+
+def _edit_ops_guide() -> str:
+    tenant = current_tenant()
+    return f"""
+The content is given as numbered top-level blocks: [B0], [B1], … Do NOT return the full content.
+Return only the edits needed to fix failing checks and flagged issues; every block you don't touch is kept
+exactly as-is. Prefer the smallest edit that fixes the problem.
+
+Edit operations (every field is required — use "" or -1 for fields an op doesn't use):
+- replace_block: block = N, html = the complete new HTML for block N (one element, e.g. a full <p>…</p>)
+- insert_after:  block = N (or -1 for before the first block), html = new block(s) to insert after block N —
+                 use this to add new <h2> sections or paragraphs when the post is short
+- delete_block:  block = N (e.g. a FAQ section heading and its paragraphs, a generic CTA paragraph)
+- replace_text:  block = N, find = exact text currently in block N (copy it verbatim, including any HTML),
+                 replace = its replacement — use for a banned phrase, a keyphrase tweak or a single sentence
+- insert_link:   block = N, find = exact anchor text currently in block N, replace = the href
+                 (internal links use {tenant.site_url})
+""".strip()
+
+
+def build_revision_patch_user_prompt(
+    title: str,
+    excerpt: str,
+    numbered_content: str,
+    tags: list[str],
+    focus_keyphrase: str,
+    word_count: int,
+) -> str:
+    return f"""Focus keyphrase: {focus_keyphrase}
+
+DRAFT:
+Title: {title}
+Excerpt: {excerpt}
+Tags: {", ".join(tags)}
+Body word count: {word_count}
+
+Content blocks:
+{numbered_content}
+
+Audit against all 15 checks and the hard rejection flags. Return the edits that fix them, with your confidence score, seo checks passed, flagged issues, and revision notes."""
+
+
+# ── Sub-audit mode (REVISION_MODE=audits) ─────────────────────────────────────
+
+def _subaudit_rules(name: str) -> str:
+    tenant = current_tenant()
+    banned_str = "\n".join(f"- \"{p}\"" for p in _BANNED_PHRASES)
+
+    rules = {
+        "links": f"""
+LINKS & CITATIONS — you own these checks only:
+11. At least 1 internal link to {tenant.site_domain} (natural anchor text, embedded in the body)
+12. At least 1 external link to any credible source
+13. At least 1 external link to a high-DA authority domain from this list:
+    healthline.com, webmd.com, byrdie.com, wellandgood.com, vogue.com,
+    allure.com, psychologytoday.com, health.harvard.edu, hbr.org,
+    ncbi.nlm.nih.gov, aad.org, ewg.org, forbes.com
+    (prefer ncbi.nlm.nih.gov or aad.org for ingredient science; hbr.org or psychologytoday.com
+     for digital wellness/executive topics; forbes.com for professional lifestyle)
+UNSOURCED STATISTICS — any statistic without a hyperlinked citation: add a link to a credible source
+or remove the stat. If you can do neither, add it to flagged_issues.""",
+        "metadata": """
+KEYPHRASE & METADATA — you own these checks only:
+1.  Focus keyphrase in title (exactly)
+2.  Focus keyphrase in URL slug (slug derived from title, kebab-case)
+3.  Focus keyphrase in meta description (excerpt)
+4.  Focus keyphrase in first <p> paragraph
+5.  Focus keyphrase in at least one <h2> heading
+6.  Keyphrase density 0.5–3% of total word count — add or remove occurrences in the blocks shown
+9.  Title is 50–60 characters
+10. Excerpt is 150–160 characters, reads naturally as a sentence
+Return the title and excerpt in full (unchanged if they already pass). Only edit the blocks shown.""",
+        "voice": f"""
+VOICE & BANNED PHRASES — you own these flags only:
+BANNED PHRASES — replace every occurrence with direct, specific language (replace_text):
+{banned_str}
+GENERIC CTA PARAGRAPH — if the post ends with a paragraph like "Ready to experience...?",
+"Shop {tenant.brand_name} today...", or any explicit sales-pitch closing, rewrite it as a plain
+closing sentence or delete it.
+PRODUCT MENTION OVERLOAD — if the brand or product is mentioned more than once per 150 words,
+remove the weakest mentions.
+Preserve the brand voice: calm, minimal, philosophical. Never corporate, never hyperbolic.
+List anything you could not fix in flagged_issues.""",
+        "structure": f"""
+STRUCTURE — you own these checks only:
+8.  Content has <h2> subheadings; <h3> used for subsections
+14. All <img> tags have non-empty, descriptive alt attributes
+15. Answer-first opening — the first <p> provides a direct, citable 2–4 sentence answer to the
+    implicit question behind the topic; leads with key fact, names {tenant.brand_name},
+    states the value proposition. No throat-clearing or scene-setting. Rewrite it if it fails,
+    and set answer_first to whether the opening passes AFTER your edits.
+FAQ SECTION — delete a FAQ section entirely (its heading and every block under it).
+LONG PARAGRAPHS — split paragraphs longer than 3 sentences into 2–3 sentence <p> blocks (replace_block).""",
+    }
+    return rules[name].strip()
+
+
+def build_subaudit_system_prompt(name: str) -> str:
+    tenant = current_tenant()
+    return f"""
+You are one of four specialist GEO (Generative Engine Optimization) editors auditing a blog post for {tenant.brand_name} — {tenant.brand_descriptor}. The other editors handle every other check at the same time; fix ONLY what your remit covers and leave everything else alone.
+
+━━━ YOUR REMIT ━━━
+
+{_subaudit_rules(name)}
+
+━━━ EDITS ━━━
+
+{_edit_ops_guide()}
+
+You may see only a subset of the post's blocks — the ones relevant to your remit. Only edit blocks you can see.
+
+━━━ OUTPUT FORMAT ━━━
+
+Return ONLY valid JSON matching the response schema — no markdown fences, no extra text.
+notes: one or two sentences on what you changed and why.
+""".strip()
+
+
+def build_subaudit_user_prompt(
+    title: str,
+    excerpt: str,
+    focus_keyphrase: str,
+    numbered_content: str,
+    findings: list[str],
+) -> str:
+    findings_str = "\n".join(f"- {f}" for f in findings) if findings else "- none"
+    return f"""Focus keyphrase: {focus_keyphrase}
+Title: {title}
+Excerpt: {excerpt}
+
+Local pre-check findings for your remit:
+{findings_str}
+
+Content blocks:
+{numbered_content}
+
+Audit your remit and return the edits that fix it."""
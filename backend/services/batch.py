@@ -0,0 +1,209 @@
+"""Batch chat completions — submit many requests as one job, collect results later.
+
+Non-urgent work (topic replenishment, backfill drafting) goes through the
+OpenAI Batch API instead of live calls: half the price, and none of it counts
+against the live RPM/TPM budget in services.rate_limit. Requests are written
+as a JSONL batch file using each agent's routed primary model, submitted, and
+polled until a terminal state.
+
+BATCH_BACKEND=local swaps in LocalBatchEmulator, which keeps batch files on
+disk, walks the same validating → in_progress → completed lifecycle over
+successive polls and writes output in the Batch API's format, so the ingest
+path is exercised end to end without the batch endpoint.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Protocol
+
+from services.model_routing import model_router
+
+logger = logging.getLogger(__name__)
+
+_ENDPOINT = "/v1/chat/completions"
+_COMPLETION_WINDOW = "24h"
+
+TERMINAL_STATES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    agent: str
+    messages: list[dict[str, str]]
+    params: dict[str, Any] = field(default_factory=dict)  # response_format etc.
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    content: str | None
+    error: str | None = None
+    total_tokens: int = 0
+
+
+class BatchBackend(Protocol):
+    name: str
+
+    def submit(self, payload: bytes, metadata: dict[str, str]) -> str: ...
+
+    def status(self, batch_id: str) -> str: ...
+
+    def results(self, batch_id: str) -> list[BatchResult]: ...
+
+
+def build_batch_file(requests: list[BatchRequest]) -> bytes:
+    """One JSONL line per request, on the agent's routed primary model and sampling."""
+    router = model_router()
+    lines: list[str] = []
+    for req in requests:
+        route = router.route(req.agent)
+        body: dict[str, Any] = {"model": route.model, "messages": req.messages, "temperature": route.temperature}
+        if route.max_tokens is not None:
+            body["max_tokens"] = route.max_tokens
+        body.update(req.params)
+        lines.append(json.dumps({"custom_id": req.custom_id, "method": "POST", "url": _ENDPOINT, "body": body}))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def parse_batch_output(text: str) -> list[BatchResult]:
+    """Results from Batch API output / error files (one JSON object per line)."""
+    results: list[BatchResult] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        custom_id = str(row.get("custom_id", ""))
+        response = row.get("response") or {}
+        error = row.get("error")
+        if error or response.get("status_code", 200) >= 400:
+            message = (error or {}).get("message") or json.dumps(response.get("body"))[:300]
+            results.append(BatchResult(custom_id, None, error=str(message)))
+            continue
+        body = response.get("body") or {}
+        choices = body.get("choices") or [{}]
+        content = (choices[0].get("message") or {}).get("content")
+        usage = body.get("usage") or {}
+        results.append(BatchResult(
+            custom_id,
+            content,
+            error=None if content else "empty response",
+            total_tokens=int(usage.get("total_tokens") or 0),
+        ))
+    return results
+
+
+class OpenAIBatchBackend:
+    name = "openai"
+
+    def submit(self, payload: bytes, metadata: dict[str, str]) -> str:
+        from services.providers import openai_client
+
+        client = openai_client()
+        upload = client.files.create(file=("batch.jsonl", payload), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=upload.id,
+            endpoint=_ENDPOINT,
+            completion_window=_COMPLETION_WINDOW,
+            metadata=metadata,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        from services.providers import openai_client
+        return openai_client().batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> list[BatchResult]:
+        from services.providers import openai_client
+
+        client = openai_client()
+        batch = client.batches.retrieve(batch_id)
+        text = ""
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                text += client.files.content(file_id).text + "\n"
+        return parse_batch_output(text)
+
+
+Responder = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+class LocalBatchEmulator:
+    """Stand-in for the Batch API: one status step per poll, then runs every request.
+
+    responder turns a request body into a chat.completion body; the default
+    sends it to the live chat completions endpoint, tests pass a canned one.
+    """
+
+    name = "local"
+    _LIFECYCLE = ("validating", "in_progress", "completed")
+
+    def __init__(self, directory: Path | None = None, responder: Responder | None = None) -> None:
+        default = Path(tempfile.gettempdir()) / "blog-batches"
+        self._dir = directory or Path(os.environ.get("BATCH_EMULATOR_DIR") or default)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._responder = responder or _live_responder
+
+    def submit(self, payload: bytes, metadata: dict[str, str]) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:16]}"
+        (self._dir / f"{batch_id}.input.jsonl").write_bytes(payload)
+        self._write_state(batch_id, {"status": "validating", "metadata": metadata})
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        state = self._read_state(batch_id)
+        current = state["status"]
+        if current in TERMINAL_STATES:
+            return current
+        nxt = self._LIFECYCLE[self._LIFECYCLE.index(current) + 1]
+        if nxt == "completed":
+            self._run(batch_id)
+        state["status"] = nxt
+        self._write_state(batch_id, state)
+        return nxt
+
+    def results(self, batch_id: str) -> list[BatchResult]:
+        path = self._dir / f"{batch_id}.output.jsonl"
+        return parse_batch_output(path.read_text()) if path.exists() else []
+
+    def _run(self, batch_id: str) -> None:
+        lines: list[str] = []
+        for line in (self._dir / f"{batch_id}.input.jsonl").read_text().splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            row: dict[str, Any] = {"id": f"req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"]}
+            try:
+                row["response"] = {"status_code": 200, "body": self._responder(request["body"])}
+                row["error"] = None
+            except Exception as exc:
+                row["response"] = None
+                row["error"] = {"code": type(exc).__name__, "message": str(exc)[:300]}
+            lines.append(json.dumps(row))
+        (self._dir / f"{batch_id}.output.jsonl").write_text("\n".join(lines) + "\n")
+
+    def _read_state(self, batch_id: str) -> dict[str, Any]:
+        path = self._dir / f"{batch_id}.json"
+        if not path.exists():
+            raise RuntimeError(f"Unknown local batch: {batch_id}")
+        return json.loads(path.read_text())
+
+    def _write_state(self, batch_id: str, state: dict[str, Any]) -> None:
+        (self._dir / f"{batch_id}.json").write_text(json.dumps(state))
+
+
+def _live_responder(body: dict[str, Any]) -> dict[str, Any]:
+    from services.providers import openai_client
+    return openai_client().chat.completions.create(**body).model_dump()
+
+
+def batch_backend(name: str | None = None) -> BatchBackend:
+    """BATCH_BACKEND=openai (default) or local; pass name to poll a batch where it was submitted."""
+    name = (name or os.environ.get("BATCH_BACKEND", "openai")).strip().lower()
+    return LocalBatchEmulator() if name == "local" else OpenAIBatchBackend()
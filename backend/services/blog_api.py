@@ -1,10 +1,19 @@
-"""Create posts on the Jesse A. Eisenbalm blog API."""
+"""Create posts on the tenant's blog API (Jesse A. Eisenbalm by default)."""
 from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 
-import httpx
+from services import deadline
+from services.idempotency import HEADER as IDEMPOTENCY_HEADER
+from services.idempotency import content_hash
+from services.providers import http_client
+from services.tenants import current_tenant
+from services.tracing import span
+
+# Server/client clock difference tolerated when matching a post by its created_at
+_CLOCK_SKEW = timedelta(seconds=60)
 
 
 @dataclass
@@ -23,32 +32,41 @@ def create_post(
     cover_image: str,
     tags: list[str],
     published: bool,
+    idempotency_key: str | None = None,
 ) -> PostResponse:
-    api_key = os.environ["BLOG_API_KEY"]
-    api_url = os.environ.get("BLOG_API_URL", "https://jesse-eisenbalm-server.vercel.app")
-
-    response = httpx.post(
-        f"{api_url}/api/posts",
-        json={
-            "title": title,
-            "excerpt": excerpt,
-            "content": content,
-            "author": author,
-            "cover_image": cover_image,
-            "tags": tags,
-            "published": published,
-        },
-        headers={
-            "Content-Type": "application/json",
-            "x-api-key": api_key,
-        },
-        timeout=30.0,
-    )
+    """POST a new post; with idempotency_key set, retries of the same post send the same key."""
+    tenant = current_tenant()
+    api_key = os.environ[tenant.blog_api_key_env]
+    api_url = tenant.resolved_blog_api_url()
 
-    if not response.is_success:
-        raise RuntimeError(
-            f"Blog API error: {response.status_code} {response.reason_phrase} — {response.text[:300]}"
+    with span(
+        "blog_api.create_post",
+        **{"http.method": "POST", "post.content_bytes": len(content.encode()), "post.published": published},
+    ) as current:
+        response = http_client().post(
+            f"{api_url}/api/posts",
+            json={
+                "title": title,
+                "excerpt": excerpt,
+                "content": content,
+                "author": author,
+                "cover_image": cover_image,
+                "tags": tags,
+                "published": published,
+            },
+            headers={
+                "Content-Type": "application/json",
+                "x-api-key": api_key,
+                **({IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else {}),
+            },
+            timeout=deadline.timeout(30.0, "create_post"),
         )
+        current.set_attribute("http.status_code", response.status_code)
+
+        if not response.is_success:
+            raise RuntimeError(
+                f"Blog API error: {response.status_code} {response.reason_phrase} — {response.text[:300]}"
+            )
 
     data = response.json()
     post = data.get("post") or {}
@@ -61,3 +79,60 @@ def create_post(
         title=post.get("title", ""),
         created_at=post.get("created_at", ""),
     )
+
+
+def list_posts() -> list[dict]:
+    """Every post on the tenant's blog (drafts included), as returned by GET /api/posts."""
+    tenant = current_tenant()
+    with span("blog_api.list_posts", **{"http.method": "GET"}) as current:
+        response = http_client().get(
+            f"{tenant.resolved_blog_api_url()}/api/posts",
+            headers={"x-api-key": os.environ[tenant.blog_api_key_env]},
+            timeout=deadline.timeout(30.0, "list_posts"),
+        )
+        current.set_attribute("http.status_code", response.status_code)
+        if not response.is_success:
+            raise RuntimeError(
+                f"Blog API error: {response.status_code} {response.reason_phrase} — {response.text[:300]}"
+            )
+    data = response.json()
+    posts = data.get("posts") if isinstance(data, dict) else data
+    if not isinstance(posts, list):
+        raise RuntimeError("Blog API response missing posts list")
+    return [p for p in posts if isinstance(p, dict)]
+
+
+def find_post(title: str, content: str, since: datetime | None = None) -> PostResponse | None:
+    """The newest existing post with this title and content — a create that succeeded
+    server-side even though the client saw an error.
+
+    A post listed without its content only matches if it was created at or after
+    since (the first create attempt); without since it never matches, so an older
+    post that merely shares the title is never taken for this one.
+    """
+    wanted = content_hash(content)
+
+    def same_post(p: dict) -> bool:
+        if "content" in p:
+            return content_hash(str(p["content"])) == wanted
+        created = _parse_time(p.get("created_at"))
+        return since is not None and created is not None and created >= since - _CLOCK_SKEW
+
+    matches = [p for p in list_posts() if p.get("id") and p.get("title") == title and same_post(p)]
+    if not matches:
+        return None
+    post = max(matches, key=lambda p: str(p.get("created_at") or ""))
+    return PostResponse(
+        id=post["id"],
+        slug=post.get("slug", ""),
+        title=post.get("title", ""),
+        created_at=post.get("created_at", ""),
+    )
+
+
+def _parse_time(value: object) -> datetime | None:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else None
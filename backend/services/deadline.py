@@ -0,0 +1,115 @@
+"""Run deadlines — one time budget per pipeline run, enforced on every external call.
+
+run_pipeline opens a deadline of RUN_DEADLINE_SECONDS, and each stage narrows
+it to its own budget (STAGE_TIMEOUTS). The deadline is held in a context
+variable, so it follows the run into stage and worker threads. Callers turn it
+into per-call timeouts with timeout(default): the smaller of the call's usual
+timeout and the time left. OpenAI, Gemini, DALL-E, blog API and upload calls
+do this, as do rate-limit waits and _with_retry, which never starts an
+attempt that can't finish in time. Once the time is gone, DeadlineExceeded
+is raised instead of making the call. Upload and publish are never abandoned
+at their budget (their side effects would outlive the run); only their calls
+are capped.
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_RUN_SECONDS = 1200.0
+
+# Per-stage budgets (seconds) for the slow pipeline stages; the rest only get the run deadline
+_DEFAULT_STAGE_SECONDS: dict[str, float] = {
+    "content": 420.0,
+    "revision": 360.0,
+    "expansion": 420.0,
+    "final_revision": 360.0,
+    "image": 300.0,
+    "upload": 120.0,
+    "publish": 120.0,
+}
+
+# Below this many seconds a call isn't worth starting
+MIN_CALL_SECONDS = 5.0
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("run_deadline", default=None)
+_stage_seconds: dict[str, float] | None = None
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def run_seconds() -> float:
+    try:
+        return float(os.environ.get("RUN_DEADLINE_SECONDS", _DEFAULT_RUN_SECONDS))
+    except ValueError:
+        return _DEFAULT_RUN_SECONDS
+
+
+def stage_seconds(stage: str) -> float | None:
+    global _stage_seconds
+    if _stage_seconds is None:
+        merged = dict(_DEFAULT_STAGE_SECONDS)
+        raw = os.environ.get("STAGE_TIMEOUTS")
+        if raw:
+            try:
+                merged.update({k: float(v) for k, v in json.loads(raw).items()})
+            except (ValueError, TypeError, AttributeError) as exc:
+                logger.warning("[deadline] ignoring invalid STAGE_TIMEOUTS: %s", exc)
+        _stage_seconds = merged
+    return _stage_seconds.get(stage)
+
+
+@contextmanager
+def within(seconds: float | None) -> Iterator[None]:
+    """Run the block under a deadline seconds from now — or the enclosing one, if sooner."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    candidate = time.monotonic() + seconds
+    token = _deadline.set(candidate if current is None else min(current, candidate))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def suspended() -> Iterator[None]:
+    """Run the block without a deadline — for a lookup that has to happen even once the time is gone."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline (negative once passed); None without one."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def check(what: str = "call") -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"run deadline exceeded before {what}")
+
+
+def timeout(default: float, what: str = "call") -> float:
+    """default, capped at the time left; raises DeadlineExceeded when too little is left to try."""
+    left = remaining()
+    if left is None:
+        return default
+    if left < MIN_CALL_SECONDS:
+        raise DeadlineExceeded(f"run deadline: {max(left, 0.0):.1f}s left, not starting {what}")
+    return min(default, left)
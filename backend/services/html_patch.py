@@ -0,0 +1,164 @@
+"""Targeted edits to post HTML — split the body into numbered top-level blocks and
+apply edit operations by splicing, so untouched text stays byte-identical.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import typing
+from dataclasses import dataclass
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+_OPEN_TAG_RE = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)\b[^>]*?(/?)>")
+_VOID_TAGS = {"img", "hr", "br"}
+
+EditOpName = Literal["replace_block", "insert_after", "delete_block", "replace_text", "insert_link"]
+EDIT_OPS: tuple[str, ...] = typing.get_args(EditOpName)
+
+
+@dataclass
+class Block:
+    index: int
+    start: int
+    end: int
+    tag: str
+    html: str
+
+
+@dataclass
+class EditOp:
+    op: EditOpName
+    block: int    # target block number; -1 with insert_after = before the first block
+    html: str     # replace_block / insert_after
+    find: str     # replace_text: exact text to replace; insert_link: exact anchor text
+    replace: str  # replace_text: replacement; insert_link: href
+
+
+def split_blocks(html: str) -> list[Block]:
+    """Top-level elements of html in document order, with their source offsets."""
+    blocks: list[Block] = []
+    pos = 0
+    while True:
+        m = _OPEN_TAG_RE.search(html, pos)
+        if m is None:
+            break
+        tag = m.group(1).lower()
+        if tag in _VOID_TAGS or m.group(2):
+            end = m.end()
+        else:
+            end = _matching_close(html, tag, m.end())
+        blocks.append(Block(index=len(blocks), start=m.start(), end=end, tag=tag, html=html[m.start():end]))
+        pos = end
+    return blocks
+
+
+def numbered_blocks(blocks: list[Block]) -> str:
+    """Render blocks for the model as [B0] <p>…</p> lines."""
+    return "\n".join(f"[B{b.index}] {b.html}" for b in blocks)
+
+
+def apply_edits(html: str, edits: list[EditOp], skip_invalid: bool = False) -> str:
+    """Apply edits to html; RuntimeError if any edit doesn't fit the document.
+
+    With skip_invalid, an edit that doesn't fit is logged and dropped instead.
+    """
+    blocks = split_blocks(html)
+    replaced: dict[int, str] = {}
+    inserted: dict[int, list[str]] = {}
+
+    for edit in edits:
+        try:
+            _stage_edit(edit, blocks, replaced, inserted)
+        except RuntimeError as exc:
+            if not skip_invalid:
+                raise
+            logger.warning("[html_patch] skipping edit: %s", exc)
+
+    # Splice back to front so earlier offsets stay valid
+    out = html
+    for block in reversed(blocks):
+        additions = inserted.get(block.index)
+        if additions:
+            out = out[:block.end] + "".join(f"\n{a}" for a in additions) + out[block.end:]
+        if block.index in replaced:
+            out = out[:block.start] + replaced[block.index] + out[block.end:]
+    if -1 in inserted:
+        out = "".join(f"{a}\n" for a in inserted[-1]) + out
+    return out
+
+
+def edits_from_json(data: object) -> list[EditOp]:
+    """Parse a model's edits array into EditOps (op/range checks happen in apply_edits)."""
+    if not isinstance(data, list):
+        raise RuntimeError("Patch: missing edits array")
+
+    edits: list[EditOp] = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise RuntimeError(f"Patch: edit {i} is not an object")
+        block = item.get("block", -1)
+        if not isinstance(block, (int, float)):
+            raise RuntimeError(f"Patch: edit {i} has no block number")
+        edits.append(EditOp(
+            op=str(item.get("op", "")),
+            block=int(block),
+            html=str(item.get("html", "")),
+            find=str(item.get("find", "")),
+            replace=str(item.get("replace", "")),
+        ))
+    return edits
+
+
+def _stage_edit(
+    edit: EditOp,
+    blocks: list[Block],
+    replaced: dict[int, str],
+    inserted: dict[int, list[str]],
+) -> None:
+    """Validate one edit and record its effect on the block table."""
+    if edit.op not in EDIT_OPS:
+        raise RuntimeError(f"Patch: unknown edit op '{edit.op}'")
+    if edit.op == "insert_after":
+        if not -1 <= edit.block < len(blocks):
+            raise RuntimeError(f"Patch: insert_after block {edit.block} out of range")
+        if not edit.html.strip():
+            raise RuntimeError("Patch: insert_after with empty html")
+        inserted.setdefault(edit.block, []).append(edit.html.strip())
+        return
+
+    if not 0 <= edit.block < len(blocks):
+        raise RuntimeError(f"Patch: {edit.op} block {edit.block} out of range")
+    current = replaced.get(edit.block, blocks[edit.block].html)
+
+    if edit.op == "replace_block":
+        if not edit.html.strip():
+            raise RuntimeError("Patch: replace_block with empty html")
+        replaced[edit.block] = edit.html.strip()
+    elif edit.op == "delete_block":
+        replaced[edit.block] = ""
+    elif edit.op == "replace_text":
+        if not edit.find or edit.find not in current:
+            raise RuntimeError(f"Patch: text to replace not found in block {edit.block}")
+        replaced[edit.block] = current.replace(edit.find, edit.replace, 1)
+    elif edit.op == "insert_link":
+        if not edit.find or edit.find not in current:
+            raise RuntimeError(f"Patch: anchor text not found in block {edit.block}")
+        if not edit.replace.startswith(("http", "/")):
+            raise RuntimeError(f"Patch: invalid link href '{edit.replace}'")
+        link = f'<a href="{edit.replace}">{edit.find}</a>'
+        replaced[edit.block] = current.replace(edit.find, link, 1)
+
+
+def _matching_close(html: str, tag: str, pos: int) -> int:
+    """Offset just past the close tag matching an open <tag> that ended at pos."""
+    pattern = re.compile(rf"<(/?){tag}\b[^>]*>", re.IGNORECASE)
+    depth = 1
+    for m in pattern.finditer(html, pos):
+        if m.group(0).endswith("/>"):
+            continue
+        depth += -1 if m.group(1) else 1
+        if depth == 0:
+            return m.end()
+    return len(html)  # unclosed — the block runs to the end
@@ -0,0 +1,60 @@
+"""Idempotency keys for the blog and upload APIs — retries never create a second post or file.
+
+A key is derived from what is being written (queue item id, title, content or
+image bytes), so every retry of the same write carries the same key, and a
+re-run that produces different content gets a new one. Keys are sent as the
+Idempotency-Key header. Servers that honour it return the original result,
+and for servers that don't, the callers look the earlier write up before
+trying again.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+HEADER = "Idempotency-Key"
+
+
+def idempotency_key(scope: str, *parts: str | bytes) -> str:
+    """Stable key for one logical write: scope plus a SHA-256 of the parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else part.encode()
+        digest.update(len(data).to_bytes(8, "big"))  # length-prefixed, so ("ab", "c") != ("a", "bc")
+        digest.update(data)
+    return f"{scope}-{digest.hexdigest()[:32]}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class RecentResults(Generic[V]):
+    """Small thread-safe LRU of results by idempotency key, for retries within this process."""
+
+    def __init__(self, size: int = 32) -> None:
+        self._size = size
+        self._items: OrderedDict[str, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> V | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: V) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+
+    def pop(self, key: str) -> V | None:
+        with self._lock:
+            return self._items.pop(key, None)
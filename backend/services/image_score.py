@@ -0,0 +1,234 @@
+"""Local cover-image scoring against the brand palette — NumPy + Pillow, optional.
+
+Each candidate is decoded to a downscaled array and converted to CIELAB. It
+is then scored on:
+  palette     — closeness of every pixel to its nearest brand colour, minus the
+                share of vivid off-hue pixels (blues, greens, magentas)
+  brightness  — mean lightness inside the brand's light, airy range
+  contrast    — lightness spread: neither a flat wash nor harsh
+  text        — a text-overlay heuristic: horizontal bands with far more sharp
+                vertical edges than the rest of the frame
+The palette defaults to the Jesse A. Eisenbalm colours and can be overridden per
+tenant with extra["palette"] (hex strings). Thresholds can be overridden with
+IMAGE_THRESHOLDS, e.g. {"min_score": 60}.
+
+Scoring runs in a small spawn-based process pool, so decoding and array work
+don't hold the GIL the API and pipeline threads share. Without numpy or Pillow
+installed, available() is False and the image agent skips scoring.
+"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+
+from services import deadline
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # scoring is optional
+    np = None  # type: ignore[assignment]
+    Image = None  # type: ignore[assignment]
+
+DEFAULT_PALETTE = {
+    "cream": "#FAF8F3",
+    "warm_beige": "#E8DCC8",
+    "sand": "#C8B496",
+    "honey_gold": "#D4A64A",
+    "amber": "#A8763E",
+    "warm_grey": "#8C8680",
+    "soft_black": "#2A2724",
+}
+
+_DEFAULT_THRESHOLDS: dict[str, float] = {
+    "min_score": 55,
+    "min_palette": 0.35,
+    "max_text": 0.6,
+    "min_brightness": 30,   # mean L*, 0–100
+    "max_brightness": 96,
+    "min_contrast": 6,      # std of L*
+}
+
+_ANALYSIS_WIDTH = 256
+_MAX_DELTA_E = 40.0         # ΔE at which a pixel counts as fully off-palette
+_VIVID_CHROMA = 40.0
+_WARM_HUES = (20.0, 110.0)  # a*/b* hue angles (degrees) covering reds → yellows
+_EDGE_STEP = 25.0           # L* jump between neighbouring pixels that counts as a sharp edge
+_TEXT_BANDS = 24
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_thresholds: dict[str, float] | None = None
+
+
+@dataclass
+class ImageScore:
+    total: float
+    palette: float
+    brightness: float
+    contrast: float
+    text: float
+    passed: bool
+    reasons: list[str] = field(default_factory=list)
+    histogram: dict[str, float] = field(default_factory=dict)  # pixel share per palette colour + "other"
+
+
+def available() -> bool:
+    return np is not None and Image is not None
+
+
+def thresholds() -> dict[str, float]:
+    global _thresholds
+    if _thresholds is None:
+        merged = dict(_DEFAULT_THRESHOLDS)
+        raw = os.environ.get("IMAGE_THRESHOLDS")
+        if raw:
+            try:
+                merged.update({k: float(v) for k, v in json.loads(raw).items()})
+            except (ValueError, TypeError, AttributeError) as exc:
+                logger.warning("[image_score] ignoring invalid IMAGE_THRESHOLDS: %s", exc)
+        _thresholds = merged
+    return _thresholds
+
+
+def score_image(image_bytes: bytes, palette: dict[str, str] | None = None,
+                limits: dict[str, float] | None = None) -> ImageScore:
+    """Score one encoded image (PNG/JPEG/WebP) in this process."""
+    if not available():
+        raise RuntimeError("image scoring needs numpy and Pillow")
+    limits = limits or thresholds()
+    palette = palette or DEFAULT_PALETTE
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = img.convert("RGB")
+        if img.width > _ANALYSIS_WIDTH:
+            img = img.resize((_ANALYSIS_WIDTH, max(1, round(img.height * _ANALYSIS_WIDTH / img.width))))
+        rgb = np.asarray(img, dtype=np.float32) / 255.0
+
+    lab = _rgb_to_lab(rgb)
+    lightness = lab[..., 0]
+
+    names = list(palette)
+    palette_lab = _rgb_to_lab(np.array([[_hex_rgb(palette[n]) for n in names]], dtype=np.float32) / 255.0)[0]
+    pixels = lab.reshape(-1, 3)
+    distances = np.linalg.norm(pixels[:, None, :] - palette_lab[None, :, :], axis=2)
+    nearest = distances.argmin(axis=1)
+    nearest_distance = distances[np.arange(len(pixels)), nearest]
+    closeness = float(np.clip(1.0 - nearest_distance / _MAX_DELTA_E, 0.0, 1.0).mean())
+
+    chroma = np.hypot(pixels[:, 1], pixels[:, 2])
+    hue = np.degrees(np.arctan2(pixels[:, 2], pixels[:, 1])) % 360
+    off_hue = (chroma > _VIVID_CHROMA) & ((hue < _WARM_HUES[0]) | (hue > _WARM_HUES[1]))
+    palette_score = max(0.0, closeness - float(off_hue.mean()))
+
+    on_palette = nearest_distance < _MAX_DELTA_E / 2
+    histogram = {
+        name: round(float(((nearest == i) & on_palette).mean()), 3) for i, name in enumerate(names)
+    }
+    histogram["other"] = round(float((~on_palette).mean()), 3)
+
+    brightness = float(lightness.mean())
+    contrast = float(lightness.std())
+    text = _text_likelihood(lightness)
+
+    brightness_fit = _range_fit(brightness, limits["min_brightness"], limits["max_brightness"], 20.0)
+    contrast_fit = _range_fit(contrast, limits["min_contrast"], 35.0, 10.0)
+    total = 100.0 * (0.5 * palette_score + 0.2 * brightness_fit + 0.15 * contrast_fit + 0.15 * (1.0 - text))
+
+    reasons: list[str] = []
+    if total < limits["min_score"]:
+        reasons.append(f"score {total:.0f} < {limits['min_score']:.0f}")
+    if palette_score < limits["min_palette"]:
+        reasons.append(f"palette {palette_score:.2f} < {limits['min_palette']:.2f}")
+    if text > limits["max_text"]:
+        reasons.append(f"likely text overlay ({text:.2f})")
+    if not limits["min_brightness"] <= brightness <= limits["max_brightness"]:
+        reasons.append(f"brightness {brightness:.0f} outside {limits['min_brightness']:.0f}–{limits['max_brightness']:.0f}")
+    if contrast < limits["min_contrast"]:
+        reasons.append(f"contrast {contrast:.1f} < {limits['min_contrast']:.1f}")
+
+    return ImageScore(
+        total=round(total, 1),
+        palette=round(palette_score, 3),
+        brightness=round(brightness, 1),
+        contrast=round(contrast, 1),
+        text=round(text, 3),
+        passed=not reasons,
+        reasons=reasons,
+        histogram=histogram,
+    )
+
+
+def score_images(images: list[bytes], palette: dict[str, str] | None = None) -> list[ImageScore]:
+    """Score candidates in the process pool, in input order, within the run deadline."""
+    limits = thresholds()
+    pool = _process_pool()
+    left = deadline.remaining()
+    results = pool.map(
+        score_image, images, [palette] * len(images), [limits] * len(images),
+        timeout=None if left is None else max(left, 0.0),
+    )
+    return list(results)
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent has live threads (scheduler, executor, Supabase loop)
+            workers = int(os.environ.get("IMAGE_SCORE_WORKERS", "2"))
+            _pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=get_context("spawn"))
+    return _pool
+
+
+def _rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """sRGB in [0, 1] (…, 3) → CIELAB under D65."""
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    matrix = np.array([
+        [0.4124, 0.3576, 0.1805],
+        [0.2126, 0.7152, 0.0722],
+        [0.0193, 0.1192, 0.9505],
+    ], dtype=np.float32)
+    xyz = linear @ matrix.T / np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    return np.stack([
+        116.0 * f[..., 1] - 16.0,
+        500.0 * (f[..., 0] - f[..., 1]),
+        200.0 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def _text_likelihood(lightness: np.ndarray) -> float:
+    """0–1: how strongly one horizontal band is denser in sharp vertical edges than the frame.
+
+    Rendered text is a row of glyphs with crisp, frequent left/right edges; photographic
+    texture spreads its edges across the frame, which raises the median band too.
+    """
+    if lightness.shape[0] < _TEXT_BANDS or lightness.shape[1] < 2:
+        return 0.0
+    edges = np.abs(np.diff(lightness, axis=1)) > _EDGE_STEP
+    rows = edges.mean(axis=1)
+    usable = len(rows) - len(rows) % _TEXT_BANDS
+    bands = rows[:usable].reshape(_TEXT_BANDS, -1).mean(axis=1)
+    peak, median = float(bands.max()), float(np.median(bands))
+    return float(np.clip((peak - 2.0 * median - 0.02) / 0.15, 0.0, 1.0))
+
+
+def _range_fit(value: float, low: float, high: float, falloff: float) -> float:
+    if low <= value <= high:
+        return 1.0
+    gap = low - value if value < low else value - high
+    return max(0.0, 1.0 - gap / falloff)
+
+
+def _hex_rgb(value: str) -> tuple[int, int, int]:
+    value = value.lstrip("#")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
@@ -0,0 +1,225 @@
+"""Job runners — pipeline runs execute in the background and are polled by id.
+
+JobRunner executes jobs in this process. DurableJobQueue only enqueues into the
+pipeline_jobs table; separate worker processes (worker.py) claim and run them.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_MAX_FINISHED_JOBS = 200
+
+StageReporter = Callable[[str], None]
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    tenant_id: str | None = None
+    status: str = "queued"      # "queued" | "running" | "done" | "error"
+    stage: str | None = None
+    submitted_at: str = ""
+    started_at: str | None = None
+    finished_at: str | None = None
+    stage_timings: dict[str, float] = field(default_factory=dict)
+    result: dict[str, Any] | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in self.__dict__.items() if v is not None}
+
+
+class JobRunner:
+    """Bounded thread pool that tracks status, current stage and timings per job.
+
+    Waiting jobs are queued per tenant and dispatched round-robin, so one tenant's
+    backlog can't starve the others.
+    """
+
+    def __init__(self, max_concurrency: int = 2) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="job")
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._waiting: OrderedDict[str, deque[tuple[Job, Callable[[StageReporter], Any]]]] = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[StageReporter], Any],
+        tenant_id: str | None = None,
+    ) -> Job:
+        """Queue fn for execution. fn receives a callback to report its current stage."""
+        job = Job(id=str(uuid.uuid4()), kind=kind, tenant_id=tenant_id, submitted_at=_now_iso())
+        with self._lock:
+            self._jobs[job.id] = job
+            self._waiting.setdefault(tenant_id or "", deque()).append((job, fn))
+            self._prune()
+        self._dispatch()
+        logger.info("[jobs] queued %s job %s (depth=%d)", kind, job.id, self.queue_depth())
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> list[Job]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status == "queued")
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status == "running")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": "local",
+            "max_concurrency": self.max_concurrency,
+            "running": self.running_count(),
+            "queue_depth": self.queue_depth(),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ── Internal ────────────────────────────────────────────────────────────────
+
+    def _dispatch(self) -> None:
+        """Start waiting jobs while slots are free, taking one per tenant in turn."""
+        with self._lock:
+            while self._active < self.max_concurrency and self._waiting:
+                tenant, queue = next(iter(self._waiting.items()))
+                job, fn = queue.popleft()
+                del self._waiting[tenant]
+                if queue:
+                    self._waiting[tenant] = queue  # back of the rotation
+                self._active += 1
+                self._executor.submit(self._run, job, fn)
+
+    def _run(self, job: Job, fn: Callable[[StageReporter], Any]) -> None:
+        try:
+            self._execute(job, fn)
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._dispatch()
+
+    def _execute(self, job: Job, fn: Callable[[StageReporter], Any]) -> None:
+        start = time.monotonic()
+        stage_start = start
+        job.status = "running"
+        job.started_at = _now_iso()
+
+        def report_stage(stage: str) -> None:
+            nonlocal stage_start
+            now = time.monotonic()
+            if job.stage is not None:
+                job.stage_timings[job.stage] = round(now - stage_start, 3)
+            job.stage = stage
+            stage_start = now
+
+        try:
+            result = fn(report_stage)
+            job.result = result.to_dict() if hasattr(result, "to_dict") else result
+            job.status = "error" if isinstance(job.result, dict) and job.result.get("status") == "error" else "done"
+        except Exception as exc:
+            logger.error("[jobs] %s job %s failed: %s", job.kind, job.id, exc)
+            job.status = "error"
+            job.error = str(exc)
+        finally:
+            now = time.monotonic()
+            if job.stage is not None:
+                job.stage_timings[job.stage] = round(now - stage_start, 3)
+            job.stage_timings["total"] = round(now - start, 3)
+            job.finished_at = _now_iso()
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in ("done", "error")]
+        for jid in finished[: max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+            del self._jobs[jid]
+
+
+class DurableJobQueue:
+    """Same interface as JobRunner, backed by the pipeline_jobs table."""
+
+    def __init__(self) -> None:
+        from services import supabase_client as db
+        self._db = db
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[StageReporter], Any] | None = None,
+        tenant_id: str | None = None,
+    ) -> Job:
+        """Enqueue a job of this kind; fn is ignored — workers resolve the kind to a callable."""
+        row = self._db.enqueue_job(kind, tenant_id)
+        logger.info("[jobs] enqueued durable %s job %s", kind, row["id"])
+        return job_from_row(row)
+
+    def get(self, job_id: str) -> Job | None:
+        row = self._db.get_job(job_id)
+        return job_from_row(row) if row else None
+
+    def list(self, limit: int = 50) -> list[Job]:
+        return [job_from_row(r) for r in self._db.list_jobs(limit)]
+
+    def queue_depth(self) -> int:
+        return self._db.count_jobs("queued")
+
+    def running_count(self) -> int:
+        return self._db.count_jobs("running")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": "durable",
+            "running": self.running_count(),
+            "queue_depth": self.queue_depth(),
+        }
+
+    def shutdown(self) -> None:
+        pass
+
+
+def job_from_row(row: dict[str, Any]) -> Job:
+    return Job(
+        id=row["id"],
+        kind=row.get("kind") or "pipeline",
+        tenant_id=row.get("tenant_id"),
+        status=row.get("status") or "queued",
+        stage=row.get("stage"),
+        submitted_at=row.get("submitted_at") or "",
+        started_at=row.get("started_at"),
+        finished_at=row.get("finished_at"),
+        stage_timings=row.get("stage_timings") or {},
+        result=row.get("result"),
+        error=row.get("error"),
+    )
+
+
+def create_job_backend() -> JobRunner | DurableJobQueue:
+    """Pick the job backend from JOB_BACKEND ("local" default, or "durable")."""
+    if os.environ.get("JOB_BACKEND", "local").lower() == "durable":
+        return DurableJobQueue()
+    return JobRunner(max_concurrency=int(os.environ.get("PIPELINE_MAX_CONCURRENCY", "2")))
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
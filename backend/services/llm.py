@@ -0,0 +1,115 @@
+"""Single entry point for chat completions — every agent call goes through here."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from services import deadline
+from services.model_routing import model_router
+from services.providers import openai_client
+from services.rate_limit import estimate_tokens, rate_limiter
+from services.tracing import current_span, mark_error, span
+
+logger = logging.getLogger(__name__)
+
+# Completion budget assumed when a route doesn't set max_tokens
+_DEFAULT_COMPLETION_ESTIMATE = 4096
+
+
+def chat_completion(*, agent: str, messages: list[dict[str, str]], **kwargs: Any) -> Any:
+    """Create a chat completion on the agent's routed model, falling back down its chain.
+
+    Model, temperature, max_tokens and timeout come from the agent's route; a
+    temperature kwarg overrides the route's and other kwargs (response_format etc.)
+    are passed through. A model that is unavailable or times
+    out is skipped for a cool-down and the next candidate is tried. Inside a run
+    deadline each call's timeout is capped at the time left, and running out of
+    it raises DeadlineExceeded rather than falling back.
+    """
+    import openai
+
+    router = model_router()
+    route = router.route(agent)
+    candidates = router.ordered_candidates(agent)
+    temperature = kwargs.pop("temperature", route.temperature)
+    last_exc: Exception | None = None
+
+    for index, model in enumerate(candidates):
+        with span(
+            f"llm.{agent}",
+            **{
+                "gen_ai.system": "openai",
+                "gen_ai.request.model": model,
+                "gen_ai.request.temperature": temperature,
+                "gen_ai.request.max_tokens": route.max_tokens,
+                "llm.agent": agent,
+                "llm.fallback_index": index,
+            },
+        ) as current:
+            try:
+                return _create(model, messages, temperature, route.max_tokens, route.timeout, kwargs)
+            except (
+                openai.APITimeoutError,
+                openai.APIConnectionError,
+                openai.InternalServerError,
+                openai.NotFoundError,
+                openai.RateLimitError,
+            ) as exc:
+                last_exc = exc
+                current.record_exception(exc)
+                mark_error(current, type(exc).__name__)
+                # A 429 clears quickly; a missing or failing model stays out longer
+                router.mark_unavailable(model, 30.0 if isinstance(exc, openai.RateLimitError) else None)
+                logger.warning("[llm] %s: %s unavailable (%s) — trying next model", agent, model, type(exc).__name__)
+
+    raise last_exc or RuntimeError(f"No model candidates for agent '{agent}'")
+
+
+def _create(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float,
+    max_tokens: int | None,
+    timeout: float,
+    extra: dict[str, Any],
+) -> Any:
+    """Reserve RPM/TPM capacity, call the model and record its latency.
+
+    The reservation assumes the whole max_tokens budget (as OpenAI's own limiter
+    does) and is corrected with response.usage once the call returns. A call
+    that fails is refunded in full, so repeated errors don't throttle healthy calls.
+    """
+    import openai
+
+    estimate = estimate_tokens(m.get("content") or "" for m in messages)
+    estimate += max_tokens or _DEFAULT_COMPLETION_ESTIMATE
+    reservation = rate_limiter().acquire("openai", model, estimate)
+
+    start = time.monotonic()
+    try:
+        # Capped after the rate-limit wait, so the wait itself comes out of the budget
+        call_timeout = deadline.timeout(timeout, f"{model} call")
+        params: dict[str, Any] = {"temperature": temperature, "timeout": call_timeout, **extra}
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        response = openai_client().chat.completions.create(model=model, messages=messages, **params)
+    except openai.APITimeoutError as exc:
+        reservation.settle(0)
+        if call_timeout < timeout:  # our deadline, not the model, ran out — don't demote it
+            raise deadline.DeadlineExceeded(f"run deadline reached during {model} call") from exc
+        raise
+    except BaseException:
+        reservation.settle(0)
+        raise
+    model_router().record_latency(model, time.monotonic() - start)
+
+    usage = getattr(response, "usage", None)
+    reservation.settle(getattr(usage, "total_tokens", None))
+    current_span().set_attributes({
+        "llm.estimated_tokens": estimate,
+        "gen_ai.usage.input_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "gen_ai.usage.output_tokens": getattr(usage, "completion_tokens", None) or 0,
+        "gen_ai.response.model": getattr(response, "model", None) or model,
+    })
+    return response
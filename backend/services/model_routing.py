@@ -0,0 +1,142 @@
+"""Per-agent model routing — model, sampling, timeout and fallback chain per agent.
+
+Cheap fast models take the bulk and mechanical stages (topic ideation, content
+expansion); GPT-4o is kept for drafting and the revision audit. Routes can be
+overridden with MODEL_ROUTES, e.g. {"topic": {"model": "gpt-4o", "fallbacks": []}}.
+
+The registry also tracks observed latency per model. A model whose recent p95
+exceeds the route's demote_p95_seconds, or that recently failed as unavailable,
+is moved to the back of the candidate list until it recovers.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+
+logger = logging.getLogger(__name__)
+
+_LATENCY_WINDOW = 50
+_MIN_SAMPLES_FOR_DEMOTION = 5
+_UNAVAILABLE_COOLDOWN_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    temperature: float
+    max_tokens: int | None = None
+    timeout: float = 120.0
+    fallbacks: tuple[str, ...] = ()
+    demote_p95_seconds: float | None = None
+
+    def candidates(self) -> list[str]:
+        return [self.model, *[m for m in self.fallbacks if m != self.model]]
+
+
+_DEFAULT_ROUTES: dict[str, Route] = {
+    "content": Route("gpt-4o", 0.7, 16384, timeout=300.0, fallbacks=("gpt-4o-mini",), demote_p95_seconds=240.0),
+    "outline": Route("gpt-4o", 0.7, 4096, timeout=120.0, fallbacks=("gpt-4o-mini",)),
+    "section": Route("gpt-4o", 0.7, 4096, timeout=120.0, fallbacks=("gpt-4o-mini",), demote_p95_seconds=90.0),
+    "revision": Route("gpt-4o", 0.3, 16384, timeout=300.0, fallbacks=("gpt-4o-mini",), demote_p95_seconds=240.0),
+    "audit": Route("gpt-4o", 0.3, 4096, timeout=120.0, fallbacks=("gpt-4o-mini",), demote_p95_seconds=90.0),
+    "expansion": Route("gpt-4o-mini", 0.7, 16384, timeout=180.0, fallbacks=("gpt-4o",)),
+    "topic": Route("gpt-4o-mini", 0.85, None, timeout=90.0, fallbacks=("gpt-4o",)),
+}
+
+
+@dataclass
+class _ModelStats:
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+    unavailable_until: float = 0.0
+
+
+class ModelRouter:
+    def __init__(self, routes: dict[str, Route] | None = None) -> None:
+        self._routes = dict(routes or _load_routes())
+        self._stats: dict[str, _ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def route(self, agent: str) -> Route:
+        route = self._routes.get(agent)
+        if route is None:
+            raise RuntimeError(f"No model route configured for agent '{agent}'")
+        return route
+
+    def ordered_candidates(self, agent: str) -> list[str]:
+        """Route candidates with unavailable or too-slow models moved to the back."""
+        route = self.route(agent)
+        now = time.monotonic()
+        healthy: list[str] = []
+        demoted: list[str] = []
+        with self._lock:
+            for model in route.candidates():
+                stats = self._stats.get(model)
+                slow = (
+                    route.demote_p95_seconds is not None
+                    and stats is not None
+                    and len(stats.latencies) >= _MIN_SAMPLES_FOR_DEMOTION
+                    and _percentile(stats.latencies, 95) > route.demote_p95_seconds
+                )
+                down = stats is not None and stats.unavailable_until > now
+                (demoted if slow or down else healthy).append(model)
+        if demoted and healthy and demoted[0] == route.model:
+            logger.info("[routing] %s: demoting %s", agent, route.model)
+        return healthy + demoted
+
+    def record_latency(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self._stats.setdefault(model, _ModelStats()).latencies.append(seconds)
+
+    def mark_unavailable(self, model: str, cooldown_seconds: float | None = None) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(model, _ModelStats())
+            stats.unavailable_until = time.monotonic() + (cooldown_seconds or _UNAVAILABLE_COOLDOWN_SECONDS)
+
+    def latency_percentiles(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                model: {"p50": _percentile(s.latencies, 50), "p95": _percentile(s.latencies, 95), "n": len(s.latencies)}
+                for model, s in self._stats.items()
+                if s.latencies
+            }
+
+
+def _percentile(values: deque[float] | list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _load_routes() -> dict[str, Route]:
+    routes = dict(_DEFAULT_ROUTES)
+    raw = os.environ.get("MODEL_ROUTES")
+    if raw:
+        try:
+            for agent, cfg in json.loads(raw).items():
+                base = routes.get(agent) or Route(model=cfg["model"], temperature=0.7)
+                if "fallbacks" in cfg:
+                    cfg = {**cfg, "fallbacks": tuple(cfg["fallbacks"])}
+                routes[agent] = replace(base, **cfg)
+        except (ValueError, TypeError, KeyError, AttributeError) as exc:
+            logger.warning("[routing] ignoring invalid MODEL_ROUTES: %s", exc)
+    return routes
+
+
+_router: ModelRouter | None = None
+_router_lock = threading.Lock()
+
+
+def model_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
@@ -0,0 +1,139 @@
+"""Aho-Corasick multi-phrase matcher — every phrase hit in one linear pass.
+
+Matching is case-insensitive, respects word boundaries (like regex \\b) and
+treats any run of whitespace as a single space, so a phrase split across a line
+break still matches. scan_html() masks tags with spaces first, which keeps
+offsets pointing into the original HTML while ignoring attributes and markup.
+"""
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    start: int
+    end: int
+    phrase: str   # the phrase as given to the matcher
+    label: str    # caller-defined group (defaults to the phrase)
+    text: str     # the matched text as it appears in the document
+
+
+class PhraseMatcher:
+    def __init__(self, phrases: Iterable[str] | Mapping[str, str]) -> None:
+        labels = dict(phrases) if isinstance(phrases, Mapping) else {p: p for p in phrases}
+        self._phrases: list[str] = []
+        self._labels: list[str] = []
+        self._lengths: list[int] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for phrase, label in labels.items():
+            key = _normalise(phrase)
+            if not key:
+                continue
+            state = 0
+            for ch in key:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(len(self._phrases))
+            self._phrases.append(phrase)
+            self._labels.append(label)
+            self._lengths.append(len(key))
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def _build_failure_links(self) -> None:
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> list[PhraseMatch]:
+        """Every whole-word occurrence of every phrase, in order of end position."""
+        goto, fail, out = self._goto, self._fail, self._out
+        matches: list[PhraseMatch] = []
+        positions: list[int] = []  # original offset of each normalised character consumed
+        state = 0
+        prev_space = True
+
+        for i, raw in enumerate(text):
+            if raw.isspace():
+                if prev_space:
+                    continue
+                ch = " "
+                prev_space = True
+            else:
+                ch = _fold(raw)
+                prev_space = False
+            positions.append(i)
+
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            for pid in out[state]:
+                start = positions[len(positions) - self._lengths[pid]]
+                end = i + 1
+                if _is_boundary(text, start, end):
+                    matches.append(PhraseMatch(start, end, self._phrases[pid], self._labels[pid], text[start:end]))
+        return matches
+
+    def find(self, text: str) -> list[PhraseMatch]:
+        """Leftmost-longest non-overlapping matches, in document order."""
+        chosen: list[PhraseMatch] = []
+        for m in sorted(self.find_all(text), key=lambda m: (m.start, -(m.end - m.start))):
+            if not chosen or m.start >= chosen[-1].end:
+                chosen.append(m)
+        return chosen
+
+    def scan_html(self, html: str) -> list[PhraseMatch]:
+        """find() over the visible text of html; offsets index into html itself."""
+        masked = _TAG_RE.sub(lambda m: " " * len(m.group(0)), html)
+        return [
+            PhraseMatch(m.start, m.end, m.phrase, m.label, html[m.start:m.end])
+            for m in self.find(masked)
+        ]
+
+
+def _fold(ch: str) -> str:
+    lowered = ch.lower()
+    return lowered if len(lowered) == 1 else ch
+
+
+def _normalise(phrase: str) -> str:
+    return " ".join("".join(_fold(c) for c in phrase).split())
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    """Same rule as regex \\b on both sides of a phrase that starts/ends with a word character."""
+    if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
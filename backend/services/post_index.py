@@ -0,0 +1,275 @@
+"""Local index of published posts — related titles and internal-link targets per topic.
+
+One JSON file per tenant holds every post the pipeline has created (title,
+slug, focus keyphrase, tags) plus an inverted index from terms to posts, so
+related posts for a topic come from a few dictionary lookups instead of
+sending the whole post history to the model. The pipeline adds each post as
+it is created; on first use (or with --rebuild) the file is seeded from the
+blog API's post list, so a fresh disk recovers on its own.
+
+Several processes (the API and worker.py --processes N) share the file: each
+reloads it when its mtime changes, and writes re-read the file under an
+exclusive lock on a sidecar .lock file before saving, so no process overwrites
+posts another one added.
+
+    cd backend && python -m services.post_index --rebuild
+    cd backend && python -m services.post_index --query "beeswax lip balm in winter"
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from services.tenants import current_tenant, use_tenant
+
+try:
+    import fcntl
+except ImportError:  # not POSIX — writes are only serialised within this process
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+_INDEX_DIR = Path(__file__).resolve().parent.parent / ".post_index"
+_VERSION = 1
+
+# Keyphrase terms count most toward similarity, then tags, then title words
+_FIELD_WEIGHTS = {"focus_keyphrase": 2.0, "tags": 1.5, "title": 1.0}
+
+# A failed seed from the blog API is retried after this long
+_SEED_RETRY_SECONDS = 300.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how in into is it its more most not of on or "
+    "our than that the their this to vs what when why with without you your".split()
+)
+
+_indexes: dict[str, PostIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+@dataclass
+class IndexedPost:
+    id: str
+    slug: str
+    title: str
+    focus_keyphrase: str = ""
+    tags: list[str] = field(default_factory=list)
+    published: bool = True
+    created_at: str = ""
+
+    def url(self) -> str:
+        return f"{current_tenant().site_url.rstrip('/')}/blog/{self.slug}"
+
+
+class PostIndex:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._posts: dict[str, IndexedPost] = {}
+        self._postings: dict[str, dict[str, float]] = {}  # term → {post id: weight}
+        self._mtime: float | None = None                   # of the file as last loaded or saved
+        self._seed_lock = threading.Lock()
+        self._seed_after = 0.0                              # monotonic time the next seed may run
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._posts)
+
+    def add(self, post: IndexedPost) -> None:
+        """Insert or replace one post and persist the index, keeping other processes' posts."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._insert(post)
+            self._save()
+
+    def replace_all(self, posts: list[IndexedPost]) -> None:
+        with self._lock, self._file_lock():
+            self._posts.clear()
+            self._postings.clear()
+            for post in posts:
+                self._insert(post)
+            self._save()
+
+    def similar(self, text: str, k: int = 5, published_only: bool = False) -> list[tuple[IndexedPost, float]]:
+        """Top k posts by IDF-weighted term overlap with text, best first."""
+        terms = set(_terms(text))
+        with self._lock:
+            self._refresh()
+            total = len(self._posts)
+            scores: dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for post_id, weight in postings.items():
+                    scores[post_id] = scores.get(post_id, 0.0) + idf * weight
+            if published_only:
+                scores = {i: score for i, score in scores.items() if self._posts[i].published}
+            ranked = heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+            return [(self._posts[post_id], round(score, 3)) for post_id, score in ranked]
+
+    def _insert(self, post: IndexedPost) -> None:
+        self._remove(post.id)
+        self._posts[post.id] = post
+        weights: dict[str, float] = {}
+        for name, weight in _FIELD_WEIGHTS.items():
+            value = getattr(post, name)
+            for term in set(_terms(" ".join(value) if isinstance(value, list) else value)):
+                weights[term] = max(weights.get(term, 0.0), weight)
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[post.id] = weight
+
+    def _remove(self, post_id: str) -> None:
+        if self._posts.pop(post_id, None) is None:
+            return
+        for term in [t for t, postings in self._postings.items() if post_id in postings]:
+            del self._postings[term][post_id]
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def _refresh(self) -> None:
+        """Reload from disk if another process has written the file since we last read it."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._load()
+            self._mtime = mtime
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != _VERSION:
+                raise ValueError(f"unsupported version {data.get('version')}")
+            self._posts = {p["id"]: IndexedPost(**p) for p in data["posts"]}
+            self._postings = {term: dict(postings) for term, postings in data["postings"].items()}
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("[post_index] ignoring unreadable %s: %s", self.path, exc)
+            self._posts, self._postings = {}, {}
+
+    def _save(self) -> None:
+        """Write to a temp file and rename, so a crash never leaves a half-written index."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": _VERSION,
+            "posts": [asdict(p) for p in self._posts.values()],
+            "postings": self._postings,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._mtime = self.path.stat().st_mtime
+
+
+def post_index(seed: bool = True) -> PostIndex:
+    """The current tenant's index, seeded from the blog API when it has no file yet.
+
+    Seeding holds only this index's seed lock, and a failed seed is retried
+    after _SEED_RETRY_SECONDS.
+    """
+    tenant_id = current_tenant().id
+    with _indexes_lock:
+        index = _indexes.get(tenant_id)
+        if index is None:
+            directory = Path(os.environ.get("POST_INDEX_DIR") or _INDEX_DIR)
+            index = _indexes[tenant_id] = PostIndex(directory / f"{tenant_id}.json")
+    if seed and not index.path.exists() and time.monotonic() >= index._seed_after:
+        with index._seed_lock:
+            if not index.path.exists() and time.monotonic() >= index._seed_after:
+                try:
+                    rebuild(index)
+                except Exception as exc:
+                    index._seed_after = time.monotonic() + _SEED_RETRY_SECONDS
+                    logger.warning("[post_index] seeding %s from the blog API failed: %s", tenant_id, exc)
+    return index
+
+
+def rebuild(index: PostIndex | None = None) -> int:
+    """Replace the index with the blog API's current post list; returns the post count."""
+    from services.blog_api import list_posts
+
+    if index is None:
+        index = post_index(seed=False)
+    posts = [
+        IndexedPost(
+            id=str(p["id"]),
+            slug=str(p.get("slug") or ""),
+            title=str(p.get("title") or ""),
+            tags=[str(t) for t in p.get("tags") or []],
+            published=bool(p.get("published", True)),
+            created_at=str(p.get("created_at") or ""),
+        )
+        for p in list_posts()
+        if p.get("id")
+    ]
+    index.replace_all(posts)
+    logger.info("[post_index] rebuilt %s with %d posts", index.path.name, len(posts))
+    return len(posts)
+
+
+def _terms(text: str) -> list[str]:
+    """Lowercase word terms without stopwords, with a crude plural strip (balms → balm)."""
+    terms = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if len(word) < 3 or word in _STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain and query the local published-post index.")
+    parser.add_argument("--tenant", help="use this tenant's index (fleet mode)")
+    parser.add_argument("--rebuild", action="store_true", help="reload every post from the blog API")
+    parser.add_argument("--query", help="print the posts most similar to this text")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with use_tenant(args.tenant):
+        if args.rebuild:
+            print(f"Indexed {rebuild()} posts")
+        index = post_index()
+        if args.query:
+            for post, score in index.similar(args.query, args.k):
+                state = "" if post.published else "  (draft)"
+                print(f"{score:>7.3f}  {post.title}  {post.url()}{state}")
+        elif not args.rebuild:
+            print(f"{len(index)} posts in {index.path}")
+
+
+if __name__ == "__main__":
+    main()
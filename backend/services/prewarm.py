@@ -0,0 +1,87 @@
+"""Connection pre-warming — pay SDK imports and TLS handshakes before the first run.
+
+With PREWARM=1 the API starts prewarm() on a background thread from lifespan,
+so it overlaps schedule loading instead of delaying readiness. Each step
+imports an SDK, builds the shared client and makes one cheap request so the
+pooled connection is already open when the first pipeline run needs it. Steps
+are independent: a failure is logged and recorded, never raised.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_results: dict[str, dict[str, object]] = {}
+_results_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.environ.get("PREWARM", "0").strip().lower() in ("1", "true", "yes")
+
+
+def _openai() -> None:
+    from services.model_routing import model_router
+    from services.providers import openai_client
+    # Retrieving the primary content model checks the key and opens the pooled connection
+    openai_client().models.retrieve(model_router().route("content").model)
+
+
+def _supabase_async() -> None:
+    from services import supabase_async as adb
+    adb.run(adb.count_pending_queue_items())
+
+
+def _blog_api() -> None:
+    from services.providers import http_client
+    from services.tenants import current_tenant
+    http_client().head(current_tenant().resolved_blog_api_url(), timeout=10.0)
+
+
+def _gemini() -> None:
+    if not os.environ.get("GEMINI_API_KEY"):
+        return
+    from services.providers import gemini_client
+    gemini_client()
+
+
+_STEPS: dict[str, Callable[[], None]] = {
+    "openai": _openai,
+    "supabase_async": _supabase_async,
+    "blog_api": _blog_api,
+    "gemini": _gemini,
+}
+
+
+def prewarm(steps: list[str] | None = None) -> dict[str, dict[str, object]]:
+    """Run the warm-up steps in order; returns {step: {"ms": …, "ok": …}}."""
+    for name in steps or list(_STEPS):
+        start = time.perf_counter()
+        ok, error = True, None
+        try:
+            _STEPS[name]()
+        except Exception as exc:
+            ok, error = False, f"{type(exc).__name__}: {str(exc)[:200]}"
+            logger.warning("[prewarm] %s failed: %s", name, error)
+        result: dict[str, object] = {"ms": round((time.perf_counter() - start) * 1000, 1), "ok": ok}
+        if error:
+            result["error"] = error
+        with _results_lock:
+            _results[name] = result
+    logger.info("[prewarm] done: %s", {k: v["ms"] for k, v in results().items()})
+    return results()
+
+
+def start_background() -> threading.Thread:
+    thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def results() -> dict[str, dict[str, object]]:
+    with _results_lock:
+        return dict(_results)
@@ -0,0 +1,253 @@
+"""Prompt token profiler — what each prompt builder costs, by section, over time.
+
+Builds every prompt with representative inputs for the current tenant, counts
+tokens per ━━━ SECTION ━━━ and for known components (brand context, structure
+formats, banned list, existing topics, the expansion document …), and appends
+the totals to a JSONL history so growth shows up as a diff between runs.
+
+    cd backend && python -m services.prompt_profile            # table + record
+    cd backend && python -m services.prompt_profile --detail content_system --no-record
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from services.tenants import current_tenant, use_tenant
+from services.token_budget import count_tokens, tokenizer_name, trim_items
+
+_HISTORY_PATH = Path(__file__).resolve().parent.parent / "prompt_profile_history.jsonl"
+_SECTION_RE = re.compile(r"^━━━ (.+?) ━━━$", re.MULTILINE)
+
+_SAMPLE_TOPIC = "Why beeswax lip balm outperforms petroleum jelly in dry offices"
+_SAMPLE_KEYPHRASE = "beeswax lip balm"
+
+
+@dataclass
+class PromptProfile:
+    name: str
+    tokens: int
+    sections: dict[str, int] = field(default_factory=dict)
+    components: dict[str, int] = field(default_factory=dict)
+
+
+def sample_inputs(existing_topics: int = 150, existing_titles: int = 40, document_words: int = 2000) -> dict:
+    """Variable-length inputs, trimmed to their budgets the same way the agents do."""
+    topics = [f"Sample queued topic number {i} about lip care and mindful routines" for i in range(existing_topics)]
+    titles = [f"Sample published post title {i}: rituals, beeswax and focus" for i in range(existing_titles)]
+    return {
+        "existing_topics": trim_items(topics, "existing_topics", keep="first"),
+        "existing_titles": trim_items(titles, "existing_titles", keep="first"),
+        "document": sample_document(document_words),
+        "document_words": document_words,
+    }
+
+
+def sample_prompts(inputs: dict | None = None) -> dict[str, str]:
+    """Every prompt the pipeline sends, built with representative inputs."""
+    from agents.revision import _expansion_digest_messages, _expansion_messages
+    from agents.topic import build_topic_prompts
+    from prompts.content_prompt import (
+        build_content_system_prompt,
+        build_content_user_prompt,
+        build_outline_system_prompt,
+        build_outline_user_prompt,
+        build_section_system_prompt,
+        build_section_user_prompt,
+    )
+    from prompts.revision_prompt import (
+        build_revision_patch_system_prompt,
+        build_revision_patch_user_prompt,
+        build_revision_system_prompt,
+        build_revision_user_prompt,
+        build_subaudit_system_prompt,
+    )
+    from services.html_patch import numbered_blocks, split_blocks
+    from services.token_budget import over_budget
+
+    inputs = inputs or sample_inputs()
+    document, document_words = inputs["document"], inputs["document_words"]
+    headings = [f"Section heading {i}" for i in range(6)]
+    tags = ["lip care", "beeswax", "rituals"]
+
+    prompts = {
+        "content_system": build_content_system_prompt(),
+        "content_user": build_content_user_prompt(
+            _SAMPLE_TOPIC, _SAMPLE_KEYPHRASE, "deep-dive", inputs["existing_titles"]
+        ),
+        "outline_system": build_outline_system_prompt(),
+        "outline_user": build_outline_user_prompt(_SAMPLE_TOPIC, _SAMPLE_KEYPHRASE, "deep-dive"),
+        "section_system": build_section_system_prompt(),
+        "section_user": build_section_user_prompt(
+            "Sample title", "<p>Opening.</p>", headings, 2, "Brief.", 330, _SAMPLE_KEYPHRASE, True, "external"
+        ),
+        "revision_system": build_revision_system_prompt(),
+        "revision_user": build_revision_user_prompt("Sample title", "Sample excerpt", document, tags, _SAMPLE_KEYPHRASE),
+        "revision_patch_system": build_revision_patch_system_prompt(),
+        "revision_patch_user": build_revision_patch_user_prompt(
+            "Sample title", "Sample excerpt", numbered_blocks(split_blocks(document)), tags, _SAMPLE_KEYPHRASE, document_words
+        ),
+    }
+    for name in ("links", "metadata", "voice", "structure"):
+        prompts[f"subaudit_{name}_system"] = build_subaudit_system_prompt(name)
+
+    topic_system, topic_user = build_topic_prompts(15, inputs["existing_topics"])
+    prompts["topic_system"] = topic_system
+    prompts["topic_user"] = topic_user
+
+    build = _expansion_digest_messages if over_budget(document, "expand_document") else _expansion_messages
+    messages = build(document, "Sample title", _SAMPLE_KEYPHRASE, document_words, document_words + 500)
+    prompts["expansion_system"] = messages[0]["content"]
+    prompts["expansion_user"] = messages[1]["content"]
+    return prompts
+
+
+def known_components(inputs: dict | None = None) -> dict[str, str]:
+    """Shared and variable-length blocks worth tracking wherever they appear."""
+    from agents.topic import _CONTENT_PILLARS, _KEYWORD_CLUSTERS
+    from prompts.content_prompt import _BANNED_PHRASES, _SEMANTIC_TERMS, _STRUCTURES
+
+    tenant = current_tenant()
+    components = {
+        "brand_context": tenant.brand_context,
+        "structures": "\n\n".join(f"[{key.upper()}]\n{desc}" for key, desc in _STRUCTURES.items()),
+        "banned_phrases": "\n".join(f"- \"{p}\"" for p in _BANNED_PHRASES),
+        "semantic_terms": tenant.semantic_terms or _SEMANTIC_TERMS,
+        "keyword_clusters": "\n".join(f"- {k}" for k in (tenant.keyword_clusters or _KEYWORD_CLUSTERS)),
+        "content_pillars": "\n".join(f"{i+1}. {p}" for i, p in enumerate(tenant.content_pillars or _CONTENT_PILLARS)),
+    }
+    if inputs:
+        components["existing_topics"] = "\n".join(f"- {t}" for t in inputs["existing_topics"])
+        components["existing_titles"] = "\n".join(f"- {t}" for t in inputs["existing_titles"])
+        components["document"] = inputs["document"]
+    return components
+
+
+def profile_prompt(name: str, text: str, components: dict[str, str] | None = None) -> PromptProfile:
+    sections: dict[str, int] = {}
+    headers = list(_SECTION_RE.finditer(text))
+    if headers:
+        sections["(preamble)"] = count_tokens(text[:headers[0].start()])
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+            sections[header.group(1)] = count_tokens(text[header.start():end])
+
+    found = {
+        key: count_tokens(block) * text.count(block)
+        for key, block in (components or {}).items()
+        if block and block in text
+    }
+    return PromptProfile(name=name, tokens=count_tokens(text), sections=sections, components=found)
+
+
+def profile_all() -> list[PromptProfile]:
+    inputs = sample_inputs()
+    components = known_components(inputs)
+    return [profile_prompt(name, text, components) for name, text in sample_prompts(inputs).items()]
+
+
+def load_history(path: Path = _HISTORY_PATH) -> list[dict]:
+    if not path.exists():
+        return []
+    entries = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def append_history(profiles: list[PromptProfile], path: Path = _HISTORY_PATH) -> dict:
+    entry = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tokenizer": tokenizer_name(),
+        "tenant": current_tenant().id,
+        "prompts": {p.name: p.tokens for p in profiles},
+        "detail": {p.name: {"sections": p.sections, "components": p.components} for p in profiles},
+    }
+    with path.open("a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def sample_document(words: int) -> str:
+    """Synthetic post body: H2 sections of cited three-sentence paragraphs."""
+    sentence = "Beeswax forms a breathable barrier that slows water loss from the lips during long screen days."
+    per_sentence = len(sentence.split())
+    parts: list[str] = ["<p>Beeswax lip balm protects the lip barrier. It is a small, grounding ritual. It works.</p>"]
+    written = 15
+    section = 0
+    while written < words:
+        if written // 300 >= section:
+            section += 1
+            parts.append(f"<h2>Section {section}: the science of the lip barrier</h2>")
+        parts.append(
+            f'<p>{sentence} {sentence} <a href="https://www.ncbi.nlm.nih.gov/">Research</a> supports it. {sentence}</p>'
+        )
+        written += per_sentence * 3 + 3
+    return "\n".join(parts)
+
+
+def _print_table(profiles: list[PromptProfile], previous: dict | None) -> None:
+    prev = (previous or {}).get("prompts", {})
+    print(f"Tokenizer: {tokenizer_name()}   tenant: {current_tenant().id}\n")
+    print(f"{'prompt':<28} {'tokens':>8} {'Δ last':>8}  largest sections / components")
+    for p in profiles:
+        delta = f"{p.tokens - prev[p.name]:+d}" if p.name in prev else "new"
+        parts = sorted({**p.sections, **p.components}.items(), key=lambda kv: kv[1], reverse=True)[:3]
+        print(f"{p.name:<28} {p.tokens:>8} {delta:>8}  " + ", ".join(f"{k} {v}" for k, v in parts))
+    print(f"\n{'total':<28} {sum(p.tokens for p in profiles):>8}")
+
+
+def _print_detail(profile: PromptProfile) -> None:
+    print(f"{profile.name}: {profile.tokens} tokens ({tokenizer_name()})")
+    if profile.sections:
+        print("\nSections:")
+        for name, tokens in profile.sections.items():
+            print(f"  {name:<40} {tokens:>7}  {tokens / profile.tokens:>6.1%}")
+    if profile.components:
+        print("\nComponents:")
+        for name, tokens in sorted(profile.components.items(), key=lambda kv: kv[1], reverse=True):
+            print(f"  {name:<40} {tokens:>7}  {tokens / profile.tokens:>6.1%}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Profile prompt token usage by section.")
+    parser.add_argument("--tenant", help="profile prompts for this tenant (fleet mode)")
+    parser.add_argument("--detail", metavar="PROMPT", help="show the section breakdown for one prompt")
+    parser.add_argument("--json", action="store_true", help="print profiles as JSON")
+    parser.add_argument("--history", type=Path, default=Path(os.environ.get("PROMPT_PROFILE_HISTORY", _HISTORY_PATH)))
+    parser.add_argument("--no-record", action="store_true", help="don't append this run to the history file")
+    args = parser.parse_args(argv)
+
+    if args.tenant:
+        with use_tenant(args.tenant):
+            return _run(args)
+    _run(args)
+
+
+def _run(args: argparse.Namespace) -> None:
+    profiles = profile_all()
+    history = load_history(args.history)
+    if args.json:
+        print(json.dumps([asdict(p) for p in profiles], indent=2))
+    elif args.detail:
+        match = next((p for p in profiles if p.name == args.detail), None)
+        if match is None:
+            raise SystemExit(f"Unknown prompt '{args.detail}'. Known: {', '.join(p.name for p in profiles)}")
+        _print_detail(match)
+    else:
+        _print_table(profiles, history[-1] if history else None)
+    if not args.no_record:
+        append_history(profiles, args.history)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Shared provider clients — one pooled client per provider for every agent and tenant.
+
+The SDKs are imported on first use rather than at module import, so startup
+(and CLIs that only build prompts) don't pay for them; services.prewarm can
+load them in the background instead.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import OpenAI
+
+_lock = threading.Lock()
+_openai_client: OpenAI | None = None
+_http_client: httpx.Client | None = None
+_gemini_client = None
+
+
+def openai_client() -> OpenAI:
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        with _lock:
+            if _openai_client is None:
+                _openai_client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    return _openai_client
+
+
+def http_client() -> httpx.Client:
+    """Keep-alive HTTP client for the blog and upload APIs (per-request timeouts)."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                )
+    return _http_client
+
+
+def gemini_client():
+    """google-genai client; callers handle ImportError / missing GEMINI_API_KEY first."""
+    global _gemini_client
+    if _gemini_client is None:
+        from google import genai
+        with _lock:
+            if _gemini_client is None:
+                _gemini_client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+    return _gemini_client
@@ -0,0 +1,158 @@
+"""Process-wide token-bucket rate limiter for model providers.
+
+Each call takes one request from the model's RPM bucket and its estimated token
+cost from the TPM bucket, waiting for a refill rather than risking a 429, then
+settles the estimate against real usage. Override the tier-1 defaults with
+RATE_LIMITS, e.g. {"openai:gpt-4o": {"rpm": 5000, "tpm": 800000}}.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+from services import deadline
+
+logger = logging.getLogger(__name__)
+
+# (rpm, tpm) — tpm of 0 means the provider is only request-limited
+_DEFAULT_LIMITS: dict[str, tuple[int, int]] = {
+    "openai:gpt-4o": (500, 30_000),
+    "openai:gpt-4o-mini": (500, 200_000),
+    "openai:dall-e-3": (5, 0),
+    "gemini:*": (10, 0),
+    "openai:*": (500, 30_000),
+}
+
+_CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most one minute of capacity."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (amount is clamped to capacity)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self._rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Return (positive) or charge (negative) tokens after the fact."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+@dataclass
+class Reservation:
+    limiter: "RateLimiter"
+    key: str
+    estimated_tokens: int
+    waited: float = 0.0
+
+    def settle(self, actual_tokens: int | None) -> None:
+        """Correct the TPM bucket with the real token usage reported by the provider."""
+        if actual_tokens is None:
+            return
+        self.limiter._adjust(self.key, self.estimated_tokens - actual_tokens)
+
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, tuple[int, int]] | None = None) -> None:
+        self._limits = dict(limits or _load_limits())
+        self._buckets: dict[str, tuple[TokenBucket, TokenBucket | None]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, provider: str, model: str, estimated_tokens: int = 0) -> Reservation:
+        """Block until one request and estimated_tokens fit within the model's limits.
+
+        Raises DeadlineExceeded instead of waiting past the current run deadline.
+        """
+        key = self._resolve_key(provider, model)
+        waited = 0.0
+        while True:
+            with self._lock:
+                rpm, tpm = self._bucket_pair(key)
+                delay = max(rpm.wait_time(1), tpm.wait_time(estimated_tokens) if tpm else 0.0)
+                if delay <= 0:
+                    rpm.take(1)
+                    if tpm:
+                        tpm.take(estimated_tokens)
+                    break
+            left = deadline.remaining()
+            if left is not None and left < delay + deadline.MIN_CALL_SECONDS:
+                raise deadline.DeadlineExceeded(f"run deadline: {key} needs a {delay:.1f}s wait, {max(left, 0.0):.1f}s left")
+            if waited == 0.0:
+                logger.info("[rate_limit] %s throttled — waiting %.1fs", key, delay)
+            sleep_for = min(delay, 1.0)
+            time.sleep(sleep_for)
+            waited += sleep_for
+        return Reservation(limiter=self, key=key, estimated_tokens=estimated_tokens, waited=waited)
+
+    def _adjust(self, key: str, delta: float) -> None:
+        with self._lock:
+            _rpm, tpm = self._bucket_pair(key)
+            if tpm:
+                tpm.adjust(delta)
+
+    def _resolve_key(self, provider: str, model: str) -> str:
+        exact = f"{provider}:{model}"
+        return exact if exact in self._limits else f"{provider}:*"
+
+    def _bucket_pair(self, key: str) -> tuple[TokenBucket, TokenBucket | None]:
+        pair = self._buckets.get(key)
+        if pair is None:
+            rpm, tpm = self._limits.get(key, (60, 0))
+            pair = (TokenBucket(rpm), TokenBucket(tpm) if tpm else None)
+            self._buckets[key] = pair
+        return pair
+
+
+def estimate_tokens(texts: Iterable[str]) -> int:
+    """Cheap pre-call token estimate (~4 characters per token)."""
+    return sum(len(t) for t in texts) // _CHARS_PER_TOKEN + 1
+
+
+def _load_limits() -> dict[str, tuple[int, int]]:
+    limits = dict(_DEFAULT_LIMITS)
+    raw = os.environ.get("RATE_LIMITS")
+    if raw:
+        try:
+            for key, cfg in json.loads(raw).items():
+                limits[key] = (int(cfg.get("rpm", 60)), int(cfg.get("tpm", 0)))
+        except (ValueError, AttributeError) as exc:
+            logger.warning("[rate_limit] ignoring invalid RATE_LIMITS: %s", exc)
+    return limits
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
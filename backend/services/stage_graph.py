@@ -0,0 +1,248 @@
+"""Declarative stage graph — a pipeline as stages with explicit inputs and outputs.
+
+Each Stage names the values it reads and the values it produces. The executor
+derives the dependency graph from those names and starts every stage whose
+inputs are ready, so independent stages run concurrently. Each stage runs in
+a copy of the caller's context, so tenant and trace follow it, and under its
+own stage.<name> span. The executor records a start/end timeline.
+
+Per stage:
+  retries   — attempts after the first, through the caller's retry function
+  timeout   — seconds before the run fails with StageTimeout (the worker
+              thread itself can't be interrupted; its result is discarded).
+              The stage also runs under deadline.within(timeout), so its
+              external calls get at most what is left of it — and never more
+              than the enclosing run deadline
+  hard_timeout — False: the timeout only bounds the stage's external calls; the
+              executor waits for the stage to return instead of abandoning it,
+              for stages whose side effects must not outlive the run
+  when      — predicate over the stage's inputs; False skips it (outputs None)
+  cacheable — results memoised in-process by input values, across runs
+A stage ends the whole run early by returning Halt(result).
+"""
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from services import deadline
+from services.idempotency import RecentResults, idempotency_key
+from services.tracing import mark_error, span
+
+RetryFn = Callable[[Callable[[], Any], int], Any]
+
+_cache: RecentResults[tuple[Any, ...]] = RecentResults(size=16)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[..., Any]                      # called with one keyword argument per input
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()                # >1 output: run returns a tuple in this order
+    after: tuple[str, ...] = ()                  # ordering-only dependencies on other stages
+    when: Callable[..., bool] | None = None
+    retries: int = 0
+    timeout: float | None = None
+    hard_timeout: bool = True
+    cacheable: bool = False
+
+
+@dataclass
+class Halt:
+    """Returned by a stage to stop the run; result becomes GraphRun.halted."""
+    result: Any
+
+
+@dataclass
+class StageRecord:
+    name: str
+    status: str                 # "ok" | "cached" | "skipped" | "halted" | "failed" | "timeout"
+    start: float                # seconds since the run started
+    end: float
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if v is not None}
+
+
+@dataclass
+class GraphRun:
+    values: dict[str, Any]
+    timeline: list[StageRecord] = field(default_factory=list)
+    halted: Halt | None = None
+
+
+class StageFailed(RuntimeError):
+    """A stage raised (or timed out); carries the values produced so far and the timeline."""
+
+    def __init__(self, stage: str, error: BaseException, values: dict[str, Any], timeline: list[StageRecord]):
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+        self.values = values
+        self.timeline = timeline
+
+
+class StageTimeout(deadline.DeadlineExceeded):
+    pass
+
+
+class StageGraph:
+    def __init__(self, stages: list[Stage]) -> None:
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("StageGraph: duplicate stage names")
+        self._producer: dict[str, str] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self._producer:
+                    raise ValueError(f"StageGraph: {output!r} produced by both {self._producer[output]} and {stage.name}")
+                self._producer[output] = stage.name
+        self._deps = {
+            s.name: {self._producer[i] for i in s.inputs if i in self._producer} | set(s.after)
+            for s in stages
+        }
+        for name, deps in self._deps.items():
+            unknown = deps - self.stages.keys()
+            if unknown:
+                raise ValueError(f"StageGraph: {name} runs after unknown stage(s) {sorted(unknown)}")
+        self.order = self._topological_order()
+
+    def run(
+        self,
+        initial: dict[str, Any] | None = None,
+        on_start: Callable[[str], None] | None = None,
+        retry: RetryFn | None = None,
+        max_workers: int = 4,
+        budget: Callable[[str], float | None] | None = None,
+    ) -> GraphRun:
+        """Run to completion, a Halt, or StageFailed.
+
+        budget(name) supplies the timeout for stages that don't set one.
+        """
+        values = dict(initial or {})
+        missing = {i for s in self.stages.values() for i in s.inputs} - values.keys() - self._producer.keys()
+        if missing:
+            raise ValueError(f"StageGraph: no stage or initial value provides {sorted(missing)}")
+
+        origin = time.perf_counter()
+        timeline: list[StageRecord] = []
+        done: set[str] = set()
+        waiting = list(self.order)
+        running: dict[Future, tuple[Stage, float, float | None]] = {}   # stage, start, monotonic cut-off
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+
+        def record(stage: Stage, status: str, start: float, error: str | None = None) -> None:
+            timeline.append(StageRecord(
+                stage.name, status, round(start - origin, 3), round(time.perf_counter() - origin, 3), error,
+            ))
+
+        try:
+            while waiting or running:
+                for name in [n for n in waiting if self._deps[n] <= done]:
+                    waiting.remove(name)
+                    stage = self.stages[name]
+                    kwargs = {i: values.get(i) for i in stage.inputs}
+                    limit = stage.timeout if stage.timeout is not None or budget is None else budget(name)
+                    if on_start is not None:
+                        on_start(name)
+                    future = pool.submit(contextvars.copy_context().run, self._execute, stage, kwargs, retry, limit)
+                    cutoff = self._cutoff(limit) if stage.hard_timeout else None
+                    running[future] = (stage, time.perf_counter(), cutoff)
+
+                finished, _ = wait(list(running), timeout=self._next_timeout(running), return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future, (stage, start, cutoff) in running.items():
+                    if future not in finished and cutoff is not None and now >= cutoff:
+                        error = StageTimeout(f"stage {stage.name} ran out of time after {time.perf_counter() - start:.1f}s")
+                        record(stage, "timeout", start, str(error))
+                        raise StageFailed(stage.name, error, values, timeline)
+
+                for future in finished:
+                    stage, start, _ = running.pop(future)
+                    try:
+                        status, result = future.result()
+                        if isinstance(result, Halt):
+                            record(stage, "halted", start)
+                            return GraphRun(values, timeline, halted=result)
+                        values.update(self._unpack(stage, result))
+                    except Exception as exc:
+                        record(stage, "failed", start, str(exc)[:200])
+                        raise StageFailed(stage.name, exc, values, timeline) from exc
+                    record(stage, status, start)
+                    done.add(stage.name)
+        finally:
+            # Stages still running after a halt or failure finish in the background; results are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+        return GraphRun(values, timeline)
+
+    def _execute(
+        self, stage: Stage, kwargs: dict[str, Any], retry: RetryFn | None, limit: float | None,
+    ) -> tuple[str, Any]:
+        with deadline.within(limit), span(f"stage.{stage.name}") as current:
+            if stage.when is not None and not stage.when(**kwargs):
+                current.set_attribute("stage.skipped", True)
+                return "skipped", None
+            key = idempotency_key("stage", stage.name, repr(tuple(kwargs.values()))) if stage.cacheable else None
+            if key is not None:
+                cached = _cache.get(key)
+                if cached is not None:
+                    current.set_attribute("stage.cached", True)
+                    return "cached", cached[0]
+            try:
+                call = lambda: stage.run(**kwargs)  # noqa: E731
+                result = retry(call, stage.retries) if retry is not None and stage.retries else call()
+            except Exception as exc:
+                mark_error(current, str(exc))
+                raise
+            if key is not None and not isinstance(result, Halt):
+                _cache.put(key, (result,))
+            return "ok", result
+
+    def _unpack(self, stage: Stage, result: Any) -> dict[str, Any]:
+        if not stage.outputs:
+            return {}
+        if len(stage.outputs) == 1:
+            return {stage.outputs[0]: result}
+        if result is None:
+            return dict.fromkeys(stage.outputs)
+        if not isinstance(result, tuple) or len(result) != len(stage.outputs):
+            raise TypeError(f"stage {stage.name} must return {len(stage.outputs)} values")
+        return dict(zip(stage.outputs, result))
+
+    @staticmethod
+    def _cutoff(limit: float | None) -> float | None:
+        """Monotonic time a stage with this timeout must finish by, capped at the run deadline."""
+        if limit is None:
+            return None
+        left = deadline.remaining()
+        return time.monotonic() + (limit if left is None else min(limit, max(left, 0.0)))
+
+    @staticmethod
+    def _next_timeout(running: dict[Future, tuple[Stage, float, float | None]]) -> float | None:
+        now = time.monotonic()
+        remaining = [cutoff - now for _, _, cutoff in running.values() if cutoff is not None]
+        return max(0.0, min(remaining)) if remaining else None
+
+    def _topological_order(self) -> list[str]:
+        order: list[str] = []
+        state: dict[str, str] = {}
+
+        def visit(name: str, path: tuple[str, ...]) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"StageGraph: cycle through {' → '.join((*path, name))}")
+            state[name] = "visiting"
+            for dep in sorted(self._deps[name]):
+                visit(dep, (*path, name))
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, ())
+        return order
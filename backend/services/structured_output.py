@@ -0,0 +1,160 @@
+"""Strict JSON-schema response formats and a local repair parser for model output.
+
+Schemas are generated from the agents' dataclasses, so the model is constrained
+to exactly the fields _validate expects. parse_json() accepts the raw response
+and, when it isn't valid JSON (markdown fences, trailing commas, raw newlines
+or an unterminated string at the token limit), repairs it locally instead of
+forcing a full regeneration.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import re
+import typing
+from typing import Any
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+# An object key with no value yet at the truncation point: {"a": 1, "b"  /  {"a": 1, "b":
+_DANGLING_KEY_RE = re.compile(r'([{,])\s*"[^"]*"\s*:?\s*$')
+_PARTIAL_LITERAL_RE = re.compile(r'([:\[,]\s*)([^\s"\[\]{}:,]+)$')
+
+
+# ── Schemas ────────────────────────────────────────────────────────────────────
+
+def dataclass_schema(cls: type, exclude: tuple[str, ...] = ()) -> dict[str, Any]:
+    """Strict-mode JSON schema for a dataclass of str/int/float/bool, Literal, list and nested dataclass fields."""
+    hints = typing.get_type_hints(cls)
+    properties = {
+        f.name: _type_schema(hints[f.name])
+        for f in dataclasses.fields(cls)
+        if f.name not in exclude
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def object_schema(**properties: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def response_format(name: str, schema: dict[str, Any]) -> dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def _type_schema(tp: Any) -> dict[str, Any]:
+    origin = typing.get_origin(tp)
+    if origin is list:
+        (item,) = typing.get_args(tp) or (str,)
+        return {"type": "array", "items": _type_schema(item)}
+    if origin is typing.Literal:
+        return {"type": "string", "enum": list(typing.get_args(tp))}
+    if dataclasses.is_dataclass(tp):
+        return dataclass_schema(tp)
+    if tp is str:
+        return {"type": "string"}
+    if tp is bool:
+        return {"type": "boolean"}
+    if tp is int:
+        return {"type": "integer"}
+    if tp is float:
+        return {"type": "number"}
+    raise TypeError(f"Unsupported field type for schema: {tp!r}")
+
+
+# ── Parsing + repair ───────────────────────────────────────────────────────────
+
+def parse_json(raw: str, label: str) -> Any:
+    """Parse model output, repairing common breakage locally; RuntimeError if unrecoverable."""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(raw))
+    except json.JSONDecodeError:
+        raise RuntimeError(f"{label} returned invalid JSON: {raw[:200]}")
+
+
+def repair_json(raw: str) -> str:
+    """Best-effort fix-up of almost-JSON: fences, raw control chars, truncation, trailing commas."""
+    text = _FENCE_RE.sub("", raw.strip())
+    start = text.find("{")
+    if start > 0:
+        text = text[start:]
+
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    end = len(text)
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+                out.append(ch)
+            elif ch == "\\":
+                escaped = True
+                out.append(ch)
+            elif ch == '"':
+                in_string = False
+                out.append(ch)
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            elif ord(ch) < 0x20:
+                out.append(f"\\u{ord(ch):04x}")
+            else:
+                out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                out.append(ch)
+                end = i + 1
+                break
+        out.append(ch)
+
+    if end < len(text) or not stack and not in_string:
+        # Complete top-level value — drop anything after it
+        return _TRAILING_COMMA_RE.sub(r"\1", "".join(out))
+
+    # Truncated: close the open string, drop whatever can't stand alone, close containers
+    if escaped:
+        out.pop()
+    if in_string:
+        out.append('"')
+    repaired = _PARTIAL_LITERAL_RE.sub(_drop_partial_literal, "".join(out).rstrip())
+    if stack and stack[-1] == "}":
+        repaired = _DANGLING_KEY_RE.sub(r"\1", repaired)
+    repaired = repaired.rstrip().rstrip(",").rstrip()
+    repaired += "".join(reversed(stack))
+    return _TRAILING_COMMA_RE.sub(r"\1", repaired)
+
+
+def _drop_partial_literal(match: re.Match[str]) -> str:
+    """Keep true/false/null at the cut; drop anything else, numbers included — '85' cut to '8'
+    looks complete, so the field goes missing (and fails validation) instead of carrying 8."""
+    if match.group(2) in ("true", "false", "null"):
+        return match.group(0)
+    return match.group(1)
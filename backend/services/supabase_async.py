@@ -0,0 +1,132 @@
+"""Async Supabase reads for the pipeline preflight, on one pooled AsyncClient.
+
+All coroutines here run on a single long-lived event loop owned by this module,
+so every caller shares one AsyncClient and its HTTP connection pool. Pipeline
+threads run independent reads concurrently with gather(); everything else uses
+the sync helpers in supabase_client.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Awaitable, Coroutine, TypeVar
+
+from services.supabase_client import _RECENT_STRUCTURES_KEY, _scope, _settings_key, _today_start_iso
+from services.tracing import traced
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+T = TypeVar("T")
+
+_client: AsyncClient | None = None
+_client_lock: asyncio.Lock | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+# ── Event loop + client ────────────────────────────────────────────────────────
+
+def _service_loop() -> asyncio.AbstractEventLoop:
+    """Return the module's event loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="supabase-async", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+async def _asb() -> AsyncClient:
+    global _client, _client_lock
+    if _client is None:
+        if _client_lock is None:
+            _client_lock = asyncio.Lock()
+        async with _client_lock:
+            if _client is None:
+                from supabase import acreate_client
+                url = os.environ["SUPABASE_URL"]
+                key = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+                _client = await acreate_client(url, key)
+    return _client
+
+
+def _schedule(coro: Coroutine[Any, Any, T]) -> Future[T]:
+    # Tasks on the service loop don't inherit the caller's context — carry it over
+    # so helpers see the caller's current tenant.
+    ctx = contextvars.copy_context()
+
+    async def _in_caller_context() -> T:
+        for var, value in ctx.items():
+            var.set(value)
+        return await coro
+
+    return asyncio.run_coroutine_threadsafe(_in_caller_context(), _service_loop())
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run one coroutine from this module on the shared loop and block for its result."""
+    return _schedule(coro).result()
+
+
+def gather(*coros: Awaitable[Any]) -> list[Any]:
+    """Run independent queries concurrently and return their results in order."""
+    async def _all() -> list[Any]:
+        return list(await asyncio.gather(*coros))
+    return run(_all())
+
+
+# ── Queue helpers ──────────────────────────────────────────────────────────────
+
+@traced()
+async def count_pending_queue_items() -> int:
+    sb = await _asb()
+    res = await (
+        _scope(sb.from_("automation_queue").select("*", count="exact", head=True))
+        .eq("status", "pending")
+        .execute()
+    )
+    return res.count or 0
+
+
+# ── Publishing frequency helpers ───────────────────────────────────────────────
+
+@traced()
+async def count_posts_today() -> int:
+    """Count posts published or saved as draft today (UTC)."""
+    sb = await _asb()
+    res = await (
+        _scope(sb.from_("automation_logs").select("*", count="exact", head=True))
+        .in_("status", ["success", "draft"])
+        .gte("created_at", _today_start_iso())
+        .execute()
+    )
+    return res.count or 0
+
+
+# ── Structure rotation helpers ──────────────────────────────────────────────────
+
+@traced()
+async def get_recent_structures(n: int = 3) -> list[str]:
+    """Return the last n structure types used, oldest first."""
+    try:
+        sb = await _asb()
+        res = await (
+            sb.from_("app_settings")
+            .select("value")
+            .eq("key", _settings_key(_RECENT_STRUCTURES_KEY))
+            .limit(1)
+            .execute()
+        )
+        if not res.data:
+            return []
+        raw = res.data[0].get("value")
+        if isinstance(raw, list):
+            return [str(s) for s in raw[-n:]]
+        return []
+    except Exception:
+        return []
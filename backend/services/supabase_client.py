@@ -1,11 +1,19 @@
 """Supabase queue + log + settings helpers (server-side only)."""
 from __future__ import annotations
 
+import logging
 import os
+import time
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 
-from supabase import create_client, Client
+from services.tenants import current_tenant, fleet_mode
+from services.tracing import current_trace_id, enabled as tracing_enabled, traced
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
 
 _client: Client | None = None
 
@@ -13,6 +21,7 @@ _client: Client | None = None
 def _sb() -> Client:
     global _client
     if _client is None:
+        from supabase import create_client  # deferred: the SDK is slow to import
         url = os.environ["SUPABASE_URL"]
         key = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
         _client = create_client(url, key)
@@ -30,6 +39,7 @@ class QueueItem:
     status: str
     created_at: str
     processed_at: str | None
+    draft: dict[str, Any] | None = None  # content draft ingested from a backfill batch
 
 
 @dataclass
@@ -41,11 +51,10 @@ class ScheduleSettings:
 
 # ── Queue helpers ──────────────────────────────────────────────────────────────
 
+@traced()
 def dequeue_next_topic() -> QueueItem | None:
     res = (
-        _sb()
-        .from_("automation_queue")
-        .select("*")
+        _scope(_sb().from_("automation_queue").select("*"))
         .eq("status", "pending")
         .order("created_at", desc=False)
         .limit(1)
@@ -55,11 +64,22 @@ def dequeue_next_topic() -> QueueItem | None:
         return None
 
     row = res.data[0]
-    # Mark as in_progress
-    _sb().from_("automation_queue").update({"status": "in_progress"}).eq("id", row["id"]).execute()
+    # Mark as in_progress — conditional on still being pending so concurrent runners can't both claim it
+    from datetime import datetime, timezone
+    claimed = (
+        _sb()
+        .from_("automation_queue")
+        .update({"status": "in_progress", "claimed_at": datetime.now(timezone.utc).isoformat()})
+        .eq("id", row["id"])
+        .eq("status", "pending")
+        .execute()
+    )
+    if not claimed.data:
+        return dequeue_next_topic()
     return _row_to_queue_item(row)
 
 
+@traced()
 def update_queue_status(item_id: str, status: str, set_processed_at: bool = False) -> None:
     payload: dict[str, Any] = {"status": status}
     if set_processed_at:
@@ -68,22 +88,95 @@ def update_queue_status(item_id: str, status: str, set_processed_at: bool = Fals
     _sb().from_("automation_queue").update(payload).eq("id", item_id).execute()
 
 
+@traced()
 def get_all_queue_items() -> list[QueueItem]:
-    res = _sb().from_("automation_queue").select("*").order("created_at", desc=True).execute()
+    res = _scope(_sb().from_("automation_queue").select("*")).order("created_at", desc=True).execute()
     return [_row_to_queue_item(r) for r in (res.data or [])]
 
 
+_QUEUE_PAGE_SIZE = 500
+
+
+def iter_queue_rows(
+    columns: Iterable[str] = ("topic",),
+    statuses: Iterable[str] | None = None,
+    page_size: int = _QUEUE_PAGE_SIZE,
+) -> Iterator[dict[str, Any]]:
+    """Stream queue rows newest first, selecting only the requested columns.
+
+    Pages on a (created_at, id) keyset cursor instead of OFFSET; rows always
+    carry created_at and id alongside the requested columns.
+    """
+    status_list = list(statuses) if statuses is not None else None
+    return _iter_rows(
+        "automation_queue",
+        columns,
+        (lambda query: query.in_("status", status_list)) if status_list is not None else None,
+        page_size,
+    )
+
+
+def iter_log_outcomes(page_size: int = _QUEUE_PAGE_SIZE) -> Iterator[dict[str, Any]]:
+    """Stream automation_logs rows that carry a revision outcome (confidence_score set), newest first."""
+    return _iter_rows(
+        "automation_logs",
+        ("queue_id", "post_id", "status", "confidence_score", "seo_checks_passed"),
+        lambda query: query.not_.is_("confidence_score", "null"),
+        page_size,
+    )
+
+
+def _iter_rows(
+    table: str,
+    columns: Iterable[str],
+    where: Callable[[Any], Any] | None,
+    page_size: int,
+) -> Iterator[dict[str, Any]]:
+    cols = list(dict.fromkeys([*columns, "created_at", "id"]))
+    cursor: tuple[str, str] | None = None
+
+    while True:
+        query = _scope(_sb().from_(table).select(",".join(cols)))
+        if where is not None:
+            query = where(query)
+        if cursor is not None:
+            created_at, row_id = cursor
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt."{row_id}")'
+            )
+        res = (
+            query
+            .order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(page_size)
+            .execute()
+        )
+        rows = res.data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+        cursor = (last["created_at"], last["id"])
+
+
+def iter_queue_topics(statuses: Iterable[str] | None = None) -> Iterator[str]:
+    """Stream just the topic strings from the queue history."""
+    for row in iter_queue_rows(("topic",), statuses=statuses):
+        yield row["topic"]
+
+
+@traced()
 def count_pending_queue_items() -> int:
     res = (
-        _sb()
-        .from_("automation_queue")
-        .select("*", count="exact", head=True)
+        _scope(_sb().from_("automation_queue").select("*", count="exact", head=True))
         .eq("status", "pending")
         .execute()
     )
     return res.count or 0
 
 
+@traced()
 def add_queue_item(
     topic: str,
     focus_keyphrase: str | None = None,
@@ -96,6 +189,7 @@ def add_queue_item(
             "topic": topic,
             "focus_keyphrase": focus_keyphrase,
             "keywords": keywords,
+            **_tenant_fields(),
         })
         .execute()
     )
@@ -104,13 +198,225 @@ def add_queue_item(
     return _row_to_queue_item(res.data[0])
 
 
-def reset_in_progress_items() -> None:
-    """Reset items stuck as in_progress from a crashed run."""
-    _sb().from_("automation_queue").update({"status": "pending"}).eq("status", "in_progress").execute()
+@traced()
+def list_undrafted_pending(limit: int) -> list[QueueItem]:
+    """Oldest pending items with no backfill draft yet."""
+    res = (
+        _scope(_sb().from_("automation_queue").select("*"))
+        .eq("status", "pending")
+        .is_("draft", "null")
+        .order("created_at", desc=False)
+        .limit(limit)
+        .execute()
+    )
+    return [_row_to_queue_item(r) for r in (res.data or [])]
+
+
+@traced()
+def set_queue_draft(item_id: str, draft: dict[str, Any]) -> None:
+    _sb().from_("automation_queue").update({"draft": draft}).eq("id", item_id).execute()
+
+
+@traced()
+def reset_in_progress_items(stale_after_seconds: float) -> int:
+    """Reset the current tenant's items stuck as in_progress from a crashed run.
+
+    Only items claimed more than stale_after_seconds ago are reset; a younger
+    claim may belong to a run still going on another replica.
+    """
+    from datetime import datetime, timedelta, timezone
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=stale_after_seconds)).isoformat()
+    res = (
+        _scope(_sb().from_("automation_queue").update({"status": "pending"}))
+        .eq("status", "in_progress")
+        .lt("claimed_at", cutoff)
+        .execute()
+    )
+    return len(res.data or [])
+
+
+# ── Durable job queue (pipeline_jobs) ──────────────────────────────────────────
+
+def enqueue_job(kind: str, tenant_id: str | None = None) -> dict[str, Any]:
+    res = _sb().from_("pipeline_jobs").insert({"kind": kind, "status": "queued", "tenant_id": tenant_id}).execute()
+    if not res.data:
+        raise RuntimeError("Failed to enqueue job")
+    return res.data[0]
+
+
+def claim_next_job(worker_id: str) -> dict[str, Any] | None:
+    """Atomically move a queued job to running for this worker.
+
+    Among the oldest queued jobs, prefers the tenant with the fewest jobs already
+    running so one tenant's backlog can't occupy every worker.
+    """
+    from datetime import datetime, timezone
+    while True:
+        res = (
+            _sb()
+            .from_("pipeline_jobs")
+            .select("id, tenant_id")
+            .eq("status", "queued")
+            .order("submitted_at", desc=False)
+            .limit(20)
+            .execute()
+        )
+        if not res.data:
+            return None
+        running = _sb().from_("pipeline_jobs").select("tenant_id").eq("status", "running").execute()
+        load: dict[Any, int] = {}
+        for r in running.data or []:
+            load[r.get("tenant_id")] = load.get(r.get("tenant_id"), 0) + 1
+        candidate = min(res.data, key=lambda r: load.get(r.get("tenant_id"), 0))  # stable → oldest wins ties
+        now = datetime.now(timezone.utc).isoformat()
+        claimed = (
+            _sb()
+            .from_("pipeline_jobs")
+            .update({"status": "running", "worker_id": worker_id, "started_at": now, "heartbeat_at": now})
+            .eq("id", candidate["id"])
+            .eq("status", "queued")
+            .execute()
+        )
+        if claimed.data:
+            return claimed.data[0]
+        # Another worker won the race — try again
+
+
+def update_job(job_id: str, fields: dict[str, Any]) -> None:
+    _sb().from_("pipeline_jobs").update(fields).eq("id", job_id).execute()
+
+
+def get_job(job_id: str) -> dict[str, Any] | None:
+    res = _sb().from_("pipeline_jobs").select("*").eq("id", job_id).limit(1).execute()
+    return res.data[0] if res.data else None
+
+
+def list_jobs(limit: int = 50) -> list[dict[str, Any]]:
+    res = _sb().from_("pipeline_jobs").select("*").order("submitted_at", desc=True).limit(limit).execute()
+    return res.data or []
+
+
+def count_jobs(status: str) -> int:
+    res = _sb().from_("pipeline_jobs").select("*", count="exact", head=True).eq("status", status).execute()
+    return res.count or 0
+
+
+def requeue_stale_jobs(stale_after_seconds: int) -> int:
+    """Return running jobs whose worker stopped heartbeating to the queue.
+
+    The queue item a stale job had dequeued goes back to pending too, so the
+    requeued job (or any other run) can pick it up again.
+    """
+    from datetime import datetime, timedelta, timezone
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=stale_after_seconds)).isoformat()
+    stale = (
+        _sb()
+        .from_("pipeline_jobs")
+        .select("id, queue_id")
+        .eq("status", "running")
+        .lt("heartbeat_at", cutoff)
+        .execute()
+    )
+    requeued = 0
+    for row in stale.data or []:
+        claimed = (
+            _sb()
+            .from_("pipeline_jobs")
+            .update({"status": "queued", "worker_id": None, "stage": None, "queue_id": None})
+            .eq("id", row["id"])
+            .eq("status", "running")
+            .lt("heartbeat_at", cutoff)
+            .execute()
+        )
+        if not claimed.data:
+            continue  # finished, heartbeated or requeued by another sweep in the meantime
+        requeued += 1
+        if row.get("queue_id"):
+            (
+                _sb()
+                .from_("automation_queue")
+                .update({"status": "pending"})
+                .eq("id", row["queue_id"])
+                .eq("status", "in_progress")
+                .execute()
+            )
+    return requeued
+
+
+# ── Scheduler leadership ───────────────────────────────────────────────────────
+
+def try_acquire_lease(name: str, holder: str, ttl_seconds: int) -> bool:
+    """Take or renew the named lease; True if holder owns it for the next ttl_seconds."""
+    from datetime import datetime, timedelta, timezone
+    now = datetime.now(timezone.utc)
+    expires_at = (now + timedelta(seconds=ttl_seconds)).isoformat()
+    res = (
+        _sb()
+        .from_("scheduler_leases")
+        .update({"holder": holder, "expires_at": expires_at})
+        .eq("name", name)
+        .or_(f'holder.eq."{holder}",expires_at.lt."{now.isoformat()}"')
+        .execute()
+    )
+    if res.data:
+        return True
+    existing = _sb().from_("scheduler_leases").select("name").eq("name", name).limit(1).execute()
+    if existing.data:
+        return False  # held by someone else and not yet expired
+    try:
+        _sb().from_("scheduler_leases").insert({"name": name, "holder": holder, "expires_at": expires_at}).execute()
+        return True
+    except Exception as exc:
+        if _is_unique_violation(exc):
+            return False  # lost the race to create the row
+        raise
+
+
+def release_lease(name: str, holder: str) -> None:
+    from datetime import datetime, timezone
+    try:
+        (
+            _sb()
+            .from_("scheduler_leases")
+            .update({"expires_at": datetime.now(timezone.utc).isoformat()})
+            .eq("name", name)
+            .eq("holder", holder)
+            .execute()
+        )
+    except Exception:
+        pass  # lease simply expires on its own
+
+
+def claim_scheduler_tick(tick_key: str, holder: str, attempts: int = 3) -> bool:
+    """Record that this tick fired; False if another instance already claimed it.
+
+    Only a primary-key conflict means "claimed elsewhere". Other errors are
+    retried, and a conflict after a failed attempt is checked against the
+    row's holder, in case that attempt's insert landed. An error that outlasts
+    the retries is raised.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            _sb().from_("scheduler_runs").insert({"tick_key": tick_key, "holder": holder}).execute()
+            return True
+        except Exception as exc:
+            if _is_unique_violation(exc):
+                if attempt == 1:
+                    return False  # tick already ran elsewhere
+                row = _sb().from_("scheduler_runs").select("holder").eq("tick_key", tick_key).limit(1).execute()
+                return bool(row.data) and row.data[0].get("holder") == holder
+            logger.warning(
+                "[scheduler] claiming tick %s failed (attempt %d/%d): %s", tick_key, attempt, attempts, exc,
+            )
+            if attempt == attempts:
+                raise
+            time.sleep(float(attempt))
+    return False
 
 
 # ── Log helpers ────────────────────────────────────────────────────────────────
 
+@traced()
 def insert_log(
     queue_id: str | None,
     post_id: str | None,
@@ -128,21 +434,20 @@ def insert_log(
         "seo_checks_passed": seo_checks_passed,
         "revision_notes": revision_notes,
         "error_message": error_message,
+        **_tenant_fields(),
+        **_trace_fields(),
     }).execute()
 
 
 # ── Publishing frequency helpers ───────────────────────────────────────────────
 
+@traced()
 def count_posts_today() -> int:
     """Count posts published or saved as draft today (UTC)."""
-    from datetime import datetime, timezone
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
     res = (
-        _sb()
-        .from_("automation_logs")
-        .select("*", count="exact", head=True)
+        _scope(_sb().from_("automation_logs").select("*", count="exact", head=True))
         .in_("status", ["success", "draft"])
-        .gte("created_at", today_start)
+        .gte("created_at", _today_start_iso())
         .execute()
     )
     return res.count or 0
@@ -153,6 +458,7 @@ def count_posts_today() -> int:
 _RECENT_STRUCTURES_KEY = "recent_structures"
 
 
+@traced()
 def get_recent_structures(n: int = 3) -> list[str]:
     """Return the last n structure types used, oldest first."""
     try:
@@ -160,7 +466,7 @@ def get_recent_structures(n: int = 3) -> list[str]:
             _sb()
             .from_("app_settings")
             .select("value")
-            .eq("key", _RECENT_STRUCTURES_KEY)
+            .eq("key", _settings_key(_RECENT_STRUCTURES_KEY))
             .limit(1)
             .execute()
         )
@@ -174,51 +480,88 @@ def get_recent_structures(n: int = 3) -> list[str]:
         return []
 
 
+@traced()
 def record_structure_used(structure: str) -> None:
     """Append structure to the recent_structures list (keep last 10)."""
     try:
         recent = get_recent_structures(10)
         recent.append(structure)
         recent = recent[-10:]  # keep last 10 only
+        key = _settings_key(_RECENT_STRUCTURES_KEY)
         existing = (
             _sb()
             .from_("app_settings")
             .select("key")
-            .eq("key", _RECENT_STRUCTURES_KEY)
+            .eq("key", key)
             .limit(1)
             .execute()
         )
         if existing.data:
-            _sb().from_("app_settings").update({"value": recent}).eq("key", _RECENT_STRUCTURES_KEY).execute()
+            _sb().from_("app_settings").update({"value": recent}).eq("key", key).execute()
         else:
-            _sb().from_("app_settings").insert({"key": _RECENT_STRUCTURES_KEY, "value": recent}).execute()
+            _sb().from_("app_settings").insert({"key": key, "value": recent}).execute()
     except Exception:
         pass  # non-fatal — structure rotation degrades gracefully
 
 
+# ── Batch jobs ─────────────────────────────────────────────────────────────────
+
+# One pipeline_batches row per submitted batch. state is "pending" until a poll
+# claims the finished batch ("ingesting") and "done" once its results are stored;
+# status mirrors the batch endpoint's last reported status.
+
+@traced()
+def insert_batch(record: dict[str, Any]) -> None:
+    _sb().from_("pipeline_batches").insert({**record, "state": "pending", **_tenant_fields()}).execute()
+
+
+@traced()
+def get_pending_batches() -> list[dict[str, Any]]:
+    """Submitted batch jobs not yet ingested (including ones being ingested now), oldest first."""
+    res = (
+        _scope(_sb().from_("pipeline_batches").select("*"))
+        .neq("state", "done")
+        .order("submitted_at", desc=False)
+        .execute()
+    )
+    return res.data or []
+
+
+@traced()
+def update_batch(batch_id: str, fields: dict[str, Any]) -> None:
+    _sb().from_("pipeline_batches").update(fields).eq("id", batch_id).execute()
+
+
+@traced()
+def claim_batch(batch_id: str) -> bool:
+    """Move a pending batch to ingesting; False if another poll claimed it first."""
+    res = (
+        _sb()
+        .from_("pipeline_batches")
+        .update({"state": "ingesting"})
+        .eq("id", batch_id)
+        .eq("state", "pending")
+        .execute()
+    )
+    return bool(res.data)
+
+
 # ── Schedule settings ──────────────────────────────────────────────────────────
 
+_SCHEDULE_KEYS = ["scheduler_active", "scheduler_run_times", "scheduler_timezone"]
+
+
+@traced()
 def get_schedule_settings() -> ScheduleSettings:
     try:
         res = (
             _sb()
             .from_("app_settings")
             .select("key, value")
-            .in_("key", ["scheduler_active", "scheduler_run_times", "scheduler_timezone"])
+            .in_("key", [_settings_key(k) for k in _SCHEDULE_KEYS])
             .execute()
         )
-        m: dict[str, Any] = {r["key"]: r["value"] for r in (res.data or [])}
-
-        raw_active = m.get("scheduler_active")
-        active = raw_active is True or raw_active == "true" if raw_active is not None else True
-
-        raw_times = m.get("scheduler_run_times")
-        run_times = raw_times if isinstance(raw_times, list) else ["06:00", "12:00", "18:00"]
-
-        raw_tz = m.get("scheduler_timezone")
-        timezone = raw_tz if isinstance(raw_tz, str) else "UTC"
-
-        return ScheduleSettings(active=active, run_times=run_times, timezone=timezone)
+        return _rows_to_schedule_settings(res.data or [])
     except Exception:
         return ScheduleSettings(active=True, run_times=["06:00", "12:00", "18:00"], timezone="UTC")
 
@@ -229,6 +572,37 @@ def get_scheduler_active() -> bool:
 
 # ── Internal helpers ───────────────────────────────────────────────────────────
 
+def _scope(query: Any) -> Any:
+    """Restrict a query to the current tenant's rows (no-op outside fleet mode)."""
+    if not fleet_mode():
+        return query
+    tenant = current_tenant()
+    # The default tenant owns the unscoped rows, so the dashboard keeps working for it
+    return query.is_("tenant_id", "null") if tenant.is_default else query.eq("tenant_id", tenant.id)
+
+
+def _is_unique_violation(exc: Exception) -> bool:
+    """Postgres unique_violation (23505), as raised by postgrest for a duplicate key."""
+    return getattr(exc, "code", None) == "23505" or "23505" in str(exc)
+
+
+def _tenant_fields() -> dict[str, Any]:
+    """Columns to add to inserts so rows belong to the current tenant."""
+    tenant = current_tenant()
+    return {"tenant_id": tenant.id} if fleet_mode() and not tenant.is_default else {}
+
+
+def _trace_fields() -> dict[str, Any]:
+    """The run's trace id, when tracing is exporting (requires the trace_id column)."""
+    trace_id = current_trace_id() if tracing_enabled() else None
+    return {"trace_id": trace_id} if trace_id else {}
+
+
+def _settings_key(key: str) -> str:
+    tenant = current_tenant()
+    return key if tenant.is_default else f"{tenant.id}:{key}"
+
+
 def _row_to_queue_item(r: dict[str, Any]) -> QueueItem:
     return QueueItem(
         id=r["id"],
@@ -238,6 +612,26 @@ def _row_to_queue_item(r: dict[str, Any]) -> QueueItem:
         status=r["status"],
         created_at=r["created_at"],
         processed_at=r.get("processed_at"),
+        draft=r.get("draft"),
     )
 
 
+def _rows_to_schedule_settings(rows: list[dict[str, Any]]) -> ScheduleSettings:
+    # Tenant-prefixed keys ("brand-b:scheduler_active") map back to the bare names
+    m: dict[str, Any] = {r["key"].split(":", 1)[-1]: r["value"] for r in rows}
+
+    raw_active = m.get("scheduler_active")
+    active = raw_active is True or raw_active == "true" if raw_active is not None else True
+
+    raw_times = m.get("scheduler_run_times")
+    run_times = raw_times if isinstance(raw_times, list) else ["06:00", "12:00", "18:00"]
+
+    raw_tz = m.get("scheduler_timezone")
+    timezone = raw_tz if isinstance(raw_tz, str) else "UTC"
+
+    return ScheduleSettings(active=active, run_times=run_times, timezone=timezone)
+
+
+def _today_start_iso() -> str:
+    from datetime import datetime, timezone
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
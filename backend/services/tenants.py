@@ -0,0 +1,112 @@
+"""Tenant (brand) configuration for running several brand blogs from one deployment.
+
+Without TENANTS_FILE the deployment serves a single "default" tenant built from
+the existing Jesse A. Eisenbalm constants, and nothing is scoped by tenant. With
+TENANTS_FILE pointing at a JSON list of tenant objects, fleet mode is on: queue,
+log and settings rows are scoped by tenant_id and every tenant gets its own
+schedule. The default tenant keeps the unscoped rows (tenant_id null) so the
+dashboard continues to manage it.
+
+The active tenant is held in a context variable — code that runs on behalf of a
+tenant reads current_tenant() instead of module-level brand constants.
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from typing import Iterator
+
+from prompts.brand_context import BRAND_CONTEXT
+
+DEFAULT_TENANT_ID = "default"
+
+
+@dataclass
+class Tenant:
+    id: str = DEFAULT_TENANT_ID
+    brand_name: str = "Jesse A. Eisenbalm"
+    brand_descriptor: str = "a premium beeswax lip balm brand"
+    site_url: str = "https://jesseaeisenbalm.com"
+    author: str = "Elise Caldwell"
+    brand_context: str = BRAND_CONTEXT
+    product_spec: str | None = None        # None → agents.image default
+    image_style: str | None = None         # None → agents.image default
+    keyword_clusters: list[str] | None = None   # None → agents.topic default
+    content_pillars: list[str] | None = None    # None → agents.topic default
+    semantic_terms: str | None = None      # None → prompts default
+    blog_api_url: str | None = None        # None → BLOG_API_URL env
+    blog_api_key_env: str = "BLOG_API_KEY"
+    admin_password_env: str = "ADMIN_PASSWORD"
+    max_posts_per_day: int = 1
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def is_default(self) -> bool:
+        return self.id == DEFAULT_TENANT_ID
+
+    @property
+    def site_domain(self) -> str:
+        return self.site_url.split("://", 1)[-1].rstrip("/")
+
+    def resolved_blog_api_url(self) -> str:
+        return self.blog_api_url or os.environ.get("BLOG_API_URL", "https://jesse-eisenbalm-server.vercel.app")
+
+
+_DEFAULT = Tenant()
+_current: contextvars.ContextVar[Tenant] = contextvars.ContextVar("current_tenant", default=_DEFAULT)
+_tenants: dict[str, Tenant] | None = None
+
+
+def fleet_mode() -> bool:
+    """True when tenants are loaded from TENANTS_FILE and DB rows are tenant-scoped."""
+    return bool(os.environ.get("TENANTS_FILE"))
+
+
+def load_tenants() -> dict[str, Tenant]:
+    """Return all configured tenants keyed by id (cached after the first call)."""
+    global _tenants
+    if _tenants is None:
+        tenants: dict[str, Tenant] = {}
+        path = os.environ.get("TENANTS_FILE")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            if not isinstance(raw, list):
+                raise RuntimeError("TENANTS_FILE must contain a JSON list of tenant objects")
+            known = {f.name for f in fields(Tenant)}
+            for entry in raw:
+                if not isinstance(entry, dict) or not entry.get("id"):
+                    raise RuntimeError("TENANTS_FILE: every tenant needs an id")
+                unknown = {k: v for k, v in entry.items() if k not in known}
+                config = {k: v for k, v in entry.items() if k in known}
+                tenants[str(entry["id"])] = Tenant(**{**config, "extra": {**config.get("extra", {}), **unknown}})
+        tenants.setdefault(DEFAULT_TENANT_ID, _DEFAULT)
+        _tenants = tenants
+    return _tenants
+
+
+def get_tenant(tenant_id: str | None) -> Tenant:
+    if not tenant_id:
+        return _DEFAULT
+    tenant = load_tenants().get(tenant_id)
+    if tenant is None:
+        raise RuntimeError(f"Unknown tenant: {tenant_id}")
+    return tenant
+
+
+def current_tenant() -> Tenant:
+    return _current.get()
+
+
+@contextmanager
+def use_tenant(tenant: Tenant | str | None) -> Iterator[Tenant]:
+    """Run the enclosed block on behalf of the given tenant."""
+    resolved = tenant if isinstance(tenant, Tenant) else get_tenant(tenant)
+    token = _current.set(resolved)
+    try:
+        yield resolved
+    finally:
+        _current.reset(token)
@@ -0,0 +1,102 @@
+"""Prompt token counting and per-block token budgets.
+
+count_tokens() uses tiktoken when it is installed and falls back to the
+~4 characters per token estimate otherwise. Variable-length context blocks
+(existing topics, existing titles, the document sent for expansion) are trimmed
+to a ceiling before the call goes out; override the ceilings with
+PROMPT_BUDGETS, e.g. {"existing_topics": 1500}.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_CHARS_PER_TOKEN = 4
+
+_DEFAULT_BUDGETS: dict[str, int] = {
+    "existing_topics": 2000,
+    "existing_titles": 600,
+    "expand_document": 6000,
+}
+
+_encodings: dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+_budgets: dict[str, int] | None = None
+
+
+def tokenizer_name(model: str = "gpt-4o") -> str:
+    encoding = _encoding(model)
+    return f"tiktoken:{encoding.name}" if encoding is not None else f"chars/{_CHARS_PER_TOKEN}"
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // _CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def budget(name: str) -> int:
+    global _budgets
+    if _budgets is None:
+        budgets = dict(_DEFAULT_BUDGETS)
+        raw = os.environ.get("PROMPT_BUDGETS")
+        if raw:
+            try:
+                budgets.update({k: int(v) for k, v in json.loads(raw).items()})
+            except (ValueError, TypeError, AttributeError) as exc:
+                logger.warning("[token_budget] ignoring invalid PROMPT_BUDGETS: %s", exc)
+        _budgets = budgets
+    return _budgets.get(name, 0)
+
+
+def trim_items(items: list[str], name: str, keep: str = "last") -> list[str]:
+    """Keep as many whole items (rendered one per line) as fit in the named budget.
+
+    keep="last" drops from the front, keep="first" from the back. A budget of 0
+    or less disables trimming.
+    """
+    limit = budget(name)
+    if limit <= 0 or not items:
+        return items
+    ordered = list(reversed(items)) if keep == "last" else list(items)
+    kept: list[str] = []
+    used = 0
+    for item in ordered:
+        cost = count_tokens(f"- {item}\n")
+        if used + cost > limit:
+            break
+        kept.append(item)
+        used += cost
+    if len(kept) < len(items):
+        logger.info("[token_budget] %s: kept %d of %d items (%d tokens)", name, len(kept), len(items), used)
+    return list(reversed(kept)) if keep == "last" else kept
+
+
+def over_budget(text: str, name: str) -> bool:
+    limit = budget(name)
+    return limit > 0 and count_tokens(text) > limit
+
+
+def _encoding(model: str) -> Any:
+    if model in _encodings:
+        return _encodings[model]
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+            except ImportError:
+                _encodings[model] = None
+            else:
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
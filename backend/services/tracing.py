@@ -0,0 +1,138 @@
+"""OpenTelemetry tracing — optional, with a no-op fallback.
+
+With opentelemetry-sdk and the OTLP exporter installed and
+OTEL_EXPORTER_OTLP_ENDPOINT set, configure() exports spans for every pipeline
+stage and external call (OpenAI, Gemini, DALL-E, Supabase, blog API, upload) to
+that collector. Without them every helper here is a cheap no-op, so call sites
+never need to check.
+
+Span context lives in contextvars, so it follows the tenant into worker
+threads started with contextvars.copy_context().run and onto the Supabase
+service loop.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # tracing is optional
+    trace = None  # type: ignore[assignment]
+
+_SERVICE_NAME = "blog-automation"
+_configured = False
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict[str, Any]) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: dict[str, Any] | None = None) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def configure() -> bool:
+    """Install an OTLP-exporting tracer provider; True if spans will be exported.
+
+    Safe to call more than once (and once per worker process).
+    """
+    global _configured
+    if _configured:
+        return True
+    if trace is None or not os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("[tracing] OTEL_EXPORTER_OTLP_ENDPOINT set but opentelemetry-sdk / OTLP exporter not installed")
+        return False
+
+    service = os.environ.get("OTEL_SERVICE_NAME", _SERVICE_NAME)
+    provider = TracerProvider(resource=Resource.create({"service.name": service}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _configured = True
+    logger.info("[tracing] exporting spans for %s to %s", service, os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"])
+    return True
+
+
+def enabled() -> bool:
+    return _configured
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Start a child span of the current one; exceptions are recorded and re-raised."""
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+    with trace.get_tracer(__name__).start_as_current_span(name) as current:
+        current.set_attributes(_clean(attributes))
+        yield current
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Decorator: run the function (sync or async) inside a span named name or db.<function>."""
+    def decorate(fn: F) -> F:
+        span_name = name or f"db.{fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(span_name, **{"db.system": "supabase"}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name, **{"db.system": "supabase"}):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+def current_span() -> Any:
+    return trace.get_current_span() if trace is not None else _NOOP_SPAN
+
+
+def current_trace_id() -> str | None:
+    """Hex trace id of the active span, or None when nothing is being traced."""
+    if trace is None:
+        return None
+    ctx = trace.get_current_span().get_span_context()
+    return format(ctx.trace_id, "032x") if ctx.is_valid else None
+
+
+def mark_error(target: Any, message: str) -> None:
+    if trace is not None and target is not _NOOP_SPAN:
+        target.set_status(Status(StatusCode.ERROR, message[:200]))
+
+
+def _clean(attributes: dict[str, Any]) -> dict[str, Any]:
+    """OTel attributes must be str/bool/int/float (or lists of them); drop None."""
+    return {k: v for k, v in attributes.items() if v is not None}
@@ -2,37 +2,60 @@
 from __future__ import annotations
 
 import os
-import random
-import string
-import time
 
-import httpx
+from services import deadline
+from services.idempotency import HEADER as IDEMPOTENCY_HEADER
+from services.idempotency import RecentResults, idempotency_key
+from services.providers import http_client
+from services.tenants import current_tenant
+from services.tracing import span
+
+
+# URLs of recent uploads by idempotency key, so a retried upload of the same bytes is free
+_uploaded: RecentResults[str] = RecentResults()
 
 
 def upload_image(image_bytes: bytes, mime_type: str = "image/png") -> str:
-    """Upload image bytes and return the public CDN URL."""
-    admin_password = os.environ["ADMIN_PASSWORD"]
-    api_url = os.environ.get("BLOG_API_URL", "https://jesse-eisenbalm-server.vercel.app")
+    """Upload image bytes and return the public CDN URL.
+
+    The idempotency key comes from the bytes themselves, and it is also the stored
+    filename: uploading the same image again (a retry, even after the server stored
+    the file but the response was lost) writes the same object instead of a second
+    copy, and a retry after a client-side success returns the earlier URL.
+    """
+    tenant = current_tenant()
+    key = idempotency_key("upload", tenant.id, image_bytes)
+    cached = _uploaded.get(key)
+    if cached is not None:
+        return cached
+
+    admin_password = os.environ[tenant.admin_password_env]
+    api_url = tenant.resolved_blog_api_url()
 
     ext = "png" if mime_type == "image/png" else ("webp" if mime_type == "image/webp" else "jpg")
-    rand = "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    filename = f"{int(time.time())}-{rand}.{ext}"
-
-    response = httpx.post(
-        f"{api_url}/api/admin/upload",
-        headers={"x-admin-password": admin_password},
-        files={"file": (filename, image_bytes, mime_type)},
-        timeout=60.0,
-    )
-
-    if not response.is_success:
-        raise RuntimeError(
-            f"Upload failed: {response.status_code} {response.reason_phrase} — {response.text[:300]}"
+    filename = f"{key}.{ext}"
+
+    with span(
+        "upload.image",
+        **{"http.method": "POST", "upload.bytes": len(image_bytes), "upload.mime_type": mime_type},
+    ) as current:
+        response = http_client().post(
+            f"{api_url}/api/admin/upload",
+            headers={"x-admin-password": admin_password, IDEMPOTENCY_HEADER: key},
+            files={"file": (filename, image_bytes, mime_type)},
+            timeout=deadline.timeout(60.0, "image upload"),
         )
+        current.set_attribute("http.status_code", response.status_code)
+
+        if not response.is_success:
+            raise RuntimeError(
+                f"Upload failed: {response.status_code} {response.reason_phrase} — {response.text[:300]}"
+            )
 
     data = response.json()
     url = data.get("url")
     if not url:
         raise RuntimeError("Upload response missing url field")
 
+    _uploaded.put(key, url)
     return url
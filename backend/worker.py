@@ -0,0 +1,209 @@
+"""Pipeline worker — claims jobs from the pipeline_jobs table and runs them.
+
+Run alongside the API with JOB_BACKEND=durable:
+
+    python worker.py                 # WORKER_PROCESSES processes (default 1)
+    python worker.py --processes 4
+
+Each process polls independently, so workers scale across cores and across
+containers with no coordination beyond the atomic claim in the database.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("worker")
+
+_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_SECONDS", "5"))
+_STALE_AFTER_SECONDS = int(os.environ.get("WORKER_STALE_AFTER_SECONDS", "1800"))
+# Running jobs heartbeat this often, so a long stage never looks stale
+_HEARTBEAT_SECONDS = max(5.0, _STALE_AFTER_SECONDS / 6)
+# Idle workers sweep for stale jobs this often (the claim in the database makes concurrent sweeps safe)
+_SWEEP_SECONDS = float(os.environ.get("WORKER_SWEEP_SECONDS", "300"))
+_FINISH_ATTEMPTS = 3
+
+
+JobHandler = Callable[[Callable[[str], None], "str | None", Callable[[str], None]], Any]
+
+
+def _job_handlers() -> dict[str, JobHandler]:
+    from agents.supervisor import run_pipeline, run_replenish
+    return {
+        "pipeline": lambda on_stage, tenant_id, on_dequeue: run_pipeline(
+            on_stage, tenant_id=tenant_id, on_dequeue=on_dequeue,
+        ),
+        "replenish": lambda _on_stage, tenant_id, _on_dequeue: run_replenish(tenant_id=tenant_id),
+    }
+
+
+def _run_job(row: dict[str, Any], handlers: dict[str, JobHandler]) -> None:
+    from services import supabase_client as db
+
+    job_id = row["id"]
+    start = time.monotonic()
+
+    def report_stage(stage: str) -> None:
+        # Stages overlap, so this is only "latest stage started"; timings come from the result's timeline
+        try:
+            db.update_job(job_id, {"stage": stage, "heartbeat_at": _now_iso()})
+        except Exception as exc:
+            logger.warning("[worker] job %s: could not record stage %s: %s", job_id, stage, exc)
+
+    def record_dequeue(queue_id: str) -> None:
+        try:
+            db.update_job(job_id, {"queue_id": queue_id, "heartbeat_at": _now_iso()})
+        except Exception as exc:
+            logger.warning("[worker] job %s: could not record queue item %s: %s", job_id, queue_id, exc)
+
+    finished = threading.Event()
+
+    def heartbeat() -> None:
+        while not finished.wait(_HEARTBEAT_SECONDS):
+            try:
+                db.update_job(job_id, {"heartbeat_at": _now_iso()})
+            except Exception as exc:
+                logger.warning("[worker] job %s heartbeat failed: %s", job_id, exc)
+
+    threading.Thread(target=heartbeat, name=f"heartbeat-{job_id}", daemon=True).start()
+
+    fields: dict[str, Any] = {}
+    timings: dict[str, float] = {}
+    try:
+        handler = handlers.get(row.get("kind") or "pipeline")
+        if handler is None:
+            raise RuntimeError(f"Unknown job kind: {row.get('kind')}")
+        result = handler(report_stage, row.get("tenant_id"), record_dequeue)
+        payload = result.to_dict() if hasattr(result, "to_dict") else result
+        failed = isinstance(payload, dict) and payload.get("status") == "error"
+        fields = {"status": "error" if failed else "done", "result": payload}
+        timings = _stage_timings(payload)
+    except Exception as exc:
+        logger.error("[worker] job %s failed: %s", job_id, exc)
+        fields = {"status": "error", "error": str(exc)}
+    finally:
+        finished.set()
+        timings["total"] = round(time.monotonic() - start, 3)
+        _record_finish(job_id, {**fields, "stage_timings": timings, "finished_at": _now_iso()})
+        logger.info("[worker] job %s finished: %s (%.1fs)", job_id, fields.get("status"), timings["total"])
+
+
+def worker_loop(index: int) -> None:
+    """Claim and run jobs until terminated."""
+    from services import supabase_client as db
+    from services.tracing import configure as configure_tracing
+
+    configure_tracing()  # per process — spawned workers don't inherit the provider
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    handlers = _job_handlers()
+    stopping = False
+
+    def _stop(_signum: int, _frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    logger.info("[worker] %s polling every %.1fs", worker_id, _POLL_INTERVAL)
+    next_sweep = 0.0
+
+    while not stopping:
+        if time.monotonic() >= next_sweep:
+            _sweep_stale_jobs()
+            next_sweep = time.monotonic() + _SWEEP_SECONDS
+        try:
+            row = db.claim_next_job(worker_id)
+        except Exception as exc:
+            logger.error("[worker] %s claim failed: %s", worker_id, exc)
+            row = None
+        if row is None:
+            time.sleep(_POLL_INTERVAL)
+            continue
+        logger.info("[worker] %s claimed %s job %s", worker_id, row.get("kind"), row["id"])
+        try:
+            _run_job(row, handlers)
+        except Exception:
+            logger.exception("[worker] %s: job %s crashed the worker loop", worker_id, row["id"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run pipeline worker processes.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.environ.get("WORKER_PROCESSES", "1")),
+        help="number of worker processes (default: WORKER_PROCESSES or 1)",
+    )
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        worker_loop(0)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=worker_loop, args=(i,), name=f"worker-{i}") for i in range(args.processes)]
+    for p in procs:
+        p.start()
+
+    def _forward(signum: int, _frame: object) -> None:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for p in procs:
+        p.join()
+
+
+def _stage_timings(payload: Any) -> dict[str, float]:
+    """Seconds per stage from a pipeline result's timeline (stages may overlap)."""
+    timeline = payload.get("timeline") if isinstance(payload, dict) else None
+    return {
+        record["name"]: round(record["end"] - record["start"], 3)
+        for record in timeline or []
+        if record.get("status") not in ("skipped", "cached")
+    }
+
+
+def _record_finish(job_id: str, fields: dict[str, Any]) -> None:
+    """Write the job's final status, retrying transient errors. If every attempt fails, the
+    job stops heartbeating and the stale-job sweep requeues it."""
+    from services import supabase_client as db
+    for attempt in range(1, _FINISH_ATTEMPTS + 1):
+        try:
+            db.update_job(job_id, fields)
+            return
+        except Exception:
+            if attempt == _FINISH_ATTEMPTS:
+                logger.exception("[worker] job %s: could not record its %s status", job_id, fields.get("status"))
+                return
+            time.sleep(attempt)
+
+
+def _sweep_stale_jobs() -> None:
+    """Requeue jobs (and their queue items) whose worker stopped heartbeating."""
+    from services import supabase_client as db
+    try:
+        requeued = db.requeue_stale_jobs(_STALE_AFTER_SECONDS)
+    except Exception as exc:
+        logger.error("[worker] stale-job sweep failed: %s", exc)
+        return
+    if requeued:
+        logger.info("[worker] requeued %d stale job(s)", requeued)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+if __name__ == "__main__":
+    main()